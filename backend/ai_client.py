@@ -0,0 +1,150 @@
+"""
+Shared Gradient AI client.
+
+One client per worker process, so HTTP connections are pooled and reused
+instead of paying import, TLS and connection setup on every request. Calls
+get a deadline, a cap on concurrent in-flight requests, and a circuit
+breaker: after repeated failures the breaker opens and calls fail fast with
+AIUnavailable, so callers go straight to their fallbacks instead of tying up
+workers on a model that isn't answering.
+"""
+
+import os
+import threading
+import time
+
+MODEL = "llama3-8b-instruct"
+
+# Default per-call deadline (seconds)
+DEFAULT_TIMEOUT = 10.0
+
+# Most model calls in flight per worker; extra callers wait up to QUEUE_TIMEOUT
+MAX_CONCURRENT = 4
+QUEUE_TIMEOUT = 1.0
+
+# Consecutive failures that open the breaker, and how long it stays open (seconds)
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+
+
+class AIUnavailable(Exception):
+    """The model can't be called right now (no key, breaker open or too busy)"""
+
+
+class CircuitBreaker:
+    """Closed -> open after FAILURE_THRESHOLD failures -> half-open after RESET_TIMEOUT"""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; half-open lets a single trial call through"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def cancel_trial(self):
+        """Release a half-open trial that was allowed but never made"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class AIClient:
+    """Pooled Gradient client with deadlines, a concurrency limit and a circuit breaker"""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, breaker: CircuitBreaker = None):
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._client = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        """Whether an API key is configured"""
+        return bool(os.getenv('DIGITAL_OCEAN_MODEL_ACCESS_KEY'))
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from gradient import Gradient
+
+                # Retries are left to callers' fallbacks; the breaker handles persistent failure
+                self._client = Gradient(
+                    model_access_key=os.getenv('DIGITAL_OCEAN_MODEL_ACCESS_KEY'),
+                    timeout=DEFAULT_TIMEOUT,
+                    max_retries=0,
+                )
+            return self._client
+
+    def chat(self, system_prompt: str, user_prompt: str, timeout: float = DEFAULT_TIMEOUT) -> str:
+        """Run one chat completion and return the response text.
+
+        Raises AIUnavailable without calling the model if there is no key,
+        the breaker is open or every slot stays busy for QUEUE_TIMEOUT;
+        model errors are re-raised after being counted by the breaker.
+        """
+        if not self.available():
+            raise AIUnavailable('API key not configured')
+        if not self.breaker.allow():
+            raise AIUnavailable('AI temporarily unavailable after repeated failures')
+        if not self._slots.acquire(timeout=QUEUE_TIMEOUT):
+            # Busy isn't a model failure; just give back a half-open trial
+            self.breaker.cancel_trial()
+            raise AIUnavailable('Too many AI requests in flight')
+
+        try:
+            resp = self._get_client().chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                timeout=timeout,
+            )
+            text = resp.choices[0].message.content
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._slots.release()
+
+        self.breaker.record_success()
+        return text
+
+
+ai_client = AIClient()
@@ -20,6 +20,10 @@ def create_app():
     )
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # Times pool checkouts for /api/metrics
+        from metrics import TimedQueuePool
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': TimedQueuePool}
 
     # Initialize extensions
     CORS(app)
@@ -32,6 +36,7 @@ def create_app():
     from routes.leaderboard import leaderboard_bp
     from routes.ai import ai_bp
     from routes.events import events_bp
+    from routes.sessions import sessions_bp
 
     app.register_blueprint(players_bp, url_prefix='/api')
     app.register_blueprint(prompts_bp, url_prefix='/api')
@@ -39,6 +44,7 @@ def create_app():
     app.register_blueprint(leaderboard_bp, url_prefix='/api')
     app.register_blueprint(ai_bp, url_prefix='/api')
     app.register_blueprint(events_bp, url_prefix='/api')
+    app.register_blueprint(sessions_bp, url_prefix='/api')
 
     # Only register admin routes in development or when explicitly enabled
     if os.getenv('FLASK_ENV') == 'development' or os.getenv('ENABLE_ADMIN') == 'true':
@@ -72,6 +78,14 @@ def create_app():
     with app.app_context():
         db.create_all()
 
+    # Request latency and SQL counts, served at /api/metrics
+    from metrics import init_metrics
+    init_metrics(app)
+
+    # Write buffered prompt usage counts periodically and on worker shutdown
+    from prompt_pool import start_usage_flushing
+    start_usage_flushing(app)
+
     return app
 
 app = create_app()
@@ -0,0 +1,64 @@
+"""
+Add and fill players.email_domain, and index the admin email filters.
+db.create_all() doesn't alter existing tables, so run this once on databases
+created before the column existed: python backfill_email_domains.py
+Safe to re-run. See docs/UPGRADING.md for the order of the upgrade scripts.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import func, text, update
+from sqlalchemy.exc import DBAPIError
+from app import create_app
+from models import db, Player
+
+
+def add_email_domain():
+    """Add the column and its index (the one create_all builds on new databases)"""
+    db.session.execute(text('ALTER TABLE players ADD COLUMN IF NOT EXISTS email_domain varchar(255)'))
+    db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_players_email_domain ON players (email_domain)'))
+
+
+def fill_email_domains():
+    """Set email_domain from email in one UPDATE, matching models.email_domain(); returns rows set"""
+    result = db.session.execute(
+        update(Player)
+        .where(Player.email_domain == None, Player.email.contains('@'))
+        .values(email_domain=func.nullif(
+            func.lower(func.substring(func.trim(Player.email), '@([^@]*)$')), ''
+        ))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def add_email_search_index():
+    """Trigram index for the admin's email ILIKE '%...%' search; False if pg_trgm isn't available"""
+    try:
+        with db.session.begin_nested():
+            db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    except DBAPIError as e:
+        print(f"Skipped ix_players_email_trgm, pg_trgm is not available: {e.orig}")
+        return False
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_players_email_trgm ON players USING gin (email gin_trgm_ops)'
+    ))
+    return True
+
+
+def backfill_email_domains():
+    """Run the whole upgrade in one transaction"""
+    app = create_app()
+
+    with app.app_context():
+        add_email_domain()
+        count = fill_email_domains()
+        add_email_search_index()
+        db.session.commit()
+        print(f"Backfilled email_domain for {count} players")
+
+
+if __name__ == '__main__':
+    backfill_email_domains()
@@ -0,0 +1,143 @@
+"""
+Fan-out of computed snapshots to long-lived subscribers (Server-Sent Events).
+
+One background thread per worker watches each topic's version (e.g. a cache
+generation). When the version moves it computes the snapshot once and pushes
+it to every subscriber queue, skipping the push if the snapshot is unchanged.
+"""
+
+import queue
+import threading
+import time
+from models import db
+
+# How often the background thread checks topic versions (seconds)
+POLL_INTERVAL = 1.0
+
+# Snapshots buffered per subscriber; slow clients only ever need the latest
+QUEUE_SIZE = 4
+
+
+class _Topic:
+    def __init__(self, version, compute):
+        self.version = version
+        self.compute = compute
+        self.subscribers = set()
+        self.current_version = None
+        self.snapshot = None
+        self.ready = threading.Event()  # Set once the first snapshot is computed (or failed)
+        self.failed = False
+        self.joining = 0  # Subscribers waiting for that snapshot; the topic is kept alive for them
+
+
+class Broadcaster:
+    """Shares one computed snapshot per topic across all subscribers in this worker"""
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._topics = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._app = None
+
+    def subscribe(self, app, topic, version, compute) -> queue.Queue:
+        """Register a subscriber queue; it receives the current snapshot immediately.
+
+        Must be called with an app context: the first subscriber to a topic
+        computes its snapshot inline, and subscribers arriving meanwhile wait
+        for it rather than starting with nothing.
+        """
+        q = queue.Queue(maxsize=QUEUE_SIZE)
+
+        while True:
+            with self._lock:
+                entry = self._topics.get(topic)
+                is_new = entry is None
+                if is_new:
+                    entry = self._topics[topic] = _Topic(version, compute)
+                entry.joining += 1
+
+            if not is_new:
+                entry.ready.wait()
+                if entry.failed:
+                    continue  # The first subscriber's compute raised: try again as the first
+                break
+
+            try:
+                entry.current_version = version()
+                entry.snapshot = compute()
+            except Exception:
+                with self._lock:
+                    entry.failed = True
+                    del self._topics[topic]
+                raise
+            finally:
+                entry.ready.set()
+            break
+
+        with self._lock:
+            # Under the lock, so a concurrent publish can't be overtaken by this older snapshot
+            entry.joining -= 1
+            entry.subscribers.add(q)
+            q.put_nowait(entry.snapshot)
+            self._app = app
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='broadcaster', daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, topic, q):
+        with self._lock:
+            entry = self._topics.get(topic)
+            if entry:
+                entry.subscribers.discard(q)
+
+    def subscriber_count(self, topic) -> int:
+        with self._lock:
+            entry = self._topics.get(topic)
+            return len(entry.subscribers) if entry else 0
+
+    def _publish(self, entry, snapshot):
+        with self._lock:
+            subscribers = list(entry.subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(snapshot)
+            except queue.Full:
+                # Drop the oldest pending snapshot in favour of the newest
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(snapshot)
+
+    def poll(self):
+        """Check every topic once and publish changed snapshots (needs an app context)"""
+        with self._lock:
+            # Forget topics nobody listens to any more
+            for topic in [t for t, e in self._topics.items() if not e.subscribers and not e.joining]:
+                del self._topics[topic]
+            # A topic's first snapshot is computed by its first subscriber
+            entries = [e for e in self._topics.values() if e.ready.is_set()]
+
+        for entry in entries:
+            version = entry.version()
+            if version == entry.current_version:
+                continue
+            snapshot = entry.compute()
+            entry.current_version = version
+            if snapshot == entry.snapshot:
+                continue  # e.g. a new score that didn't change the top 10
+            entry.snapshot = snapshot
+            self._publish(entry, snapshot)
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self._app.app_context():
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Broadcaster poll error: {e}")
+                finally:
+                    db.session.remove()
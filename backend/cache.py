@@ -0,0 +1,119 @@
+"""
+Per-process caches kept consistent across gunicorn workers.
+
+Writers bump a generation counter in Postgres inside their own transaction
+(bump_generation). Readers compare the cached entry's generation with the
+current one, which each worker re-reads at most once per CHECK_INTERVAL, so
+repeated polls are served from memory without touching the database.
+"""
+
+import threading
+import time
+from flask import current_app, jsonify, request
+from sqlalchemy.dialects.postgresql import insert
+from models import db, CacheGeneration
+
+# How long a worker trusts its last read of a generation counter (seconds)
+CHECK_INTERVAL = 1.0
+
+_generations = {}  # name -> (generation, checked_at)
+_lock = threading.Lock()
+
+
+def current_generation(name: str) -> int:
+    """Get the generation for a name, re-reading it at most once per CHECK_INTERVAL"""
+    now = time.monotonic()
+    with _lock:
+        cached = _generations.get(name)
+    if cached and now - cached[1] < CHECK_INTERVAL:
+        return cached[0]
+
+    generation = db.session.query(CacheGeneration.generation).filter_by(name=name).scalar() or 0
+    with _lock:
+        _generations[name] = (generation, now)
+    return generation
+
+
+def generation_bump(name: str):
+    """Statement incrementing a generation; the caller must execute it in its transaction"""
+    # Force this worker to re-read the counter on its next lookup
+    with _lock:
+        _generations.pop(name, None)
+
+    stmt = insert(CacheGeneration).values(name=name, generation=1)
+    return stmt.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'generation': CacheGeneration.generation + 1},
+    )
+
+
+def bump_generation(name: str):
+    """Invalidate every worker's entries for a name (commits with the caller's transaction)"""
+    db.session.execute(generation_bump(name))
+
+
+class GenerationCache:
+    """Memoizes computed values per key, valid while the key's generation is unchanged.
+
+    With a ttl (seconds), entries are also recomputed once they are that old.
+    None results are cached too, so misses are as cheap as hits.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = {}  # key -> (generation, value, cached_at)
+        self._lock = threading.Lock()
+
+    def get(self, key, generation_name: str, compute, generation: int = None):
+        """Return the cached value for key, recomputing it if its generation moved or it expired"""
+        if generation is None:
+            generation = current_generation(generation_name)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] == generation and (self.ttl is None or now - entry[2] < self.ttl):
+            return entry[1]
+
+        value = compute()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (generation, value, now)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _tag(response, etag: str, max_age: int = None):
+    response.set_etag(etag)
+    if max_age:
+        # Browsers and proxies may reuse it for max_age seconds, then revalidate
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    else:
+        # Let browsers keep the body but revalidate on every poll
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def is_fresh(etag: str) -> bool:
+    """Whether the client's If-None-Match already covers etag"""
+    return request.if_none_match.contains(etag)
+
+
+def not_modified(etag: str, max_age: int = None):
+    """Empty 304 response carrying etag"""
+    return _tag(current_app.response_class(status=304), etag, max_age)
+
+
+def conditional_json(etag: str, build, max_age: int = None):
+    """Answer 304 if the client already holds etag, otherwise jsonify(build()).
+
+    build is only called on a miss, so a matching If-None-Match skips both
+    the query and the serialization.
+    """
+    if is_fresh(etag):
+        return not_modified(etag, max_age)
+    return _tag(jsonify(build()), etag, max_age)
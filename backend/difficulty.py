@@ -0,0 +1,137 @@
+"""
+Typing-difficulty metrics for prompts.
+
+Features are computed for a whole list of texts in one NumPy pass: the texts
+are concatenated into a single array of character codes, per-character
+properties come from lookup tables for a QWERTY keyboard, and per-prompt
+totals are reduced over each text's slice. The features are stored as columns
+on Prompt and folded into difficulty_score (0-100), which /prompts/random
+can filter on instead of the hand-set difficulty label.
+"""
+
+import numpy as np
+
+# Finger per key: 0-3 left pinky..index, 4-7 right index..pinky
+_FINGER_KEYS = {
+    0: '`1qaz~!QAZ',
+    1: '2wsx@WSX',
+    2: '3edc#EDC',
+    3: '45rfvtgb$%RFVTGB',
+    4: '67yhnujm^&YHNUJM',
+    5: '8ik,*IK<',
+    6: '9ol.(OL>',
+    7: '0p;/-[\'=]\\)P:?_{"+}|',
+}
+_SHIFTED = '~!@#$%^&*()_+{}|:"<>?ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_PUNCTUATION = '`~!@#$%^&*()-_=+[]{}\\|;:\'",.<>/?'
+
+# Lookup tables over ASCII; other characters count as unmapped (-1 / False)
+_TABLE_SIZE = 128
+FINGER = np.full(_TABLE_SIZE, -1, dtype=np.int8)
+for _finger, _keys in _FINGER_KEYS.items():
+    FINGER[[ord(c) for c in _keys]] = _finger
+HAND = np.where(FINGER < 0, -1, FINGER // 4).astype(np.int8)
+IS_SHIFTED = np.zeros(_TABLE_SIZE, dtype=bool)
+IS_SHIFTED[[ord(c) for c in _SHIFTED]] = True
+IS_PUNCTUATION = np.zeros(_TABLE_SIZE, dtype=bool)
+IS_PUNCTUATION[[ord(c) for c in _PUNCTUATION]] = True
+IS_DIGIT = np.zeros(_TABLE_SIZE, dtype=bool)
+IS_DIGIT[[ord(c) for c in '0123456789']] = True
+
+# Each feature is scaled to 0-1 (capped) and weighted into difficulty_score
+LENGTH_SCALE = 300
+DENSITY_SCALE = 0.1
+WEIGHTS = {
+    'length': 0.2,
+    'punctuation_density': 0.15,
+    'digit_density': 0.15,
+    'shifted_ratio': 0.2,
+    'same_finger_bigram_rate': 0.15,
+    'hand_alternation_rate': 0.15,
+}
+
+METRIC_COLUMNS = (
+    'char_count',
+    'punctuation_density',
+    'digit_density',
+    'shifted_ratio',
+    'same_finger_bigram_rate',
+    'hand_alternation_rate',
+    'difficulty_score',
+)
+
+
+def _per_text_sums(values, starts, lengths):
+    """Sum of values over each text's slice; empty slices sum to 0"""
+    sums = np.add.reduceat(np.append(values, 0).astype(np.int64), starts)
+    return np.where(lengths > 0, sums, 0)
+
+
+def compute_metrics(texts):
+    """Metric column values for each text, as a list of dicts in input order"""
+    if not texts:
+        return []
+
+    lengths = np.array([len(text) for text in texts], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+    ascii_codes = np.where(codes < _TABLE_SIZE, codes, 0)  # NUL maps to nothing
+
+    finger = FINGER[ascii_codes]
+    hand = HAND[ascii_codes]
+    punctuation = _per_text_sums(IS_PUNCTUATION[ascii_codes], starts, lengths)
+    digits = _per_text_sums(IS_DIGIT[ascii_codes], starts, lengths)
+    shifted = _per_text_sums(IS_SHIFTED[ascii_codes], starts, lengths)
+
+    # Bigram at i is (i, i + 1) over mapped keys; one starting at a text's last character crosses texts
+    pair_ok = np.zeros(len(codes), dtype=bool)
+    pair_ok[:-1] = (finger[:-1] >= 0) & (finger[1:] >= 0)
+    pair_ok[(starts + lengths - 1)[lengths > 0]] = False
+    next_finger = np.append(finger[1:], -1)
+    same_finger = pair_ok & (finger == next_finger) & (codes != np.append(codes[1:], 0))
+    alternating = pair_ok & (hand != np.append(hand[1:], -1))
+    pairs = _per_text_sums(pair_ok, starts, lengths)
+    same_finger = _per_text_sums(same_finger, starts, lengths)
+    alternating = _per_text_sums(alternating, starts, lengths)
+
+    safe_lengths = np.maximum(lengths, 1)
+    safe_pairs = np.maximum(pairs, 1)
+    features = {
+        'punctuation_density': punctuation / safe_lengths,
+        'digit_density': digits / safe_lengths,
+        'shifted_ratio': shifted / safe_lengths,
+        'same_finger_bigram_rate': same_finger / safe_pairs,
+        'hand_alternation_rate': np.where(pairs > 0, alternating / safe_pairs, 1.0),
+    }
+
+    # Less hand alternation is harder, so that term is inverted
+    score = (
+        WEIGHTS['length'] * np.minimum(lengths / LENGTH_SCALE, 1)
+        + WEIGHTS['punctuation_density'] * np.minimum(features['punctuation_density'] / DENSITY_SCALE, 1)
+        + WEIGHTS['digit_density'] * np.minimum(features['digit_density'] / DENSITY_SCALE, 1)
+        + WEIGHTS['shifted_ratio'] * np.minimum(features['shifted_ratio'] / DENSITY_SCALE, 1)
+        + WEIGHTS['same_finger_bigram_rate'] * np.minimum(features['same_finger_bigram_rate'] / DENSITY_SCALE, 1)
+        + WEIGHTS['hand_alternation_rate'] * (1 - features['hand_alternation_rate'])
+    ) * 100
+
+    return [
+        {
+            'char_count': int(lengths[i]),
+            **{name: round(float(values[i]), 4) for name, values in features.items()},
+            'difficulty_score': round(float(score[i]), 2),
+        }
+        for i in range(len(texts))
+    ]
+
+
+def apply_metrics(prompts):
+    """Set the metric columns on Prompt objects (or row dicts with a 'text' key) in one pass"""
+    prompts = list(prompts)
+    texts = [p['text'] if isinstance(p, dict) else p.text for p in prompts]
+    for prompt, metrics in zip(prompts, compute_metrics(texts)):
+        if isinstance(prompt, dict):
+            prompt.update(metrics)
+        else:
+            for name, value in metrics.items():
+                setattr(prompt, name, value)
+    return prompts
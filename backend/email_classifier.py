@@ -0,0 +1,162 @@
+"""
+Deterministic email classification for the admin dashboard.
+
+The rule lists below are compiled once into an EmailClassifier: the username
+patterns become a single alternation regex, the domain lists become
+frozensets, and the TLD lists are matched by looking up each dot-suffix of
+the domain in a set. Everything after the username checks depends only on
+the domain, so those verdicts are cached per domain.
+"""
+
+import re
+
+# DO team domains
+DO_DOMAINS = ['digitalocean.com', 'ajot.me']
+
+# Known personal email providers
+PERSONAL_DOMAINS = [
+    'gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com', 'icloud.com',
+    'aol.com', 'protonmail.com', 'proton.me', 'live.com', 'msn.com',
+    'me.com', 'mac.com', 'mail.com', 'ymail.com', 'googlemail.com',
+    'fastmail.com', 'zoho.com', 'tutanota.com', 'hey.com'
+]
+
+# Obviously fake domains
+FAKE_DOMAINS = [
+    'test.com', 'example.com', 'fake.com', 'asdf.com', 'xyz.com',
+    'aaa.com', 'abc.com', '123.com', 'temp.com', 'tempmail.com',
+    'mailinator.com', 'guerrillamail.com', 'throwaway.com',
+    'fakeemail.com', 'noemail.com', 'none.com', 'na.com', 'n.com',
+    'x.com', 'a.com', 'aa.com', 'aaaa.com', 'testing.com',
+    'do.com', 'robot.com', 'secret.com', 'email.com', 'mail.co'
+]
+
+# Suspicious TLDs often used for fake emails
+FAKE_TLDS = ['.xyz', '.tk', '.ml', '.ga', '.cf', '.gq']
+
+# Common TLD typos (misspellings of .com, .net, .org, etc.)
+TYPO_TLDS = [
+    '.co', '.con', '.cmo', '.ocm', '.vom', '.xom', '.om',  # .com typos
+    '.ner', '.nte', '.bet', '.met',                         # .net typos
+    '.ogr', '.otg', '.prg',                                 # .org typos
+    '.gmai', '.gmial', '.gmal',                             # gmail typos (in domain)
+]
+
+# Fake username patterns (regex)
+FAKE_USERNAME_PATTERNS = [
+    r'^test\d*$',           # test, test1, test123
+    r'^asdf+$',             # asdf, asdfasdf
+    r'^[a-z]$',             # single letter
+    r'^[a-z]{1,2}\d*$',     # a1, ab, ab123
+    r'^fake',               # fake, fakeuser
+    r'^none$',
+    r'^na$',
+    r'^null$',
+    r'^admin$',
+    r'^user\d*$',           # user, user1
+    r'^demo\d*$',           # demo, demo1
+    r'^sample\d*$',
+    r'^\d+$',               # all numbers
+    r'^x+$',                # x, xx, xxx
+    r'^aaa+$',              # aaa, aaaa
+    r'^player\d*$',         # player, player1
+    r'^hello$',             # hello
+    r'^noemail$',           # noemail
+    r'^secret$',            # secret
+    r'^xyz$',               # xyz
+    r'^lol$',               # lol
+    r'^lmao$',              # lmao
+    r'^hi$',                # hi
+    r'^hey$',               # hey
+    r'^yo$',                # yo
+    r'^blah$',              # blah
+    r'^foo$',               # foo
+    r'^bar$',               # bar
+    r'^baz$',               # baz
+    r'^qwerty',             # qwerty, qwerty123
+    r'^abcd*$',             # abc, abcd, abcde
+    r'.*[!@#$%^&*()+=].*',  # special chars in username (except . - _)
+]
+
+
+# Usernames that are suspicious even on a DO domain
+DO_FAKE_USERNAMES = ['test', 'asdf', 'fake', 'null', 'admin', 'user', 'demo', 'sample']
+
+# Domains whose verdicts are cached per classifier before the cache is reset
+DOMAIN_CACHE_SIZE = 100_000
+
+
+class EmailClassifier:
+    """classify_email's rules, compiled for single and bulk classification"""
+
+    def __init__(self):
+        self.do_domains = frozenset(DO_DOMAINS)
+        self.do_fake_usernames = frozenset(DO_FAKE_USERNAMES)
+        self.personal_domains = frozenset(PERSONAL_DOMAINS)
+        self.fake_domains = frozenset(FAKE_DOMAINS)
+        self.fake_tlds = frozenset(FAKE_TLDS)
+        self.typo_tlds = frozenset(TYPO_TLDS)
+        # re.match on the alternation == any re.match over the list
+        self.fake_username = re.compile('|'.join(f'(?:{p})' for p in FAKE_USERNAME_PATTERNS))
+        self._domains = {}  # domain -> (domain_name, verdict after the username checks)
+
+        # Suffix lookup only finds suffixes that start at a dot
+        if not all(tld.startswith('.') for tld in self.fake_tlds | self.typo_tlds):
+            raise ValueError('TLD rules must start with a dot')
+
+    def _domain_verdict(self, domain):
+        """Verdict from the domain alone, for emails that pass the username checks"""
+        domain_name = domain.split('.')[0] if '.' in domain else domain
+
+        if domain in self.fake_domains:
+            return domain_name, 'suspicious'
+
+        suffixes = {domain[i:] for i, char in enumerate(domain) if char == '.'}
+        if suffixes & self.fake_tlds:
+            return domain_name, 'suspicious'
+        if suffixes & self.typo_tlds:
+            return domain_name, 'typo'
+
+        if len(domain_name) <= 2:
+            return domain_name, 'suspicious'
+        if '.' not in domain:
+            return domain_name, 'suspicious'
+        if domain in self.personal_domains:
+            return domain_name, 'personal'
+        return domain_name, 'company'
+
+    def classify(self, email: str) -> str:
+        """Classify an email using deterministic rules"""
+        email = email.lower().strip()
+        username, at, domain = email.rpartition('@')
+        if not at:
+            return 'fake'
+
+        # 1. DO domains: trust the domain, but reject obviously fake usernames
+        if domain in self.do_domains:
+            return 'suspicious' if username in self.do_fake_usernames else 'do_employee'
+
+        # 2. Fake username patterns
+        if self.fake_username.match(username):
+            return 'suspicious'
+
+        cached = self._domains.get(domain)
+        if cached is None:
+            if len(self._domains) >= DOMAIN_CACHE_SIZE:
+                self._domains.clear()
+            cached = self._domains[domain] = self._domain_verdict(domain)
+        domain_name, verdict = cached
+
+        # 3. Username matches domain (secret@secret.com)
+        if username == domain_name:
+            return 'suspicious'
+        return verdict
+
+    def classify_many(self, emails):
+        """Verdicts for many emails, in order"""
+        classify = self.classify
+        return [classify(email) for email in emails]
+
+
+email_classifier = EmailClassifier()
+classify_email = email_classifier.classify
@@ -0,0 +1,63 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Rows are read through a server-side cursor (yield_per) and written to the
+response from a generator a chunk at a time, so memory stays flat no matter
+how many rows an export has.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import Response, stream_with_context
+from models import db
+
+# Rows fetched from the cursor (and written to the response) at a time
+CHUNK_SIZE = 1000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([[_plain(v) for v in row] for row in rows])
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(columns, rows):
+    return ''.join(
+        json.dumps({name: _plain(v) for name, v in zip(columns, row)}) + '\n'
+        for row in rows
+    )
+
+
+def stream_export(query, columns, fmt, filename, transform=None):
+    """Stream a select's rows as CSV or NDJSON; transform(row) -> tuple may reshape each row"""
+    def generate():
+        if fmt == 'csv':
+            yield _csv_chunk([columns])
+
+        result = db.session.execute(query.execution_options(yield_per=CHUNK_SIZE))
+        for rows in result.partitions():
+            if transform:
+                rows = [transform(row) for row in rows]
+            yield _csv_chunk(rows) if fmt == 'csv' else _ndjson_chunk(columns, rows)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'},
+    )
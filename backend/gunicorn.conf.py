@@ -0,0 +1,28 @@
+"""
+gunicorn settings, loaded automatically from the working directory.
+
+Each worker keeps its own metrics, so prometheus_client writes them to files
+under PROMETHEUS_MULTIPROC_DIR and /api/metrics sums them across workers.
+prometheus_client picks its value storage when it's first imported, and the
+workers inherit the master's modules, so nothing here may import it before
+the variable is set.
+"""
+
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'typing-master-metrics'))
+
+
+def on_starting(server):
+    # Stale files from a previous run would be summed into the new one
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges; its counters and histograms are kept
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,54 @@
+"""
+Background admin jobs.
+
+Long admin operations run on a small per-worker thread pool instead of
+holding a request worker. Each job has a row in the jobs table; the job
+function updates its progress in the same transactions as its own writes, so
+GET /api/admin/jobs/<id> on any worker sees progress that matches the data.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from models import db, Job
+
+# Admin jobs run one at a time per worker
+MAX_WORKERS = 1
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='admin-job')
+
+
+def start_job(app, kind, run, params=None):
+    """Create a job row and run run(job) in the background; returns the job.
+
+    run gets the job attached to the background thread's session and should
+    update job.processed / job.counts and commit as it goes.
+    """
+    job = Job(kind=kind, params=params)
+    db.session.add(job)
+    db.session.commit()
+    _executor.submit(_run, app, job.id, run)
+    return job
+
+
+def _run(app, job_id, run):
+    with app.app_context():
+        try:
+            job = db.session.get(Job, job_id)
+            job.status = 'running'
+            db.session.commit()
+
+            run(job)
+
+            job.status = 'done'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            db.session.rollback()
+            Job.query.filter_by(id=job_id).update(
+                {'status': 'failed', 'error': str(e), 'finished_at': datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.session.commit()
+        finally:
+            db.session.remove()
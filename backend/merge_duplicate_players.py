@@ -0,0 +1,111 @@
+"""
+Migrate players to unique normalized emails.
+Adds players.email_normalized, merges players that share a normalized email
+into the earliest-registered one (moving their scores and consents), then
+makes the column NOT NULL and unique. Safe to re-run: python merge_duplicate_players.py
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from collections import defaultdict
+from sqlalchemy import func, text, update
+from app import create_app
+from models import db, Player, Score, EventConsent, PlayerBest, PlayerStats
+from routes.leaderboard import invalidate_player_leaderboards
+from rebuild_rollups import rebuild_player_bests, rebuild_player_stats, rebuild_score_histograms
+
+
+def add_email_normalized():
+    """Add and fill the column (no constraint yet: duplicates still exist)"""
+    db.session.execute(text('ALTER TABLE players ADD COLUMN IF NOT EXISTS email_normalized varchar(255)'))
+    db.session.execute(
+        update(Player)
+        .where(Player.email_normalized == None)
+        .values(email_normalized=func.lower(func.trim(Player.email)))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def merge_duplicates():
+    """Fold each group of players sharing a normalized email into its earliest player; returns players removed"""
+    duplicated = db.session.query(Player.email_normalized).group_by(
+        Player.email_normalized
+    ).having(func.count() > 1).subquery()
+    players = Player.query.filter(
+        Player.email_normalized.in_(db.session.query(duplicated.c.email_normalized))
+    ).order_by(Player.email_normalized, Player.created_at, Player.id).all()
+
+    groups = defaultdict(list)
+    for player in players:
+        groups[player.email_normalized].append(player)
+
+    removed = 0
+    for email, (keeper, *duplicates) in groups.items():
+        duplicate_ids = [p.id for p in duplicates]
+        group_ids = [keeper.id] + duplicate_ids
+
+        # Boards showing any of them must be re-rendered
+        for player_id in group_ids:
+            invalidate_player_leaderboards(player_id)
+
+        # Latest nickname wins; hidden if any of them was hidden
+        keeper.nickname = duplicates[-1].nickname
+        keeper.is_hidden = any(p.is_hidden for p in [keeper] + duplicates)
+        keeper.email_type = keeper.email_type or next((p.email_type for p in duplicates if p.email_type), None)
+
+        Score.query.filter(Score.player_id.in_(duplicate_ids)).update(
+            {'player_id': keeper.id}, synchronize_session=False
+        )
+
+        # One consent per event: keep the most recent answer in the group
+        latest = {}
+        for consent in EventConsent.query.filter(EventConsent.player_id.in_(group_ids)).order_by(EventConsent.created_at):
+            latest[consent.event_id] = consent
+        keep_ids = {consent.id for consent in latest.values()}
+        EventConsent.query.filter(
+            EventConsent.player_id.in_(group_ids), EventConsent.id.notin_(keep_ids)
+        ).delete(synchronize_session=False)
+        EventConsent.query.filter(EventConsent.id.in_(keep_ids)).update(
+            {'player_id': keeper.id}, synchronize_session=False
+        )
+
+        # Rollup rows are rebuilt below
+        PlayerBest.query.filter(PlayerBest.player_id.in_(duplicate_ids)).delete(synchronize_session=False)
+        PlayerStats.query.filter(PlayerStats.player_id.in_(duplicate_ids)).delete(synchronize_session=False)
+
+        Player.query.filter(Player.id.in_(duplicate_ids)).delete(synchronize_session=False)
+        removed += len(duplicates)
+        print(f"Merged {len(duplicates)} duplicate(s) of {email}")
+
+    db.session.flush()
+    return removed
+
+
+def add_unique_constraint():
+    db.session.execute(text('ALTER TABLE players ALTER COLUMN email_normalized SET NOT NULL'))
+    db.session.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS players_email_normalized_key ON players (email_normalized)'
+    ))
+
+
+def merge_duplicate_players():
+    """Run the whole migration in one transaction, then rebuild the rollups"""
+    app = create_app()
+
+    with app.app_context():
+        add_email_normalized()
+        removed = merge_duplicates()
+        add_unique_constraint()
+        db.session.commit()
+        print(f"Removed {removed} duplicate players")
+
+        if removed:
+            rebuild_player_bests()
+            rebuild_player_stats()
+            rebuild_score_histograms()
+
+
+if __name__ == '__main__':
+    merge_duplicate_players()
@@ -0,0 +1,99 @@
+"""
+Performance messages generated in the background at score submission.
+
+create_score stores a message row alongside the new score. The row is ready
+straight away when a pooled template (or the tier fallback) will do; otherwise
+it is pending while a small thread pool asks the model. Clients read it from
+/api/ai/messages/<id>, long-polling until it is ready, so model latency
+overlaps the leaderboard fetch and a slow model ties up pool threads rather
+than request workers. Rows live in the database so any worker can answer.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from models import db, AIMessage
+
+# Model calls run on at most this many threads per worker
+MAX_WORKERS = 4
+
+# Messages queued or running per worker; beyond this new ones get the fallback
+MAX_PENDING = 32
+
+# Longest long-poll a client may ask for (seconds)
+MAX_WAIT = 10.0
+
+# How often a long-poll re-reads a message finished by another worker (seconds)
+POLL_INTERVAL = 0.25
+
+
+class MessageJobs:
+    """Bounded background generation of pending AIMessage rows"""
+
+    def __init__(self, max_workers: int = MAX_WORKERS, max_pending: int = MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-message')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._events = {}  # message_id -> Event set when this worker finishes it
+        self._lock = threading.Lock()
+
+    def submit(self, app, message_id, generate, fallback):
+        """Fill in a committed pending message with generate(), or fallback if it fails or we're saturated"""
+        if not self._slots.acquire(blocking=False):
+            with app.app_context():
+                self._finish(message_id, fallback, False)
+            return False
+
+        with self._lock:
+            self._events[message_id] = threading.Event()
+        self._executor.submit(self._run, app, message_id, generate, fallback)
+        return True
+
+    def _run(self, app, message_id, generate, fallback):
+        try:
+            with app.app_context():
+                try:
+                    message = generate()
+                except Exception as e:
+                    print(f"AI message generation error: {e}")
+                    message = None
+                try:
+                    self._finish(message_id, message or fallback, message is not None)
+                finally:
+                    db.session.remove()
+        finally:
+            self._slots.release()
+            with self._lock:
+                event = self._events.pop(message_id, None)
+            if event:
+                event.set()
+
+    @staticmethod
+    def _finish(message_id, message, ai_generated):
+        AIMessage.query.filter_by(id=message_id, status='pending').update(
+            {'status': 'ready', 'message': message, 'ai_generated': ai_generated},
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    def wait(self, message_id, timeout: float):
+        """The message, waiting up to timeout seconds for it to stop being pending; None if unknown"""
+        # Written so nan waits 0 rather than passing through the clamp
+        deadline = time.monotonic() + (min(timeout, MAX_WAIT) if timeout > 0 else 0.0)
+        while True:
+            message = db.session.get(AIMessage, message_id)
+            remaining = deadline - time.monotonic()
+            if message is None or message.status != 'pending' or remaining <= 0:
+                return message
+
+            # Don't hold a pooled connection (or a snapshot) while we wait
+            db.session.close()
+            with self._lock:
+                event = self._events.get(message_id)
+            if event:
+                event.wait(remaining)
+            else:
+                time.sleep(min(POLL_INTERVAL, remaining))
+
+
+message_jobs = MessageJobs()
@@ -0,0 +1,124 @@
+"""
+Pre-generated AI performance messages, kept in memory per worker.
+
+A background thread asks the LLM for message templates per performance tier,
+with {NICKNAME}, {WPM} and {ACCURACY} placeholders, and keeps each tier's pool
+topped up. Requests take the least recently used template and fill in the
+player's stats, so finishing a game never waits on the model. Templates
+expire after TEMPLATE_TTL seconds so the messages keep changing.
+"""
+
+import threading
+import time
+from collections import deque
+
+# Templates kept per tier
+POOL_SIZE = 12
+
+# Seconds a template stays in rotation before it is replaced
+TEMPLATE_TTL = 30 * 60
+
+# Seconds the refill thread sleeps once every pool is full
+REFILL_INTERVAL = 5.0
+
+# Seconds to back off after a failed generation
+ERROR_BACKOFF = 30.0
+
+PLACEHOLDERS = ('{NICKNAME}', '{WPM}', '{ACCURACY}')
+
+
+def clean_template(text: str):
+    """Normalize a generated template, or None if it can't be used"""
+    text = text.strip().strip('"\'')
+    if not text or len(text) > 120:
+        return None
+
+    # Reject templates with braces other than our placeholders
+    stripped = text
+    for placeholder in PLACEHOLDERS:
+        stripped = stripped.replace(placeholder, '')
+    if '{' in stripped or '}' in stripped:
+        return None
+    return text
+
+
+def render(template: str, nickname: str, wpm, accuracy) -> str:
+    """Fill a template's placeholders with the player's stats"""
+    message = (template
+               .replace('{NICKNAME}', nickname)
+               .replace('{WPM}', str(wpm))
+               .replace('{ACCURACY}', str(accuracy)))
+    if len(message) > 150:
+        message = message[:147] + "..."
+    return message
+
+
+class MessagePool:
+    """Per-tier template pools refilled by a background thread"""
+
+    def __init__(self, tiers, generate):
+        # generate(tier) -> template text; may raise on model errors
+        self.tiers = list(tiers)
+        self.generate = generate
+        self._pools = {tier: deque() for tier in self.tiers}  # (template, created_at), LRU first
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the refill thread once per worker process"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='message-pool', daemon=True)
+            self._thread.start()
+
+    def take(self, tier):
+        """Least recently used live template for a tier, or None if the pool is empty"""
+        now = time.monotonic()
+        with self._lock:
+            pool = self._pools[tier]
+            while pool and now - pool[0][1] > TEMPLATE_TTL:
+                pool.popleft()
+            if not pool:
+                return None
+            entry = pool.popleft()
+            pool.append(entry)  # Most recently used goes to the back
+            return entry[0]
+
+    def add(self, tier, template):
+        with self._lock:
+            pool = self._pools[tier]
+            if len(pool) >= POOL_SIZE:
+                pool.popleft()
+            pool.append((template, time.monotonic()))
+
+    def sizes(self):
+        with self._lock:
+            return {tier: len(pool) for tier, pool in self._pools.items()}
+
+    def _needs_refill(self, tier):
+        """Whether a tier is below target, counting templates that are about to expire as gone"""
+        horizon = time.monotonic() - TEMPLATE_TTL + REFILL_INTERVAL * len(self.tiers)
+        with self._lock:
+            return sum(1 for _, created in self._pools[tier] if created > horizon) < POOL_SIZE
+
+    def refill_once(self):
+        """Generate one template for each tier that is short; returns how many were added"""
+        added = 0
+        for tier in self.tiers:
+            if not self._needs_refill(tier):
+                continue
+            template = clean_template(self.generate(tier))
+            if template:
+                self.add(tier, template)
+                added += 1
+        return added
+
+    def _run(self):
+        while True:
+            try:
+                if not self.refill_once():
+                    time.sleep(REFILL_INTERVAL)
+            except Exception as e:
+                print(f"Message pool refill error: {e}")
+                time.sleep(ERROR_BACKOFF)
@@ -0,0 +1,148 @@
+"""
+Request and database metrics, exposed as Prometheus text at /api/metrics.
+
+Every request records its latency, how many SQL statements it ran and how
+long they took, labelled by route. SQL is counted with engine events, and
+pool checkouts are timed so connection starvation shows up separately from
+slow queries.
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set in gunicorn.conf.py) makes
+prometheus_client keep each worker's values in shared files, and the
+endpoint aggregates all workers, whichever one answers the scrape.
+"""
+
+import os
+import threading
+import time
+from flask import Response, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from models import db
+
+# Statements per request: most routes should sit in the first few buckets
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency', ['endpoint', 'method', 'status'],
+)
+REQUEST_STATEMENTS = Histogram(
+    'http_request_sql_statements', 'SQL statements run per request', ['endpoint', 'method'],
+    buckets=STATEMENT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds', 'Time spent executing SQL per request', ['endpoint', 'method'],
+)
+SQL_STATEMENTS = Counter(
+    'sql_statements', 'SQL statements executed, in requests or background threads', ['context'],
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds', 'Time waiting for a pooled connection',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+POOL_IN_USE = Gauge(
+    'db_pool_connections_in_use', 'Connections checked out of the pool', multiprocess_mode='livesum',
+)
+
+# SQL accounting for the request running on this thread
+_current = threading.local()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Counted here: a failed statement never reaches after_cursor_execute
+    stats = getattr(_current, 'stats', None)
+    if stats is None:
+        SQL_STATEMENTS.labels('background').inc()
+    else:
+        SQL_STATEMENTS.labels('request').inc()
+        stats[0] += 1
+    # One statement runs on a connection at a time, so one start time per connection
+    conn.info['query_started'] = time.perf_counter()
+
+
+def _query_finished(conn):
+    started = conn.info.pop('query_started', None)
+    stats = getattr(_current, 'stats', None)
+    if started is not None and stats is not None:
+        stats[1] += time.perf_counter() - started
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _query_finished(conn)
+
+
+def _handle_error(context):
+    # Failed statements are timed too, and leave no start time behind on the pooled connection
+    if context.connection is not None:
+        _query_finished(context.connection)
+
+
+def _endpoint():
+    """Route template as the label (bounded cardinality); 'unmatched' for 404s"""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def _start_request():
+    _current.stats = [0, 0.0]  # statements, seconds
+    _current.started = time.perf_counter()
+
+
+def _observe(status):
+    stats = _current.stats
+    _current.stats = None
+
+    endpoint, method = _endpoint(), request.method
+    REQUEST_LATENCY.labels(endpoint, method, str(status)).observe(time.perf_counter() - _current.started)
+    REQUEST_STATEMENTS.labels(endpoint, method).observe(stats[0])
+    REQUEST_DB_TIME.labels(endpoint, method).observe(stats[1])
+
+
+def _record_request(response):
+    if getattr(_current, 'stats', None) is not None:
+        _observe(response.status_code)
+    return response
+
+
+def _record_failed_request(exception):
+    # An unhandled exception can skip after_request; the request still counts, as a 500
+    if getattr(_current, 'stats', None) is not None:
+        _observe(500)
+
+
+def metrics_response():
+    """Prometheus text for every worker's metrics (or just this process outside gunicorn)"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+
+def init_metrics(app):
+    """Instrument the app's requests and engine, and serve /api/metrics"""
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    app.teardown_request(_record_failed_request)
+    app.add_url_rule('/api/metrics', 'metrics', metrics_response)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+    event.listen(engine.pool, 'checkout', lambda *args: POOL_IN_USE.inc())
+    event.listen(engine.pool, 'checkin', lambda *args: POOL_IN_USE.dec())
@@ -7,12 +7,27 @@ db = SQLAlchemy()
 def generate_uuid():
     return str(uuid.uuid4())
 
+def normalize_email(email):
+    """Canonical form of an email for uniqueness ('  Bob@Example.COM ' -> 'bob@example.com')"""
+    return (email or '').strip().lower()
+
+
+def email_domain(email):
+    """Normalized domain of an email address ('Bob@Example.COM ' -> 'example.com'), or None"""
+    email = normalize_email(email)
+    if '@' not in email:
+        return None
+    return email.rsplit('@', 1)[1] or None
+
+
 class Player(db.Model):
     __tablename__ = 'players'
 
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     nickname = db.Column(db.String(50), nullable=False)
-    email = db.Column(db.String(255), nullable=False)
+    email = db.Column(db.String(255), nullable=False)  # As first entered; trigram-indexed by backfill_email_domains.py
+    email_normalized = db.Column(db.String(255), unique=True, nullable=False)  # normalize_email(email); one player per address
+    email_domain = db.Column(db.String(255), nullable=True, index=True)  # Lowercased part after the last @
     is_hidden = db.Column(db.Boolean, default=False)  # Hide from leaderboard
     email_type = db.Column(db.String(50), nullable=True)  # Classification: do_employee, company, personal, suspicious, typo
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -32,6 +47,10 @@ class Player(db.Model):
 
 class Prompt(db.Model):
     __tablename__ = 'prompts'
+    __table_args__ = (
+        # Random prompt within a difficulty band: WHERE is_active AND difficulty_score BETWEEN ? AND ?
+        db.Index('ix_prompts_difficulty_score', 'is_active', 'difficulty_score'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     text = db.Column(db.Text, nullable=False)
@@ -41,6 +60,15 @@ class Prompt(db.Model):
     times_used = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Typing-difficulty metrics computed from the text (see difficulty.py)
+    char_count = db.Column(db.Integer, nullable=True)
+    punctuation_density = db.Column(db.Float, nullable=True)
+    digit_density = db.Column(db.Float, nullable=True)
+    shifted_ratio = db.Column(db.Float, nullable=True)
+    same_finger_bigram_rate = db.Column(db.Float, nullable=True)
+    hand_alternation_rate = db.Column(db.Float, nullable=True)
+    difficulty_score = db.Column(db.Float, nullable=True)  # 0-100
+
     scores = db.relationship('Score', backref='prompt', lazy=True)
 
     def to_dict(self):
@@ -51,6 +79,15 @@ class Prompt(db.Model):
             'difficulty': self.difficulty,
             'is_active': self.is_active,
             'times_used': self.times_used,
+            'difficulty_score': self.difficulty_score,
+            'metrics': {
+                'char_count': self.char_count,
+                'punctuation_density': self.punctuation_density,
+                'digit_density': self.digit_density,
+                'shifted_ratio': self.shifted_ratio,
+                'same_finger_bigram_rate': self.same_finger_bigram_rate,
+                'hand_alternation_rate': self.hand_alternation_rate,
+            },
             'created_at': self.created_at.isoformat()
         }
 
@@ -108,6 +145,10 @@ class EventConsent(db.Model):
 
 class Score(db.Model):
     __tablename__ = 'scores'
+    __table_args__ = (
+        # Keyset pagination of a board: WHERE event_id = ? AND (score, id) < (?, ?)
+        db.Index('ix_scores_board', 'event_id', db.desc('score'), db.desc('id')),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
     player_id = db.Column(db.String(36), db.ForeignKey('players.id'), nullable=False)
@@ -117,9 +158,11 @@ class Score(db.Model):
     score = db.Column(db.Integer, nullable=False)
     event_id = db.Column(db.String(36), db.ForeignKey('events.id'), nullable=True)
     started_at = db.Column(db.DateTime, nullable=True)
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=True)  # Client-generated, dedupes retried submissions
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
+    def to_dict(self, player=None):
+        player = player or self.player
         return {
             'id': self.id,
             'player_id': self.player_id,
@@ -130,5 +173,105 @@ class Score(db.Model):
             'event_id': self.event_id,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'created_at': self.created_at.isoformat(),
-            'player': self.player.to_dict() if self.player else None
+            'player': player.to_dict() if player else None
+        }
+
+
+class PlayerBest(db.Model):
+    """Best score per player per board, maintained by create_score"""
+    __tablename__ = 'player_bests'
+    __table_args__ = (
+        db.UniqueConstraint('player_id', 'event_key', name='uq_player_best_event'),
+        db.Index('ix_player_bests_board', 'event_key', db.desc('score'), db.desc('id')),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    player_id = db.Column(db.String(36), db.ForeignKey('players.id'), nullable=False)
+    event_key = db.Column(db.String(36), nullable=False, default='')  # event_id, or '' for the default board
+    score_id = db.Column(db.String(36), db.ForeignKey('scores.id'), nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+    wpm = db.Column(db.Integer, nullable=False)
+    accuracy = db.Column(db.Float, nullable=False)
+    achieved_at = db.Column(db.DateTime, nullable=False)
+
+    player = db.relationship('Player', lazy=True)
+
+
+class PlayerStats(db.Model):
+    """Lifetime totals per player across all boards, maintained by create_score"""
+    __tablename__ = 'player_stats'
+
+    player_id = db.Column(db.String(36), db.ForeignKey('players.id'), primary_key=True)
+    games_played = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Integer, nullable=False, default=0)
+    sum_wpm = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_accuracy = db.Column(db.Float, nullable=False, default=0)  # Sum of 0-1 accuracies
+    last_played_at = db.Column(db.DateTime, nullable=True)
+
+
+class CacheGeneration(db.Model):
+    """Generation counters shared by all workers for cache invalidation"""
+    __tablename__ = 'cache_generations'
+
+    name = db.Column(db.String(100), primary_key=True)
+    generation = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class ScoreHistogram(db.Model):
+    """Number of leaderboard entries at each score, per board, maintained by create_score"""
+    __tablename__ = 'score_histograms'
+
+    event_key = db.Column(db.String(36), primary_key=True)  # event_id, or '' for the default board
+    period = db.Column(db.String(10), primary_key=True)  # 'YYYY-MM-DD' for daily boards, 'all' for all-time
+    score = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class AIMessage(db.Model):
+    """Performance message for a submitted score, generated in the background"""
+    __tablename__ = 'ai_messages'
+
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    score_id = db.Column(db.String(36), db.ForeignKey('scores.id'), nullable=True)
+    tier = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, ready
+    message = db.Column(db.Text, nullable=True)
+    ai_generated = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'message': self.message,
+            'tier': self.tier,
+            'ai_generated': self.ai_generated,
+        }
+
+
+class Job(db.Model):
+    """Background admin job, with progress readable from any worker"""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    params = db.Column(db.JSON, nullable=True)
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    counts = db.Column(db.JSON, nullable=True)  # Summary counts, e.g. per verdict
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'params': self.params,
+            'processed': self.processed,
+            'counts': self.counts or {},
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
         }
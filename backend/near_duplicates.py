@@ -0,0 +1,97 @@
+"""
+Near-duplicate detection for prompt texts.
+
+Texts are normalized and cut into overlapping character shingles. Each text
+gets a MinHash signature, whose matching positions estimate the Jaccard
+similarity of two shingle sets, and signatures are split into bands for
+locality-sensitive hashing: only texts sharing a whole band are compared, so
+a lookup touches a handful of candidates instead of the whole corpus.
+"""
+
+import hashlib
+import random
+import re
+from collections import defaultdict
+
+# Characters per shingle
+SHINGLE_SIZE = 5
+
+# Signature length, split into BANDS bands of NUM_PERM // BANDS rows
+NUM_PERM = 128
+BANDS = 32
+
+# Estimated Jaccard similarity at or above which two texts are duplicates
+DEFAULT_THRESHOLD = 0.6
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed: signatures must agree across processes and restarts
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    text = normalize(text)
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def signature(text: str) -> tuple:
+    """MinHash signature of a text's shingle set"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), 'little')
+        for s in shingles(text)
+    ]
+    return tuple(
+        min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(sig_a: tuple, sig_b: tuple) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class MinHashIndex:
+    """LSH index of MinHash signatures, keyed by caller-chosen ids"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._rows = NUM_PERM // BANDS
+        self._signatures = {}  # key -> signature
+        self._buckets = defaultdict(set)  # (band, band values) -> keys
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _bands(self, sig):
+        for band in range(BANDS):
+            yield band, sig[band * self._rows:(band + 1) * self._rows]
+
+    def add(self, key, text: str = None, sig: tuple = None):
+        sig = sig or signature(text)
+        self._signatures[key] = sig
+        for bucket in self._bands(sig):
+            self._buckets[bucket].add(key)
+
+    def query(self, text: str = None, sig: tuple = None):
+        """(key, similarity) of the most similar indexed text at or above the threshold, or None"""
+        sig = sig or signature(text)
+        candidates = set()
+        for bucket in self._bands(sig):
+            candidates |= self._buckets.get(bucket, set())
+
+        best = None
+        for key in candidates:
+            score = similarity(sig, self._signatures[key])
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
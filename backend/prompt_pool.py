@@ -0,0 +1,168 @@
+"""
+Per-worker pool of active prompts for game starts.
+
+Random selection is an O(1) choice from an in-memory index instead of
+ORDER BY random() over the prompts table. Each index entry is sorted by
+difficulty_score, so a numeric difficulty band is a bisect away. The pool reloads when the 'prompts'
+cache generation moves (bumped by the admin prompt routes), and times_used
+increments are buffered and written by a background thread in one batched
+UPDATE every FLUSH_INTERVAL seconds instead of one UPDATE per game.
+"""
+
+import atexit
+import bisect
+import random
+import threading
+import time
+from collections import Counter
+from sqlalchemy import Integer, String, column, update, values
+from models import db, Prompt
+from cache import bump_generation, current_generation
+
+# Generation counter bumped whenever prompts are created, edited or deleted
+PROMPTS_GENERATION = 'prompts'
+
+# Seconds between batched times_used flushes
+FLUSH_INTERVAL = 10.0
+
+
+class PromptPool:
+    """Active prompts indexed by (category, difficulty), None meaning any, sorted by difficulty_score"""
+
+    def __init__(self):
+        self._generation = None
+        self._index = {}
+        self._scores = {}  # Same keys: sorted difficulty scores, parallel to _index
+        self._lock = threading.Lock()
+        self._usage = Counter()
+        self._thread = None
+        self._app = None
+
+    def _load(self, generation):
+        index = {}
+        # Prompts without metrics yet sort last and never fall inside a band
+        query = Prompt.query.filter_by(is_active=True).order_by(
+            Prompt.difficulty_score.is_(None), Prompt.difficulty_score
+        )
+        for prompt in query:
+            data = prompt.to_dict()
+            for key in ((None, None), (prompt.category, None),
+                        (None, prompt.difficulty), (prompt.category, prompt.difficulty)):
+                index.setdefault(key, []).append(data)
+        scores = {
+            key: [p['difficulty_score'] if p['difficulty_score'] is not None else float('inf') for p in prompts]
+            for key, prompts in index.items()
+        }
+        with self._lock:
+            self._index = index
+            self._scores = scores
+            self._generation = generation
+
+    def prompts(self, category=None, difficulty=None, min_score=None, max_score=None):
+        """Active prompts matching the filters and difficulty_score band, reloading the pool if prompts changed"""
+        generation = current_generation(PROMPTS_GENERATION)
+        if generation != self._generation:
+            self._load(generation)
+        key = (category or None, difficulty or None)
+        with self._lock:
+            prompts = self._index.get(key, [])
+            scores = self._scores.get(key, [])
+        if min_score is None and max_score is None:
+            return prompts
+
+        low = bisect.bisect_left(scores, min_score) if min_score is not None else 0
+        high = bisect.bisect_right(scores, max_score) if max_score is not None else bisect.bisect_left(scores, float('inf'))
+        return prompts[low:high]
+
+    def random(self, category=None, difficulty=None, min_score=None, max_score=None):
+        """A random active prompt as a dict, or None if none match"""
+        candidates = self.prompts(category, difficulty, min_score, max_score)
+        return random.choice(candidates) if candidates else None
+
+    def sample(self, count, category=None, difficulty=None, exclude=(), min_score=None, max_score=None):
+        """Up to count distinct random prompts, avoiding ids in exclude while others remain"""
+        candidates = self.prompts(category, difficulty, min_score, max_score)
+        exclude = set(exclude)
+        fresh = [p for p in candidates if p['id'] not in exclude] if exclude else candidates
+        picked = random.sample(fresh, min(count, len(fresh)))
+        if len(picked) < count:
+            # The session has seen every prompt: start repeating the ones it saw
+            seen = [p for p in candidates if p['id'] in exclude]
+            picked += random.sample(seen, min(count - len(picked), len(seen)))
+        return picked
+
+    @property
+    def version(self):
+        """Token identifying the pool contents this worker serves"""
+        return self._generation
+
+    def start(self, app):
+        """Start the flush thread once per worker process"""
+        with self._lock:
+            self._app = app
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='prompt-usage', daemon=True)
+            self._thread.start()
+
+    def record_use(self, prompt_id, count=1):
+        """Buffer a times_used increment; the flush thread writes it within FLUSH_INTERVAL"""
+        with self._lock:
+            self._usage[prompt_id] += count
+
+    def flush(self) -> bool:
+        """Write buffered times_used increments in one UPDATE ... FROM (VALUES ...).
+
+        If the UPDATE fails the increments go back into the buffer for the
+        next flush. Returns whether everything buffered was written.
+        """
+        with self._lock:
+            usage, self._usage = self._usage, Counter()
+        if not usage:
+            return True
+
+        increments = values(
+            column('id', String), column('uses', Integer), name='increments'
+        ).data(list(usage.items()))
+        try:
+            db.session.execute(
+                update(Prompt)
+                .where(Prompt.id == increments.c.id)
+                .values(times_used=Prompt.times_used + increments.c.uses)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            with self._lock:
+                self._usage.update(usage)
+            print(f"Prompt usage flush error: {e}")
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            with self._app.app_context():
+                try:
+                    self.flush()
+                finally:
+                    db.session.remove()
+
+
+prompt_pool = PromptPool()
+
+
+def invalidate_prompts():
+    """Make every worker reload its pool (commits with the caller's transaction)"""
+    bump_generation(PROMPTS_GENERATION)
+
+
+def start_usage_flushing(app):
+    """Flush buffered usage counts every FLUSH_INTERVAL, and once more when the worker shuts down"""
+    prompt_pool.start(app)
+
+    def flush():
+        with app.app_context():
+            prompt_pool.flush()
+    atexit.register(flush)
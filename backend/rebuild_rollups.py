@@ -0,0 +1,103 @@
+"""
+Rebuild the rollup tables (see rollups.py) from the scores table.
+Run this once after deploying a new rollup, or to repair drift: python rebuild_rollups.py
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import select, func, literal, String, cast
+from app import create_app
+from models import db, Score, Player, PlayerBest, PlayerStats, ScoreHistogram
+from rollups import ALL_TIME
+
+
+def rebuild_player_bests():
+    """Recompute the best score per player per board"""
+    board = func.coalesce(Score.event_id, '')
+
+    # DISTINCT ON keeps the first row per (player, board), i.e. the best score
+    best_scores = select(
+        cast(func.gen_random_uuid(), String),
+        Score.player_id,
+        board,
+        Score.id,
+        Score.score,
+        Score.wpm,
+        Score.accuracy,
+        Score.created_at,
+    ).distinct(Score.player_id, board).order_by(
+        Score.player_id, board, Score.score.desc(), Score.created_at
+    )
+
+    PlayerBest.query.delete()
+    db.session.execute(
+        PlayerBest.__table__.insert().from_select(
+            ['id', 'player_id', 'event_key', 'score_id', 'score', 'wpm', 'accuracy', 'achieved_at'],
+            best_scores,
+        )
+    )
+    db.session.commit()
+    print(f"Rebuilt player_bests: {PlayerBest.query.count()} rows")
+
+
+def rebuild_player_stats():
+    """Recompute each player's lifetime totals"""
+    totals = select(
+        Score.player_id,
+        func.count(),
+        func.max(Score.score),
+        func.sum(Score.wpm),
+        func.sum(Score.accuracy),
+        func.max(Score.created_at),
+    ).group_by(Score.player_id)
+
+    PlayerStats.query.delete()
+    db.session.execute(
+        PlayerStats.__table__.insert().from_select(
+            ['player_id', 'games_played', 'best_score', 'sum_wpm', 'sum_accuracy', 'last_played_at'],
+            totals,
+        )
+    )
+    db.session.commit()
+    print(f"Rebuilt player_stats: {PlayerStats.query.count()} rows")
+
+
+def rebuild_score_histograms():
+    """Recount the per-board score histograms from scores and player_bests (visible players only)"""
+    board = func.coalesce(Score.event_id, '')
+    day = func.to_char(Score.created_at, 'YYYY-MM-DD')
+
+    daily_counts = select(
+        board, day, Score.score, func.count()
+    ).join(Player, Player.id == Score.player_id).filter(
+        Player.is_hidden == False
+    ).group_by(board, day, Score.score)
+
+    all_time_counts = select(
+        PlayerBest.event_key, literal(ALL_TIME), PlayerBest.score, func.count()
+    ).join(Player, Player.id == PlayerBest.player_id).filter(
+        Player.is_hidden == False
+    ).group_by(PlayerBest.event_key, PlayerBest.score)
+
+    ScoreHistogram.query.delete()
+    columns = ['event_key', 'period', 'score', 'count']
+    db.session.execute(ScoreHistogram.__table__.insert().from_select(columns, daily_counts))
+    db.session.execute(ScoreHistogram.__table__.insert().from_select(columns, all_time_counts))
+    db.session.commit()
+    print(f"Rebuilt score_histograms: {ScoreHistogram.query.count()} rows")
+
+
+def rebuild_rollups():
+    """Rebuild every rollup table"""
+    app = create_app()
+
+    with app.app_context():
+        rebuild_player_bests()
+        rebuild_player_stats()
+        rebuild_score_histograms()
+
+
+if __name__ == '__main__':
+    rebuild_rollups()
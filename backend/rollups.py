@@ -0,0 +1,267 @@
+"""
+Incrementally maintained rollup tables.
+
+The write path (create_score) builds one upsert per rollup and runs them
+together with execute_together, inside the caller's transaction, so the
+rollups commit or roll back together with the score. Use rebuild_rollups.py
+to backfill them from the scores table.
+"""
+
+from sqlalchemy.dialects.postgresql import insert
+from collections import Counter
+from sqlalchemy import case, func, literal, literal_column, select
+from models import db, PlayerBest, PlayerStats, ScoreHistogram, Score, generate_uuid
+
+# Histogram period for the all-time boards
+ALL_TIME = 'all'
+
+
+def event_key(event_id):
+    """Rollup key for a board: the event id, or '' for the default board"""
+    return event_id or ''
+
+
+def daily_period(created_at):
+    """Histogram period for the daily board a score belongs to"""
+    return created_at.strftime('%Y-%m-%d')
+
+
+def player_best_upsert(scores):
+    """Statement upserting the players' best scores for the scores' boards"""
+    # A statement may touch each (player, board) row once, so keep the best per key
+    bests = {}
+    for score in scores:
+        key = (score.player_id, event_key(score.event_id))
+        if key not in bests or score.score > bests[key].score:
+            bests[key] = score
+
+    stmt = insert(PlayerBest).values([
+        {
+            'id': generate_uuid(),
+            'player_id': score.player_id,
+            'event_key': event_key(score.event_id),
+            'score_id': score.id,
+            'score': score.score,
+            'wpm': score.wpm,
+            'accuracy': score.accuracy,
+            'achieved_at': score.created_at,
+        }
+        for score in bests.values()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=['player_id', 'event_key'],
+        set_={
+            'score_id': stmt.excluded.score_id,
+            'score': stmt.excluded.score,
+            'wpm': stmt.excluded.wpm,
+            'accuracy': stmt.excluded.accuracy,
+            'achieved_at': stmt.excluded.achieved_at,
+        },
+        # Only replace when the new score is strictly better
+        where=PlayerBest.score < stmt.excluded.score,
+    )
+
+
+def player_stats_upsert(scores):
+    """Statement adding the scores to their players' lifetime totals"""
+    totals = {}
+    for score in scores:
+        row = totals.setdefault(score.player_id, {
+            'player_id': score.player_id,
+            'games_played': 0,
+            'best_score': score.score,
+            'sum_wpm': 0,
+            'sum_accuracy': 0.0,
+            'last_played_at': score.created_at,
+        })
+        row['games_played'] += 1
+        row['best_score'] = max(row['best_score'], score.score)
+        row['sum_wpm'] += score.wpm
+        row['sum_accuracy'] += score.accuracy
+        row['last_played_at'] = max(row['last_played_at'], score.created_at)
+
+    stmt = insert(PlayerStats).values(list(totals.values()))
+    return stmt.on_conflict_do_update(
+        index_elements=['player_id'],
+        set_={
+            'games_played': PlayerStats.games_played + stmt.excluded.games_played,
+            'best_score': func.greatest(PlayerStats.best_score, stmt.excluded.best_score),
+            'sum_wpm': PlayerStats.sum_wpm + stmt.excluded.sum_wpm,
+            'sum_accuracy': PlayerStats.sum_accuracy + stmt.excluded.sum_accuracy,
+            'last_played_at': func.greatest(PlayerStats.last_played_at, stmt.excluded.last_played_at),
+        },
+    )
+
+
+def histogram_upsert(deltas):
+    """Statement adding {(event_key, period, score): delta} to the histograms, or None if empty"""
+    rows = [
+        {'event_key': key, 'period': period, 'score': value, 'count': delta}
+        for (key, period, value), delta in deltas.items() if delta
+    ]
+    if not rows:
+        return None
+    stmt = insert(ScoreHistogram).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=['event_key', 'period', 'score'],
+        set_={'count': ScoreHistogram.count + stmt.excluded.count},
+    )
+
+
+def score_histogram_deltas(score, previous_best, deltas=None):
+    """Count a visible player's new score on its daily board and, if it's a new best, the all-time board"""
+    key = event_key(score.event_id)
+    deltas = Counter() if deltas is None else deltas
+    deltas[(key, daily_period(score.created_at), score.score)] += 1
+    if previous_best is None:
+        deltas[(key, ALL_TIME, score.score)] += 1
+    elif score.score > previous_best:
+        deltas[(key, ALL_TIME, previous_best)] -= 1
+        deltas[(key, ALL_TIME, score.score)] += 1
+    return deltas
+
+
+def execute_together(statements, returning=None):
+    """Run independent write statements as one round trip (data-modifying CTEs).
+
+    The statements must not touch the same row twice. If returning is one of
+    them (with a RETURNING clause), its rows are returned.
+    """
+    statements = [stmt for stmt in statements if stmt is not None]
+    if not statements:
+        return []
+    ctes = [stmt.cte(f'write_{i}') for i, stmt in enumerate(statements)]
+    if returning is None:
+        db.session.execute(select(literal(1)).add_cte(*ctes))
+        return []
+    returned = ctes[statements.index(returning)]
+    return db.session.execute(select(returned).add_cte(*ctes)).all()
+
+
+def score_rollup_statements(scores, previous_bests, hidden_player_ids=()):
+    """Rollup writes for new scores, in submission order.
+
+    previous_bests maps (player_id, event_key) to the player's best on that
+    board before these scores; hidden players only get their PlayerBest.
+    """
+    previous_bests = dict(previous_bests)
+    deltas = Counter()
+    for score in scores:
+        if score.player_id in hidden_player_ids:
+            continue
+        key = (score.player_id, event_key(score.event_id))
+        previous = previous_bests.get(key)
+        score_histogram_deltas(score, previous, deltas)
+        if previous is None or score.score > previous:
+            previous_bests[key] = score.score
+    return [player_best_upsert(scores), player_stats_upsert(scores), histogram_upsert(deltas)]
+
+
+def write_score_rollups(scores, previous_bests, hidden_player_ids=(), statements=()):
+    """Run the rollup writes for new scores, plus any other statements, as one round trip.
+
+    The caller reads previous_bests with the PlayerBest rows locked (FOR
+    UPDATE), so boards that already have a best are serialized. A board
+    with none yet can't be locked: if another transaction creates it first,
+    the all-time histogram delta is corrected from the upsert's result,
+    which the row conflict serializes.
+    """
+    best, *rollups = score_rollup_statements(scores, previous_bests, hidden_player_ids)
+    best = best.returning(
+        PlayerBest.player_id, PlayerBest.event_key,
+        (literal_column('xmax') == 0).label('inserted'),  # xmax is 0 for a freshly inserted row
+    )
+    written = {(row.player_id, row.event_key): row.inserted for row in
+               execute_together([best, *rollups, *statements], returning=best)}
+
+    # Visible players' boards this transaction expected to create, with its best score on each
+    created = {}
+    for score in scores:
+        key = (score.player_id, event_key(score.event_id))
+        if key not in previous_bests and score.player_id not in hidden_player_ids:
+            created[key] = max(created.get(key, score.score), score.score)
+    raced = {key: best_score for key, best_score in created.items() if not written.get(key)}
+    if raced:
+        _correct_raced_boards(raced, {score.id for score in scores}, written)
+
+
+def _correct_raced_boards(raced, score_ids, written):
+    """Undo the all-time +1 counted for boards another transaction created first.
+
+    That transaction has committed (the upsert waited on it), so its best is
+    the player's best on the board among scores other than these.
+    """
+    board = func.coalesce(Score.event_id, '')
+    theirs = {
+        (player_id, key): value for player_id, key, value in
+        db.session.query(Score.player_id, board, func.max(Score.score)).filter(
+            Score.player_id.in_({player_id for player_id, _ in raced}),
+            Score.id.notin_(score_ids),
+        ).group_by(Score.player_id, board)
+    }
+    deltas = Counter()
+    for (player_id, key), ours in raced.items():
+        if (player_id, key) in written:
+            # Ours replaced their best: it leaves the histogram, ours is already counted
+            deltas[(key, ALL_TIME, theirs[(player_id, key)])] -= 1
+        else:
+            # Their best stands: ours was counted as a second entry
+            deltas[(key, ALL_TIME, ours)] -= 1
+    stmt = histogram_upsert(deltas)
+    if stmt is not None:
+        db.session.execute(stmt)
+
+
+def adjust_player_histograms(player_id, sign):
+    """Remove (sign=-1) or restore (sign=+1) a player's entries, e.g. on hide/unhide"""
+    deltas = Counter()
+    for best in PlayerBest.query.filter_by(player_id=player_id):
+        deltas[(best.event_key, ALL_TIME, best.score)] += sign
+    scores = db.session.query(Score.event_id, Score.created_at, Score.score).filter_by(player_id=player_id)
+    for event_id, created_at, value in scores:
+        deltas[(event_key(event_id), daily_period(created_at), value)] += sign
+
+    stmt = histogram_upsert(deltas)
+    if stmt is not None:
+        db.session.execute(stmt)
+
+
+def histogram_rank(key, period, value):
+    """Rank of a score on a board, with the board's size and percentile"""
+    better, total = db.session.query(
+        func.coalesce(func.sum(case((ScoreHistogram.score > value, ScoreHistogram.count), else_=0)), 0),
+        func.coalesce(func.sum(ScoreHistogram.count), 0),
+    ).filter(
+        ScoreHistogram.event_key == key,
+        ScoreHistogram.period == period,
+    ).one()
+
+    # Ties share the best rank; count the entry itself if it isn't in the histogram (hidden player)
+    rank = int(better) + 1
+    total = max(int(total), rank)
+    return {
+        'rank': rank,
+        'total': total,
+        'percentile': round(100.0 * (total - rank + 1) / total, 1),
+        'score': value,
+    }
+
+
+def histogram_ranks(key, period, values):
+    """Ranks for several scores on one board, from a single range read of its histogram"""
+    if not values:
+        return {}
+    low, high = min(values), max(values)
+    board = (ScoreHistogram.event_key == key, ScoreHistogram.period == period)
+
+    above_high = db.session.query(
+        func.coalesce(func.sum(ScoreHistogram.count), 0)
+    ).filter(*board, ScoreHistogram.score > high).scalar()
+    in_range = db.session.query(ScoreHistogram.score, ScoreHistogram.count).filter(
+        *board, ScoreHistogram.score.between(low, high)
+    ).all()
+
+    return {
+        value: 1 + int(above_high) + sum(count for other, count in in_range if other > value)
+        for value in set(values)
+    }
@@ -1,147 +1,17 @@
-from flask import Blueprint, request, jsonify
-from sqlalchemy import func, or_, cast, Numeric
-from models import db, Player, Score
-import re
+from collections import Counter
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import func, or_, select, update
+from models import db, Player, PlayerStats, Score, EventConsent, Job
+from exports import FORMATS, stream_export
+from email_classifier import DO_DOMAINS, email_classifier
+from jobs import start_job
 
 admin_bp = Blueprint('admin', __name__)
 
-# DO team domains
-DO_DOMAINS = ['digitalocean.com', 'ajot.me']
-
-# Known personal email providers
-PERSONAL_DOMAINS = [
-    'gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com', 'icloud.com',
-    'aol.com', 'protonmail.com', 'proton.me', 'live.com', 'msn.com',
-    'me.com', 'mac.com', 'mail.com', 'ymail.com', 'googlemail.com',
-    'fastmail.com', 'zoho.com', 'tutanota.com', 'hey.com'
-]
-
-# Obviously fake domains
-FAKE_DOMAINS = [
-    'test.com', 'example.com', 'fake.com', 'asdf.com', 'xyz.com',
-    'aaa.com', 'abc.com', '123.com', 'temp.com', 'tempmail.com',
-    'mailinator.com', 'guerrillamail.com', 'throwaway.com',
-    'fakeemail.com', 'noemail.com', 'none.com', 'na.com', 'n.com',
-    'x.com', 'a.com', 'aa.com', 'aaaa.com', 'testing.com',
-    'do.com', 'robot.com', 'secret.com', 'email.com', 'mail.co'
-]
-
-# Suspicious TLDs often used for fake emails
-FAKE_TLDS = ['.xyz', '.tk', '.ml', '.ga', '.cf', '.gq']
-
-# Common TLD typos (misspellings of .com, .net, .org, etc.)
-TYPO_TLDS = [
-    '.co', '.con', '.cmo', '.ocm', '.vom', '.xom', '.om',  # .com typos
-    '.ner', '.nte', '.bet', '.met',                         # .net typos
-    '.ogr', '.otg', '.prg',                                 # .org typos
-    '.gmai', '.gmial', '.gmal',                             # gmail typos (in domain)
-]
-
-# Fake username patterns (regex)
-FAKE_USERNAME_PATTERNS = [
-    r'^test\d*$',           # test, test1, test123
-    r'^asdf+$',             # asdf, asdfasdf
-    r'^[a-z]$',             # single letter
-    r'^[a-z]{1,2}\d*$',     # a1, ab, ab123
-    r'^fake',               # fake, fakeuser
-    r'^none$',
-    r'^na$',
-    r'^null$',
-    r'^admin$',
-    r'^user\d*$',           # user, user1
-    r'^demo\d*$',           # demo, demo1
-    r'^sample\d*$',
-    r'^\d+$',               # all numbers
-    r'^x+$',                # x, xx, xxx
-    r'^aaa+$',              # aaa, aaaa
-    r'^player\d*$',         # player, player1
-    r'^hello$',             # hello
-    r'^noemail$',           # noemail
-    r'^secret$',            # secret
-    r'^xyz$',               # xyz
-    r'^lol$',               # lol
-    r'^lmao$',              # lmao
-    r'^hi$',                # hi
-    r'^hey$',               # hey
-    r'^yo$',                # yo
-    r'^blah$',              # blah
-    r'^foo$',               # foo
-    r'^bar$',               # bar
-    r'^baz$',               # baz
-    r'^qwerty',             # qwerty, qwerty123
-    r'^abcd*$',             # abc, abcd, abcde
-    r'.*[!@#$%^&*()+=].*',  # special chars in username (except . - _)
-]
-
-
-def classify_email(email: str) -> str:
-    """Classify an email using deterministic rules"""
-    email = email.lower().strip()
-
-    if '@' not in email:
-        return 'fake'
-
-    username, domain = email.rsplit('@', 1)
-    domain_name = domain.split('.')[0] if '.' in domain else domain
-
-    # 1. Check DO domains FIRST - trust the domain, but reject obviously fake usernames
-    if domain in DO_DOMAINS:
-        # Only reject truly fake test usernames for DO domains
-        if username in ['test', 'asdf', 'fake', 'null', 'admin', 'user', 'demo', 'sample']:
-            return 'suspicious'
-        return 'do_employee'
-
-    # 2. Check fake username patterns (for non-DO emails)
-    for pattern in FAKE_USERNAME_PATTERNS:
-        if re.match(pattern, username):
-            return 'suspicious'
-
-    # 3. Check if username matches domain (secret@secret.com)
-    if username == domain_name:
-        return 'suspicious'
-
-    # 4. Check obviously fake domains
-    if domain in FAKE_DOMAINS:
-        return 'suspicious'
-
-    # 5. Check for suspicious TLDs
-    for tld in FAKE_TLDS:
-        if domain.endswith(tld):
-            return 'suspicious'
-
-    # 6. Check for TLD typos (e.g., gmail.co, gmail.con)
-    for typo in TYPO_TLDS:
-        if domain.endswith(typo):
-            return 'typo'
-
-    # 7. Check for very short domains (like do.com, x.co)
-    if len(domain_name) <= 2:
-        return 'suspicious'
-
-    # 8. Check for no TLD or malformed domain
-    if domain.count('.') == 0:
-        return 'suspicious'
-
-    # 8. Check personal email providers
-    if domain in PERSONAL_DOMAINS:
-        return 'personal'
-
-    # 9. Everything else is likely a company email
-    # (real domain, not a known personal provider)
-    return 'company'
 
-
-@admin_bp.route('/api/admin/stats', methods=['GET'])
-def get_stats():
-    """Get admin dashboard stats with optional email filter"""
-    email_filter = request.args.get('email', '').strip()
-    do_filter = request.args.get('do_filter', 'all').strip()  # 'all', 'only_do', 'exclude_do'
-
-    # DO team email patterns (with @ prefix for SQL matching)
-    do_domain_patterns = [f'@{d}' for d in DO_DOMAINS]
-
-    # Base query for players with scores
-    # Use cast to Numeric for PostgreSQL round() compatibility
+def player_stats_query(email_filter, do_filter):
+    """Visible players with their lifetime totals, filtered like the dashboard, most games first"""
+    # Players with their lifetime totals from the player_stats rollup (no scan of scores)
     query = db.session.query(
         Player.id,
         Player.email,
@@ -149,44 +19,53 @@ def get_stats():
         Player.is_hidden,
         Player.email_type,
         Player.created_at,
-        func.count(Score.id).label('games_played'),
-        func.max(Score.score).label('best_score'),
-        func.round(cast(func.avg(Score.wpm), Numeric), 1).label('avg_wpm'),
-        func.round(cast(func.avg(Score.accuracy * 100), Numeric), 1).label('avg_accuracy')
-    ).outerjoin(Score, Player.id == Score.player_id)
+        func.coalesce(PlayerStats.games_played, 0).label('games_played'),
+        PlayerStats.best_score,
+        PlayerStats.sum_wpm,
+        PlayerStats.sum_accuracy,
+    ).outerjoin(PlayerStats, Player.id == PlayerStats.player_id)
 
     # Exclude hidden players
     query = query.filter(Player.is_hidden == False)
 
-    # Apply DO filter (use ilike for case-insensitive matching)
+    # Apply DO filter (equality on the indexed, lowercased email_domain)
     if do_filter == 'only_do':
         # Only show DO team members
-        do_conditions = [Player.email.ilike(f'%{domain}') for domain in do_domain_patterns]
-        query = query.filter(or_(*do_conditions))
+        query = query.filter(Player.email_domain.in_(DO_DOMAINS))
     elif do_filter == 'exclude_do':
         # Exclude DO team members
-        for domain in do_domain_patterns:
-            query = query.filter(~Player.email.ilike(f'%{domain}'))
+        query = query.filter(or_(Player.email_domain == None, Player.email_domain.notin_(DO_DOMAINS)))
 
     # Apply email filter if provided
     if email_filter:
         # Support comma-separated emails or domains
-        filters = [f.strip() for f in email_filter.split(',')]
+        filters = [f.strip() for f in email_filter.split(',') if f.strip()]
         conditions = []
         for f in filters:
             if f.startswith('@'):
                 # Domain filter
-                conditions.append(Player.email.like(f'%{f}'))
+                conditions.append(Player.email_domain == f[1:].lower())
             else:
-                # Exact email or partial match
-                conditions.append(Player.email.like(f'%{f}%'))
-        query = query.filter(or_(*conditions))
+                # Exact email or partial match (trigram index)
+                conditions.append(Player.email.ilike(f'%{f}%'))
+        if conditions:
+            query = query.filter(or_(*conditions))
 
-    # Group by player and order by games played
-    players = query.group_by(
-        Player.id, Player.email, Player.nickname,
-        Player.is_hidden, Player.email_type, Player.created_at
-    ).order_by(func.count(Score.id).desc()).all()
+    # Order by games played
+    return query.order_by(func.coalesce(PlayerStats.games_played, 0).desc())
+
+
+def average(total, games, scale=1):
+    return round(total * scale / games, 1) if games else 0
+
+
+@admin_bp.route('/api/admin/stats', methods=['GET'])
+def get_stats():
+    """Get admin dashboard stats with optional email filter"""
+    email_filter = request.args.get('email', '').strip()
+    do_filter = request.args.get('do_filter', 'all').strip()  # 'all', 'only_do', 'exclude_do'
+
+    players = player_stats_query(email_filter, do_filter).all()
 
     # Calculate totals
     total_players = len(players)
@@ -201,8 +80,8 @@ def get_stats():
         'email_type': p.email_type,
         'games_played': p.games_played or 0,
         'best_score': p.best_score or 0,
-        'avg_wpm': float(p.avg_wpm) if p.avg_wpm else 0,
-        'avg_accuracy': float(p.avg_accuracy) if p.avg_accuracy else 0,
+        'avg_wpm': average(p.sum_wpm, p.games_played),
+        'avg_accuracy': average(p.sum_accuracy, p.games_played, scale=100),
         'created_at': p.created_at.isoformat() if p.created_at else None
     } for p in players]
 
@@ -214,38 +93,159 @@ def get_stats():
     })
 
 
-@admin_bp.route('/api/admin/analyze-emails', methods=['POST'])
-def analyze_emails():
-    """Analyze all emails using deterministic rules and update verdicts"""
-    # Get all players without a verdict (or optionally re-analyze all)
-    reanalyze = request.json.get('reanalyze', False) if request.json else False
+def export_format():
+    """?format=csv (default) or ndjson, or None if unsupported"""
+    fmt = request.args.get('format', 'csv')
+    return fmt if fmt in FORMATS else None
+
+
+@admin_bp.route('/api/admin/export/players', methods=['GET'])
+def export_players():
+    """Stream visible players with their stats as CSV or NDJSON (same filters as /api/admin/stats)"""
+    fmt = export_format()
+    if not fmt:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    query = player_stats_query(
+        request.args.get('email', '').strip(),
+        request.args.get('do_filter', 'all').strip()
+    ).statement
+    if fmt == 'csv':
+        # The dashboard's EXPORT CSV layout
+        columns = ['Nickname', 'Email', 'Type', 'Games Played', 'Best Score', 'Avg WPM', 'Avg Accuracy']
+        return stream_export(query, columns, fmt, 'players', transform=lambda p: (
+            p.nickname, p.email, 'Shark' if p.email_type == 'do_employee' else (p.email_type or ''),
+            p.games_played, p.best_score or 0, average(p.sum_wpm, p.games_played),
+            f'{average(p.sum_accuracy, p.games_played, scale=100)}%',
+        ))
+
+    columns = ['id', 'nickname', 'email', 'email_type', 'games_played', 'best_score',
+               'avg_wpm', 'avg_accuracy', 'created_at']
+    return stream_export(query, columns, fmt, 'players', transform=lambda p: (
+        p.id, p.nickname, p.email, p.email_type, p.games_played, p.best_score or 0,
+        average(p.sum_wpm, p.games_played), average(p.sum_accuracy, p.games_played, scale=100),
+        p.created_at,
+    ))
+
+
+@admin_bp.route('/api/admin/export/scores', methods=['GET'])
+def export_scores():
+    """Stream every score, optionally for one event (?event_id=), as CSV or NDJSON"""
+    fmt = export_format()
+    if not fmt:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    query = select(
+        Score.id, Score.event_id, Score.player_id, Player.nickname, Player.email,
+        Score.prompt_id, Score.wpm, Score.accuracy, Score.score, Score.started_at, Score.created_at,
+    ).join(Player, Player.id == Score.player_id).order_by(Score.created_at)
+    event_id = request.args.get('event_id')
+    if event_id:
+        query = query.filter(Score.event_id == event_id)
+
+    columns = ['id', 'event_id', 'player_id', 'nickname', 'email', 'prompt_id',
+               'wpm', 'accuracy', 'score', 'started_at', 'created_at']
+    return stream_export(query, columns, fmt, f'scores-{event_id}' if event_id else 'scores')
+
+
+@admin_bp.route('/api/admin/export/consents', methods=['GET'])
+def export_consents():
+    """Stream an event's consent records (?event_id=, ?consented=true for the opt-in list) as CSV or NDJSON"""
+    fmt = export_format()
+    if not fmt:
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+    event_id = request.args.get('event_id')
+    if not event_id:
+        return jsonify({'error': 'event_id is required'}), 400
+
+    query = select(
+        EventConsent.player_id, Player.nickname, Player.email, EventConsent.consented,
+        EventConsent.consent_text, EventConsent.created_at,
+    ).join(Player, Player.id == EventConsent.player_id).filter(
+        EventConsent.event_id == event_id
+    ).order_by(EventConsent.created_at)
+    if request.args.get('consented') == 'true':
+        query = query.filter(EventConsent.consented == True)
+
+    columns = ['player_id', 'nickname', 'email', 'consented', 'consent_text', 'created_at']
+    return stream_export(query, columns, fmt, f'consents-{event_id}')
+
+
+# Most emails accepted by one /api/admin/classify-emails request
+MAX_CLASSIFY_BATCH = 10000
+
+# Players classified and updated per analyze-emails chunk
+ANALYZE_CHUNK_SIZE = 1000
+
+
+@admin_bp.route('/api/admin/classify-emails', methods=['POST'])
+def classify_emails():
+    """Classify a list of emails without touching players"""
+    data = request.get_json()
+    if not data or not isinstance(data.get('emails'), list):
+        return jsonify({'error': 'emails list is required'}), 400
+    if len(data['emails']) > MAX_CLASSIFY_BATCH:
+        return jsonify({'error': f'At most {MAX_CLASSIFY_BATCH} emails per request'}), 400
+    if not all(isinstance(email, str) for email in data['emails']):
+        return jsonify({'error': 'emails must be strings'}), 400
+
+    verdicts = email_classifier.classify_many(data['emails'])
+    return jsonify({
+        'results': [{'email': email, 'email_type': verdict} for email, verdict in zip(data['emails'], verdicts)]
+    })
 
-    if reanalyze:
-        players = Player.query.filter(Player.is_hidden == False).all()
-    else:
-        players = Player.query.filter(
-            Player.is_hidden == False,
-            (Player.email_type == None) | (Player.email_type == '')
-        ).all()
 
-    if not players:
-        return jsonify({'message': 'No emails to analyze', 'analyzed': 0})
+def analyze_emails_job(job):
+    """Classify players' emails in keyset chunks, one UPDATE per verdict per chunk"""
+    reanalyze = (job.params or {}).get('reanalyze', False)
+    query = db.session.query(Player.id, Player.email).filter(Player.is_hidden == False)
+    if not reanalyze:
+        query = query.filter((Player.email_type == None) | (Player.email_type == ''))
+
+    counts = Counter()
+    last_id = None
+    while True:
+        chunk_query = query.filter(Player.id > last_id) if last_id is not None else query
+        chunk = chunk_query.order_by(Player.id).limit(ANALYZE_CHUNK_SIZE).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        by_verdict = {}
+        for (player_id, _), verdict in zip(chunk, email_classifier.classify_many([email for _, email in chunk])):
+            by_verdict.setdefault(verdict, []).append(player_id)
+        for verdict, player_ids in by_verdict.items():
+            db.session.execute(
+                update(Player)
+                .where(Player.id.in_(player_ids))
+                .values(email_type=verdict)
+                .execution_options(synchronize_session=False)
+            )
+            counts[verdict] += len(player_ids)
+
+        # Progress commits with the chunk's updates
+        job.processed += len(chunk)
+        job.counts = dict(counts)
+        db.session.commit()
 
-    # Classify each email using rules
-    results = {}
-    updated = 0
 
-    for player in players:
-        verdict = classify_email(player.email)
-        player.email_type = verdict
-        results[player.email] = verdict
-        updated += 1
+@admin_bp.route('/api/admin/analyze-emails', methods=['POST'])
+def analyze_emails():
+    """Start a background job classifying emails with deterministic rules and updating verdicts"""
+    # Players without a verdict, or optionally re-analyze all
+    reanalyze = request.json.get('reanalyze', False) if request.json else False
 
-    db.session.commit()
+    job = start_job(
+        current_app._get_current_object(), 'analyze_emails', analyze_emails_job,
+        params={'reanalyze': bool(reanalyze)}
+    )
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
 
-    return jsonify({
-        'message': f'Analyzed {len(players)} emails',
-        'analyzed': len(players),
-        'updated': updated,
-        'results': results
-    })
+
+@admin_bp.route('/api/admin/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Progress and summary counts of a background admin job"""
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
@@ -1,71 +1,85 @@
-import os
-from flask import Blueprint, request, jsonify
+import math
+from flask import Blueprint, request, jsonify, current_app
+from datetime import datetime
+from models import generate_uuid
+from ai_client import ai_client
+from message_jobs import message_jobs
+from message_pool import MessagePool, clean_template, render as render_message
 
 ai_bp = Blueprint('ai', __name__)
 
 # Performance tier definitions
+PERFORMANCE_TIERS = {
+    'legendary': {
+        'tier': 'legendary',
+        'system_prompt': (
+            "You are an epic 80s arcade game announcer. Respond with a single victory "
+            "message in ALL CAPS. Be dramatic and over-the-top. Max 100 characters. No quotes."
+        ),
+        'user_prompt_template': (
+            "Player {nickname} just achieved LEGENDARY status: {wpm} WPM with {accuracy}% accuracy "
+            "in a typing game! Announce their glory!"
+        )
+    },
+    'excellent': {
+        'tier': 'excellent',
+        'system_prompt': (
+            "You are a cloud computing enthusiast who loves DigitalOcean puns. Give a "
+            "celebratory message with a cloud/server/deployment joke. Max 100 characters. No quotes."
+        ),
+        'user_prompt_template': (
+            "Player {nickname} scored {wpm} WPM with {accuracy}% accuracy. "
+            "Celebrate with a cloud computing pun!"
+        )
+    },
+    'great': {
+        'tier': 'great',
+        'system_prompt': (
+            "You are an encouraging tech mentor who uses cloud computing metaphors. "
+            "Be positive and motivating. Max 100 characters. No quotes."
+        ),
+        'user_prompt_template': (
+            "Player {nickname} scored {wpm} WPM with {accuracy}% accuracy. "
+            "Encourage them with a cloud/tech reference!"
+        )
+    },
+    'good': {
+        'tier': 'good',
+        'system_prompt': (
+            "You are a friendly coach who gently teases but stays encouraging. "
+            "Use a cloud/tech pun. Max 100 characters. No quotes."
+        ),
+        'user_prompt_template': (
+            "Player {nickname} scored {wpm} WPM with {accuracy}% accuracy. "
+            "Give them a light-hearted nudge to improve!"
+        )
+    },
+    'needs_practice': {
+        'tier': 'needs_practice',
+        'system_prompt': (
+            "You are a snarky but lovable robot who roasts bad performance with tech puns. "
+            "Keep it playful, not mean. Encourage retry. Max 100 characters. No quotes."
+        ),
+        'user_prompt_template': (
+            "Player {nickname} scored {wpm} WPM with {accuracy}% accuracy. "
+            "Give them a playful roast that makes them want to try again!"
+        )
+    },
+}
+
+
 def get_performance_tier(wpm: float, accuracy: float) -> dict:
     """Determine performance tier based on WPM and accuracy."""
     if wpm >= 80 and accuracy >= 0.95:
-        return {
-            'tier': 'legendary',
-            'system_prompt': (
-                "You are an epic 80s arcade game announcer. Respond with a single victory "
-                "message in ALL CAPS. Be dramatic and over-the-top. Max 100 characters. No quotes."
-            ),
-            'user_prompt_template': (
-                "Player {nickname} just achieved LEGENDARY status: {wpm} WPM with {accuracy}% accuracy "
-                "in a typing game! Announce their glory!"
-            )
-        }
+        return PERFORMANCE_TIERS['legendary']
     elif wpm >= 60 and accuracy >= 0.90:
-        return {
-            'tier': 'excellent',
-            'system_prompt': (
-                "You are a cloud computing enthusiast who loves DigitalOcean puns. Give a "
-                "celebratory message with a cloud/server/deployment joke. Max 100 characters. No quotes."
-            ),
-            'user_prompt_template': (
-                "Player {nickname} scored {wpm} WPM with {accuracy}% accuracy. "
-                "Celebrate with a cloud computing pun!"
-            )
-        }
+        return PERFORMANCE_TIERS['excellent']
     elif wpm >= 40 and accuracy >= 0.80:
-        return {
-            'tier': 'great',
-            'system_prompt': (
-                "You are an encouraging tech mentor who uses cloud computing metaphors. "
-                "Be positive and motivating. Max 100 characters. No quotes."
-            ),
-            'user_prompt_template': (
-                "Player {nickname} scored {wpm} WPM with {accuracy}% accuracy. "
-                "Encourage them with a cloud/tech reference!"
-            )
-        }
+        return PERFORMANCE_TIERS['great']
     elif wpm >= 20:
-        return {
-            'tier': 'good',
-            'system_prompt': (
-                "You are a friendly coach who gently teases but stays encouraging. "
-                "Use a cloud/tech pun. Max 100 characters. No quotes."
-            ),
-            'user_prompt_template': (
-                "Player {nickname} scored {wpm} WPM with {accuracy}% accuracy. "
-                "Give them a light-hearted nudge to improve!"
-            )
-        }
+        return PERFORMANCE_TIERS['good']
     else:
-        return {
-            'tier': 'needs_practice',
-            'system_prompt': (
-                "You are a snarky but lovable robot who roasts bad performance with tech puns. "
-                "Keep it playful, not mean. Encourage retry. Max 100 characters. No quotes."
-            ),
-            'user_prompt_template': (
-                "Player {nickname} scored {wpm} WPM with {accuracy}% accuracy. "
-                "Give them a playful roast that makes them want to try again!"
-            )
-        }
+        return PERFORMANCE_TIERS['needs_practice']
 
 
 # Fallback messages by tier
@@ -78,18 +92,25 @@ FALLBACK_MESSAGES = {
 }
 
 
-@ai_bp.route('/ai/performance-message', methods=['POST'])
-def get_performance_message():
-    """Generate an AI-powered performance message using Gradient AI."""
-    data = request.get_json()
+def generate_message_template(tier: str) -> str:
+    """Ask Gradient AI for a message template for a tier, with placeholders for the player's stats"""
+    tier_info = PERFORMANCE_TIERS[tier]
+    user_prompt = tier_info['user_prompt_template'].format(
+        nickname='{NICKNAME}', wpm='{WPM}', accuracy='{ACCURACY}'
+    ) + " Write {NICKNAME}, {WPM} and {ACCURACY} exactly as given; they are filled in later."
 
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
+    return ai_client.chat(tier_info['system_prompt'], user_prompt)
+
+
+# Templates are generated ahead of time so results never wait on the model
+message_pool = MessagePool(PERFORMANCE_TIERS, generate_message_template)
 
-    nickname = data.get('nickname', 'Player')
-    wpm = data.get('wpm', 0)
-    accuracy = data.get('accuracy', 0)
 
+def pooled_performance_message(nickname, wpm, accuracy):
+    """(message, tier, ai_generated) from the template pool; message is None if the pool is empty.
+
+    Accuracy may be a fraction or a percentage.
+    """
     # Convert accuracy to percentage if it's a decimal
     accuracy_percent = int(accuracy * 100) if accuracy <= 1 else int(accuracy)
 
@@ -98,59 +119,92 @@ def get_performance_message():
     tier = tier_info['tier']
 
     # Check for API key
-    api_key = os.getenv('DIGITAL_OCEAN_MODEL_ACCESS_KEY')
-
-    if not api_key:
+    if not ai_client.available():
         # Return fallback message if no API key
-        return jsonify({
-            'message': FALLBACK_MESSAGES[tier],
-            'tier': tier,
-            'ai_generated': False
-        })
+        return FALLBACK_MESSAGES[tier], tier, False
 
-    try:
-        from gradient import Gradient
+    message_pool.start()
+    template = message_pool.take(tier)
+    if template is None:
+        return None, tier, False
+    return render_message(template, nickname.upper(), wpm, accuracy_percent), tier, True
 
-        client = Gradient(model_access_key=api_key)
 
-        # Build prompts
-        system_prompt = tier_info['system_prompt']
-        user_prompt = tier_info['user_prompt_template'].format(
-            nickname=nickname.upper(),
-            wpm=wpm,
-            accuracy=accuracy_percent
-        )
+def generate_performance_message(tier, nickname, wpm, accuracy):
+    """Ask Gradient AI for a one-off message for this player; None if the reply is unusable"""
+    accuracy_percent = int(accuracy * 100) if accuracy <= 1 else int(accuracy)
+    tier_info = PERFORMANCE_TIERS[tier]
+    user_prompt = tier_info['user_prompt_template'].format(
+        nickname=nickname.upper(), wpm=wpm, accuracy=accuracy_percent
+    )
+    text = clean_template(ai_client.chat(tier_info['system_prompt'], user_prompt))
+    return render_message(text, nickname.upper(), wpm, accuracy_percent) if text else None
+
+
+def prepare_performance_message(score_id, nickname, wpm, accuracy):
+    """Message row values for a new score, and a callable to run once they're committed (or None).
+
+    Uses a pooled template when there is one; otherwise the row starts out
+    pending and the callable hands generation to the background thread pool.
+    """
+    message, tier, ai_generated = pooled_performance_message(nickname, wpm, accuracy)
+    values = {
+        'id': generate_uuid(),
+        'score_id': score_id,
+        'tier': tier,
+        'status': 'ready' if message else 'pending',
+        'message': message,
+        'ai_generated': ai_generated,
+        'created_at': datetime.utcnow(),
+    }
+    if message:
+        return values, None
+
+    app = current_app._get_current_object()
+    return values, lambda: message_jobs.submit(
+        app,
+        values['id'],
+        lambda: generate_performance_message(tier, nickname, wpm, accuracy),
+        FALLBACK_MESSAGES[tier],
+    )
 
-        # Call Gradient AI with timeout
-        resp = client.chat.completions.create(
-            model="llama3-8b-instruct",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-        )
 
-        message = resp.choices[0].message.content
-
-        # Clean up the message (remove quotes if present)
-        message = message.strip().strip('"\'')
-
-        # Ensure message isn't too long
-        if len(message) > 150:
-            message = message[:147] + "..."
-
-        return jsonify({
-            'message': message,
-            'tier': tier,
-            'ai_generated': True
-        })
-
-    except Exception as e:
-        # Return fallback on any error
-        print(f"AI generation error: {e}")
-        return jsonify({
-            'message': FALLBACK_MESSAGES[tier],
-            'tier': tier,
-            'ai_generated': False,
-            'error': str(e)
-        })
+@ai_bp.route('/ai/performance-message', methods=['POST'])
+def get_performance_message():
+    """Get a performance message from the pre-generated Gradient AI message pool."""
+    data = request.get_json()
+
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    nickname = data.get('nickname', 'Player')
+    wpm = data.get('wpm', 0)
+    accuracy = data.get('accuracy', 0)
+
+    message, tier, ai_generated = pooled_performance_message(nickname, wpm, accuracy)
+    if message is None:
+        # Pool still warming up (or the model is failing): use the fallback
+        message = FALLBACK_MESSAGES[tier]
+
+    return jsonify({
+        'message': message,
+        'tier': tier,
+        'ai_generated': ai_generated
+    })
+
+
+@ai_bp.route('/ai/messages/<message_id>', methods=['GET'])
+def get_message(message_id):
+    """Get a score's performance message; ?wait=N long-polls up to N seconds while it's pending"""
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return jsonify({'error': 'wait must be a number'}), 400
+    # nan would slip through the clamp in wait() and poll forever
+    if not math.isfinite(wait):
+        return jsonify({'error': 'wait must be a number'}), 400
+
+    message = message_jobs.wait(message_id, wait)
+    if message is None:
+        return jsonify({'error': 'Message not found'}), 404
+    return jsonify(message.to_dict())
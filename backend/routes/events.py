@@ -1,24 +1,108 @@
 import os
 from flask import Blueprint, request, jsonify
-from models import db, Event, EventConsent
+from models import db, Event, EventConsent, Player, generate_uuid
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from cache import GenerationCache, bump_generation, conditional_json, current_generation, is_fresh, not_modified
 
 events_bp = Blueprint('events', __name__)
 
+# Generation counter bumped by every admin edit to events
+EVENTS_GENERATION = 'events'
+
+# Seconds a worker keeps a slug lookup (hit or miss) even if no edit bumps the generation
+EVENT_CACHE_TTL = 60
+
+# Seconds browsers and proxies may reuse an event lookup without asking again
+EVENT_MAX_AGE = 30
+
+event_cache = GenerationCache(max_entries=1024, ttl=EVENT_CACHE_TTL)
+
+# Most consents accepted by one /events/<id>/consents request
+MAX_CONSENT_BATCH = 500
+
+
+def find_active_event(slug):
+    """Active event with this slug as a dict, or None; cached per worker, misses included"""
+    def load():
+        event = Event.query.filter_by(slug=slug, is_active=True).first()
+        return event.to_dict() if event else None
+    return event_cache.get(slug, EVENTS_GENERATION, load)
+
 
 @events_bp.route('/events/<slug>', methods=['GET'])
 def get_event_by_slug(slug):
     """Get event config by slug (public)"""
-    event = Event.query.filter_by(slug=slug, is_active=True).first()
+    etag = f'event-{slug}-{current_generation(EVENTS_GENERATION)}'
+    if is_fresh(etag):
+        return not_modified(etag, EVENT_MAX_AGE)
+
+    event = find_active_event(slug)
     if not event:
-        return jsonify({'error': 'Event not found'}), 404
-    return jsonify(event.to_dict())
+        response = jsonify({'error': 'Event not found'})
+        response.headers['Cache-Control'] = f'public, max-age={EVENT_MAX_AGE}'
+        return response, 404
+    return conditional_json(etag, lambda: event, EVENT_MAX_AGE)
+
+
+def client_ip():
+    """The client's address, preferring the first X-Forwarded-For hop"""
+    ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
+    if ip_address and ',' in ip_address:
+        ip_address = ip_address.split(',')[0].strip()
+    return ip_address
+
+
+def find_event(event_id):
+    """Event with this id (active or not) as a dict, or None; cached per worker like find_active_event"""
+    def load():
+        event = Event.query.get(event_id)
+        return event.to_dict() if event else None
+    return event_cache.get(('id', event_id), EVENTS_GENERATION, load)
+
+
+def consent_upsert(event, answers, ip_address):
+    """One INSERT ... ON CONFLICT (event_id, player_id) DO UPDATE for {player_id: consented}.
+
+    Snapshots the consent label the event currently shows; the caller executes and commits.
+    """
+    # Get consent label from event config for snapshot
+    consent_config = (event['config'] or {}).get('consent', {})
+    consent_text = consent_config.get('label') if consent_config.get('enabled') else None
+
+    now = datetime.utcnow()
+    stmt = insert(EventConsent).values([
+        {
+            'id': generate_uuid(),
+            'event_id': event['id'],
+            'player_id': player_id,
+            'consented': consented,
+            'consent_text': consent_text,
+            'ip_address': ip_address,
+            'created_at': now,
+        }
+        for player_id, consented in answers.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=['event_id', 'player_id'],
+        set_={
+            'consented': stmt.excluded.consented,
+            'consent_text': stmt.excluded.consent_text,
+            'ip_address': stmt.excluded.ip_address,
+        },
+    )
+
+
+def record_event_consent(event, player_id, consented, ip_address):
+    """Upsert a player's consent answer for an event in one statement; the caller commits"""
+    db.session.execute(consent_upsert(event, {player_id: consented}, ip_address))
 
 
 @events_bp.route('/events/<event_id>/consent', methods=['POST'])
 def record_consent(event_id):
     """Record player consent for an event (public)"""
-    event = Event.query.get(event_id)
+    event = find_event(event_id)
     if not event:
         return jsonify({'error': 'Event not found'}), 404
 
@@ -26,39 +110,58 @@ def record_consent(event_id):
     if not data or not data.get('player_id'):
         return jsonify({'error': 'player_id is required'}), 400
 
-    player_id = data['player_id']
-    consented = data.get('consented')
-
-    # Get consent label from event config for snapshot
-    consent_config = (event.config or {}).get('consent', {})
-    consent_text = consent_config.get('label') if consent_config.get('enabled') else None
+    try:
+        record_event_consent(event, data['player_id'], data.get('consented'), client_ip())
+        db.session.commit()
+    except IntegrityError:
+        # The player (or the event, deleted since it was cached) doesn't exist
+        db.session.rollback()
+        return jsonify({'error': 'Player not found'}), 404
+    return jsonify({'status': 'ok'}), 200
 
-    # Get client IP
-    ip_address = request.headers.get('X-Forwarded-For', request.remote_addr)
-    if ip_address and ',' in ip_address:
-        ip_address = ip_address.split(',')[0].strip()
 
-    # Upsert: update if exists, create if not
-    existing = EventConsent.query.filter_by(
-        event_id=event_id, player_id=player_id
-    ).first()
-
-    if existing:
-        existing.consented = consented
-        existing.consent_text = consent_text
-        existing.ip_address = ip_address
-    else:
-        consent_record = EventConsent(
-            event_id=event_id,
-            player_id=player_id,
-            consented=consented,
-            consent_text=consent_text,
-            ip_address=ip_address,
-        )
-        db.session.add(consent_record)
+@events_bp.route('/events/<event_id>/consents', methods=['POST'])
+def record_consents(event_id):
+    """Record many players' consent for an event at once, e.g. a kiosk's offline queue (public)"""
+    event = find_event(event_id)
+    if not event:
+        return jsonify({'error': 'Event not found'}), 404
 
-    db.session.commit()
-    return jsonify({'status': 'ok'}), 200
+    data = request.get_json()
+    if not data or not isinstance(data.get('consents'), list):
+        return jsonify({'error': 'consents list is required'}), 400
+    if len(data['consents']) > MAX_CONSENT_BATCH:
+        return jsonify({'error': f'At most {MAX_CONSENT_BATCH} consents per batch'}), 400
+
+    items = [item if isinstance(item, dict) else {} for item in data['consents']]
+    player_ids = {item.get('player_id') for item in items if item.get('player_id')}
+    known_players = {
+        player_id for (player_id,) in
+        db.session.query(Player.id).filter(Player.id.in_(player_ids))
+    } if player_ids else set()
+
+    # A statement may touch each row once: the last answer per player wins
+    answers = {}
+    results = []
+    for item in items:
+        player_id = item.get('player_id')
+        if not player_id:
+            results.append({'player_id': None, 'status': 'error', 'error': 'player_id is required'})
+        elif player_id not in known_players:
+            results.append({'player_id': player_id, 'status': 'error', 'error': 'Player not found'})
+        else:
+            answers[player_id] = item.get('consented')
+            results.append({'player_id': player_id, 'status': 'ok'})
+
+    if answers:
+        db.session.execute(consent_upsert(event, answers, client_ip()))
+        db.session.commit()
+
+    return jsonify({
+        'recorded': len(answers),
+        'errors': sum(1 for r in results if r['status'] == 'error'),
+        'results': results
+    })
 
 
 @events_bp.route('/events', methods=['POST'])
@@ -87,6 +190,7 @@ def create_event():
         config=data.get('config', {}),
     )
     db.session.add(event)
+    bump_generation(EVENTS_GENERATION)
     db.session.commit()
 
     return jsonify(event.to_dict()), 201
@@ -113,6 +217,7 @@ def update_event(event_id):
     if 'config' in data:
         event.config = data['config']
 
+    bump_generation(EVENTS_GENERATION)
     db.session.commit()
     return jsonify(event.to_dict())
 
@@ -130,6 +235,7 @@ def delete_event(event_id):
     # Delete associated consents first
     EventConsent.query.filter_by(event_id=event_id).delete()
     db.session.delete(event)
+    bump_generation(EVENTS_GENERATION)
     db.session.commit()
 
     return jsonify({'status': 'ok'}), 200
@@ -1,18 +1,49 @@
-from flask import Blueprint, jsonify, request
-from models import db, Score, Player
+import json
+import queue
+from flask import Blueprint, Response, current_app, jsonify, request
+from models import db, Score, Player, PlayerBest
+from rollups import ALL_TIME, daily_period, event_key, histogram_rank, histogram_ranks
+from cache import GenerationCache, bump_generation, conditional_json, current_generation
+from broadcast import Broadcaster
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
 
-@leaderboard_bp.route('/leaderboard', methods=['GET'])
-def get_leaderboard():
-    """Get today's top 10 scores"""
-    # Get start of today (UTC)
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+# Computed boards keyed by (board type, event_id, day), shared by every poller in this worker
+leaderboard_cache = GenerationCache()
+
+# Live board snapshots pushed to SSE subscribers in this worker
+leaderboard_broadcaster = Broadcaster()
+
+# Seconds between SSE keepalive comments on an idle stream
+STREAM_KEEPALIVE = 15
+
+# Page sizes for the keyset-paginated boards
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def leaderboard_generation(event_id):
+    """Name of the generation counter covering one event's boards"""
+    return f'leaderboard:{event_key(event_id)}'
+
+
+def invalidate_leaderboard(event_id):
+    """Invalidate an event's cached boards in every worker (commits with the caller)"""
+    bump_generation(leaderboard_generation(event_id))
+
+
+def invalidate_player_leaderboards(player_id):
+    """Invalidate every board the player appears on, e.g. after hide/unhide"""
+    boards = db.session.query(PlayerBest.event_key).filter_by(player_id=player_id).all()
+    for (board,) in boards:
+        invalidate_leaderboard(board or None)
 
+
+def compute_daily_leaderboard(event_id, today_start):
+    """Query today's top 10 scores for a board"""
     # Filter by event_id if provided, otherwise show only default (non-event) scores
-    event_id = request.args.get('event_id')
     event_filter = Score.event_id == event_id if event_id else Score.event_id.is_(None)
 
     # Query top 10 scores from today (exclude hidden players)
@@ -33,46 +64,228 @@ def get_leaderboard():
             'created_at': score.created_at.isoformat()
         })
 
-    return jsonify({
+    return {
         'date': today_start.strftime('%Y-%m-%d'),
         'leaderboard': leaderboard
-    })
+    }
 
 
-@leaderboard_bp.route('/leaderboard/all-time', methods=['GET'])
-def get_all_time_leaderboard():
-    """Get all-time top 10 scores (best score per player)"""
-    # Filter by event_id if provided, otherwise show only default (non-event) scores
-    event_id = request.args.get('event_id')
-    event_filter = Score.event_id == event_id if event_id else Score.event_id.is_(None)
-
-    # Get all scores ordered by score descending (exclude hidden players)
-    all_scores = db.session.query(Score, Player).join(Player).filter(
-        Player.is_hidden == False,
-        event_filter
-    ).order_by(Score.score.desc()).all()
-
-    # Filter to keep only best score per player
-    seen_players = set()
-    top_scores = []
-    for score, player in all_scores:
-        if player.id not in seen_players:
-            seen_players.add(player.id)
-            top_scores.append((score, player))
-            if len(top_scores) >= 10:
-                break
+def compute_all_time_leaderboard(event_id):
+    """Query the all-time top 10 for a board (best score per player)"""
+    # Read the per-player bests (maintained by create_score) through the board index
+    top_scores = db.session.query(PlayerBest, Player).join(Player).filter(
+        PlayerBest.event_key == event_key(event_id),
+        Player.is_hidden == False
+    ).order_by(PlayerBest.score.desc()).limit(10).all()
 
     leaderboard = []
-    for rank, (score, player) in enumerate(top_scores, 1):
+    for rank, (best, player) in enumerate(top_scores, 1):
         leaderboard.append({
             'rank': rank,
             'nickname': player.nickname,
-            'wpm': score.wpm,
-            'accuracy': round(score.accuracy * 100, 1),
-            'score': score.score,
-            'created_at': score.created_at.isoformat()
+            'wpm': best.wpm,
+            'accuracy': round(best.accuracy * 100, 1),
+            'score': best.score,
+            'created_at': best.achieved_at.isoformat()
         })
 
-    return jsonify({
+    return {
         'leaderboard': leaderboard
+    }
+
+
+def parse_page_args():
+    """Parse ?after=<score,id>&limit= into ((score, id) or None, limit); raises ValueError"""
+    limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+
+    after = request.args.get('after')
+    if after:
+        score, _, row_id = after.partition(',')
+        if not row_id:
+            raise ValueError('after must be <score>,<id>')
+        after = (int(score), row_id)
+    return after or None, limit
+
+
+def build_page(rows, limit, key, period):
+    """Format one page of (entry, player) rows ordered by (score, id) descending"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Absolute positions come from the board's score histogram, not by counting rows
+    ranks = histogram_ranks(key, period, [entry.score for entry, _ in rows])
+
+    leaderboard = []
+    for entry, player in rows:
+        leaderboard.append({
+            'rank': ranks[entry.score],
+            'nickname': player.nickname,
+            'wpm': entry.wpm,
+            'accuracy': round(entry.accuracy * 100, 1),
+            'score': entry.score,
+            'created_at': (entry.created_at if isinstance(entry, Score) else entry.achieved_at).isoformat()
+        })
+
+    last = rows[-1][0] if rows else None
+    return {
+        'leaderboard': leaderboard,
+        'next': f'{last.score},{last.id}' if has_more else None
+    }
+
+
+def page_daily_leaderboard(event_id, today_start, after, limit):
+    """One keyset page of today's board; deep pages cost the same as the first"""
+    event_filter = Score.event_id == event_id if event_id else Score.event_id.is_(None)
+    query = db.session.query(Score, Player).join(Player).filter(
+        Score.created_at >= today_start,
+        Player.is_hidden == False,
+        event_filter
+    )
+    if after:
+        query = query.filter(tuple_(Score.score, Score.id) < after)
+    rows = query.order_by(Score.score.desc(), Score.id.desc()).limit(limit + 1).all()
+
+    page = build_page(rows, limit, event_key(event_id), daily_period(today_start))
+    page['date'] = today_start.strftime('%Y-%m-%d')
+    return page
+
+
+def page_all_time_leaderboard(event_id, after, limit):
+    """One keyset page of the all-time board (best score per player)"""
+    query = db.session.query(PlayerBest, Player).join(Player).filter(
+        PlayerBest.event_key == event_key(event_id),
+        Player.is_hidden == False
+    )
+    if after:
+        query = query.filter(tuple_(PlayerBest.score, PlayerBest.id) < after)
+    rows = query.order_by(PlayerBest.score.desc(), PlayerBest.id.desc()).limit(limit + 1).all()
+
+    return build_page(rows, limit, event_key(event_id), ALL_TIME)
+
+
+def today_start_utc():
+    """Start of today (UTC)"""
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def get_daily_board(event_id, generation=None):
+    """Today's board for an event, served from the cache when current"""
+    today_start = today_start_utc()
+    return leaderboard_cache.get(
+        ('daily', event_id, today_start.date()),
+        leaderboard_generation(event_id),
+        lambda: compute_daily_leaderboard(event_id, today_start),
+        generation
+    )
+
+
+def get_all_time_board(event_id, generation=None):
+    """All-time board for an event, served from the cache when current"""
+    return leaderboard_cache.get(
+        ('all_time', event_id, None),
+        leaderboard_generation(event_id),
+        lambda: compute_all_time_leaderboard(event_id),
+        generation
+    )
+
+
+@leaderboard_bp.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """Get today's top 10 scores, or a page of the board with ?after=&limit="""
+    event_id = request.args.get('event_id')
+
+    if 'after' in request.args or 'limit' in request.args:
+        try:
+            after, limit = parse_page_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(page_daily_leaderboard(event_id, today_start_utc(), after, limit))
+
+    generation = current_generation(leaderboard_generation(event_id))
+    etag = f'daily-{event_key(event_id)}-{today_start_utc():%Y%m%d}-{generation}'
+    return conditional_json(etag, lambda: get_daily_board(event_id, generation))
+
+
+@leaderboard_bp.route('/leaderboard/all-time', methods=['GET'])
+def get_all_time_leaderboard():
+    """Get all-time top 10 scores (best score per player), or a page with ?after=&limit="""
+    event_id = request.args.get('event_id')
+
+    if 'after' in request.args or 'limit' in request.args:
+        try:
+            after, limit = parse_page_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(page_all_time_leaderboard(event_id, after, limit))
+
+    generation = current_generation(leaderboard_generation(event_id))
+    etag = f'all-time-{event_key(event_id)}-{generation}'
+    return conditional_json(etag, lambda: get_all_time_board(event_id, generation))
+
+
+@leaderboard_bp.route('/leaderboard/rank', methods=['GET'])
+def get_score_rank():
+    """Get a score's rank, board size and percentile on its daily and all-time boards"""
+    score_id = request.args.get('score_id')
+    if not score_id:
+        return jsonify({'error': 'score_id is required'}), 400
+
+    score = Score.query.get(score_id)
+    if not score:
+        return jsonify({'error': 'Score not found'}), 404
+
+    # Counted from the score histograms maintained by create_score, not the scores table
+    key = event_key(score.event_id)
+    best = db.session.query(PlayerBest.score).filter_by(
+        player_id=score.player_id, event_key=key
+    ).scalar()
+
+    return jsonify({
+        'score_id': score.id,
+        'event_id': score.event_id,
+        'daily': histogram_rank(key, daily_period(score.created_at), score.score),
+        'all_time': histogram_rank(key, ALL_TIME, best if best is not None else score.score),
+    })
+
+
+@leaderboard_bp.route('/leaderboard/stream', methods=['GET'])
+def stream_leaderboard():
+    """Stream top 10 snapshots as Server-Sent Events whenever the ranking changes"""
+    event_id = request.args.get('event_id')
+    board = request.args.get('board', 'all-time')
+
+    generation_name = leaderboard_generation(event_id)
+    if board == 'all-time':
+        version = lambda: current_generation(generation_name)
+        compute = lambda: get_all_time_board(event_id)
+    elif board == 'daily':
+        # The daily board also changes at midnight without any new score
+        version = lambda: (current_generation(generation_name), today_start_utc())
+        compute = lambda: get_daily_board(event_id)
+    else:
+        return jsonify({'error': 'board must be all-time or daily'}), 400
+
+    topic = (board, event_id)
+    subscription = leaderboard_broadcaster.subscribe(
+        current_app._get_current_object(), topic, version, compute
+    )
+
+    def events():
+        try:
+            while True:
+                try:
+                    snapshot = subscription.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: leaderboard\ndata: {json.dumps(snapshot)}\n\n'
+        finally:
+            leaderboard_broadcaster.unsubscribe(topic, subscription)
+
+    # Not wrapped in stream_with_context: the DB session is released before streaming
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
     })
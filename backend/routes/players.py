@@ -1,8 +1,64 @@
 from flask import Blueprint, request, jsonify
-from models import db, Player
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from models import db, Player, generate_uuid, normalize_email, email_domain
+from routes.leaderboard import invalidate_player_leaderboards
+from rollups import adjust_player_histograms
 
 players_bp = Blueprint('players', __name__)
 
+
+def register_player(nickname, email):
+    """Insert a player, or update the existing player's nickname on a normalized-email match.
+
+    One INSERT ... ON CONFLICT DO UPDATE ... RETURNING, so concurrent kiosks
+    can't create duplicates. A returning player's boards are invalidated when
+    their nickname changes. Returns (detached Player, created); the caller commits.
+    """
+    player_id = generate_uuid()
+    normalized = normalize_email(email)
+    # Subqueries see the row as it was before the statement: the nickname being replaced
+    previous_nickname = select(Player.nickname).where(
+        Player.email_normalized == normalized
+    ).scalar_subquery().label('previous_nickname')
+
+    stmt = insert(Player).values(
+        id=player_id,
+        nickname=nickname,
+        email=email,
+        email_normalized=normalized,
+        email_domain=email_domain(email),
+        is_hidden=False,
+        created_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['email_normalized'],
+        set_={'nickname': stmt.excluded.nickname},
+    ).returning(*Player.__table__.c, previous_nickname)
+    row = db.session.execute(stmt).one()._mapping
+
+    player = Player(**{column.name: row[column.name] for column in Player.__table__.c})
+    created = row['id'] == player_id
+    if not created and row['previous_nickname'] != nickname:
+        invalidate_player_leaderboards(player.id)
+    return player, created
+
+
+def parse_registration(data):
+    """Validate a nickname/email registration; returns (nickname, email, error message or None)"""
+    nickname = data.get('nickname', '').strip()
+    email = data.get('email', '').strip()
+
+    if not nickname:
+        return nickname, email, 'Nickname is required'
+    if not email:
+        return nickname, email, 'Email is required'
+    if len(nickname) > 50:
+        return nickname, email, 'Nickname must be 50 characters or less'
+    return nickname, email, None
+
+
 @players_bp.route('/players', methods=['POST'])
 def create_player():
     """Register a new player"""
@@ -11,31 +67,14 @@ def create_player():
     if not data:
         return jsonify({'error': 'No data provided'}), 400
 
-    nickname = data.get('nickname', '').strip()
-    email = data.get('email', '').strip()
+    nickname, email, error = parse_registration(data)
+    if error:
+        return jsonify({'error': error}), 400
 
-    if not nickname:
-        return jsonify({'error': 'Nickname is required'}), 400
-    if not email:
-        return jsonify({'error': 'Email is required'}), 400
-    if len(nickname) > 50:
-        return jsonify({'error': 'Nickname must be 50 characters or less'}), 400
-
-    # Check if player with this email already exists
-    existing_player = Player.query.filter_by(email=email).first()
-    if existing_player:
-        # Update nickname if different
-        if existing_player.nickname != nickname:
-            existing_player.nickname = nickname
-            db.session.commit()
-        return jsonify(existing_player.to_dict()), 200
-
-    # Create new player
-    player = Player(nickname=nickname, email=email)
-    db.session.add(player)
+    # One statement: register, or update the nickname of the player who already has this address
+    player, created = register_player(nickname, email)
     db.session.commit()
-
-    return jsonify(player.to_dict()), 201
+    return jsonify(player.to_dict()), 201 if created else 200
 
 
 @players_bp.route('/players/<player_id>', methods=['GET'])
@@ -63,8 +102,11 @@ def hide_player(player_id):
     if not player:
         return jsonify({'error': 'Player not found'}), 404
 
-    player.is_hidden = True
-    db.session.commit()
+    if not player.is_hidden:
+        player.is_hidden = True
+        adjust_player_histograms(player_id, -1)
+        invalidate_player_leaderboards(player_id)
+        db.session.commit()
     return jsonify(player.to_dict())
 
 
@@ -75,6 +117,9 @@ def unhide_player(player_id):
     if not player:
         return jsonify({'error': 'Player not found'}), 404
 
-    player.is_hidden = False
-    db.session.commit()
+    if player.is_hidden:
+        player.is_hidden = False
+        adjust_player_histograms(player_id, +1)
+        invalidate_player_leaderboards(player_id)
+        db.session.commit()
     return jsonify(player.to_dict())
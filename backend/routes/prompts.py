@@ -1,7 +1,16 @@
-import os
-from flask import Blueprint, request, jsonify
-from models import db, Prompt
-from sqlalchemy.sql.expression import func
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import insert
+from models import db, Job, Prompt, generate_uuid
+from prompt_pool import prompt_pool, invalidate_prompts
+from ai_client import ai_client, AIUnavailable, MAX_CONCURRENT
+from near_duplicates import MinHashIndex, DEFAULT_THRESHOLD, signature
+from difficulty import apply_metrics
+from jobs import start_job
 
 prompts_bp = Blueprint('prompts', __name__)
 
@@ -16,19 +25,126 @@ CATEGORY_DESCRIPTIONS = {
     'general': 'DigitalOcean cloud computing and infrastructure in general'
 }
 
+# Prompts per /prompts/bundle request
+DEFAULT_BUNDLE_SIZE = 5
+MAX_BUNDLE_SIZE = 50
+
+# Most prompt ids a bundle request may exclude; the oldest are dropped first
+MAX_EXCLUDE = 500
+
+# Prompts per /prompts/generate-batch request
+DEFAULT_GENERATE_BATCH_SIZE = 10
+MAX_GENERATE_BATCH_SIZE = 100
+
+# Batch generation runs as a background job on half the AI client's slots,
+# leaving the rest for performance messages, and saves every N results
+GENERATE_JOB_KIND = 'generate_prompts'
+GENERATE_CONCURRENCY = max(1, MAX_CONCURRENT // 2)
+GENERATE_PROGRESS_EVERY = 10
+
+
+def parse_difficulty_band(args):
+    """(min_score, max_score) from ?min_difficulty=&max_difficulty= (0-100), or raise ValueError"""
+    band = []
+    for name in ('min_difficulty', 'max_difficulty'):
+        value = args.get(name)
+        value = float(value) if value not in (None, '') else None
+        if value is not None and not math.isfinite(value):
+            raise ValueError(f'{name} must be a finite number')
+        band.append(value)
+    return tuple(band)
+
+
+def parse_exclude(value):
+    """Prompt ids to avoid, from a list or a comma-separated string, keeping the last MAX_EXCLUDE"""
+    if isinstance(value, str):
+        value = value.split(',')
+    elif not isinstance(value, list):
+        return []
+    return [i for i in value if i and isinstance(i, str)][-MAX_EXCLUDE:]
+
+
 @prompts_bp.route('/prompts/random', methods=['GET'])
 def get_random_prompt():
-    """Get a random active prompt"""
-    prompt = Prompt.query.filter_by(is_active=True).order_by(func.random()).first()
+    """Get a random active prompt, optionally filtered by ?category=&difficulty=&min_difficulty=&max_difficulty="""
+    try:
+        min_score, max_score = parse_difficulty_band(request.args)
+    except ValueError:
+        return jsonify({'error': 'min_difficulty and max_difficulty must be numbers'}), 400
+
+    prompt = prompt_pool.random(
+        category=request.args.get('category'),
+        difficulty=request.args.get('difficulty'),
+        min_score=min_score,
+        max_score=max_score
+    )
 
     if not prompt:
         return jsonify({'error': 'No prompts available'}), 404
 
-    # Increment times_used
-    prompt.times_used += 1
-    db.session.commit()
+    # Increment times_used (buffered, written in periodic batches)
+    prompt_pool.record_use(prompt['id'])
+
+    return jsonify(prompt)
 
-    return jsonify(prompt.to_dict())
+
+@prompts_bp.route('/prompts/bundle', methods=['GET', 'POST'])
+def get_prompt_bundle():
+    """Get N distinct random prompts for a kiosk to queue (?count=&category=&difficulty=&min_difficulty=&max_difficulty=&exclude=).
+
+    Kiosks POST the same fields as a JSON body, so a long exclude list doesn't outgrow the request line.
+    """
+    params = request.args
+    if request.method == 'POST':
+        params = request.get_json(silent=True)
+        if not isinstance(params, dict):
+            return jsonify({'error': 'No data provided'}), 400
+    try:
+        count = int(params.get('count', DEFAULT_BUNDLE_SIZE))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'count must be an integer'}), 400
+    try:
+        min_score, max_score = parse_difficulty_band(params)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'min_difficulty and max_difficulty must be numbers'}), 400
+    if not 1 <= count <= MAX_BUNDLE_SIZE:
+        return jsonify({'error': f'count must be between 1 and {MAX_BUNDLE_SIZE}'}), 400
+
+    # Ids the kiosk already played this session, so the bundle doesn't repeat them
+    exclude = parse_exclude(params.get('exclude', ''))
+
+    prompts = prompt_pool.sample(
+        count,
+        category=params.get('category'),
+        difficulty=params.get('difficulty'),
+        exclude=exclude,
+        min_score=min_score,
+        max_score=max_score
+    )
+    if not prompts:
+        return jsonify({'error': 'No prompts available'}), 404
+
+    # Usage isn't counted here; kiosks report played prompts via /prompts/usage
+    return jsonify({
+        'version': str(prompt_pool.version),
+        'prompts': prompts
+    })
+
+
+@prompts_bp.route('/prompts/usage', methods=['POST'])
+def record_prompt_usage():
+    """Record plays of prompts served in bundles, in bulk"""
+    data = request.get_json()
+    if not data or not isinstance(data.get('prompt_ids'), list):
+        return jsonify({'error': 'prompt_ids list is required'}), 400
+
+    # Only count prompts that exist in the pool; unknown ids are ignored
+    known = {p['id'] for p in prompt_pool.prompts()}
+    plays = Counter(i for i in data['prompt_ids'] if i in known)
+    for prompt_id, count in plays.items():
+        prompt_pool.record_use(prompt_id, count)
+
+    return jsonify({'recorded': sum(plays.values())})
 
 
 @prompts_bp.route('/prompts', methods=['GET'])
@@ -56,7 +172,9 @@ def create_prompt():
         difficulty=data.get('difficulty', 'medium'),
         is_active=data.get('is_active', True)
     )
+    apply_metrics([prompt])
     db.session.add(prompt)
+    invalidate_prompts()
     db.session.commit()
 
     return jsonify(prompt.to_dict()), 201
@@ -75,6 +193,7 @@ def update_prompt(prompt_id):
 
     if 'text' in data:
         prompt.text = data['text'].strip()
+        apply_metrics([prompt])
     if 'category' in data:
         prompt.category = data['category']
     if 'difficulty' in data:
@@ -82,6 +201,7 @@ def update_prompt(prompt_id):
     if 'is_active' in data:
         prompt.is_active = data['is_active']
 
+    invalidate_prompts()
     db.session.commit()
     return jsonify(prompt.to_dict())
 
@@ -94,10 +214,30 @@ def delete_prompt(prompt_id):
         return jsonify({'error': 'Prompt not found'}), 404
 
     db.session.delete(prompt)
+    invalidate_prompts()
     db.session.commit()
     return jsonify({'message': 'Prompt deleted'})
 
 
+def generate_prompt_text(category: str) -> str:
+    """Generate one typing prompt about a category with Gradient AI"""
+    category_desc = CATEGORY_DESCRIPTIONS[category]
+
+    system_prompt = (
+        "You are a technical writer creating typing practice prompts about cloud computing. "
+        "Generate a single educational typing prompt about the specified topic. "
+        "The prompt should be 150-250 characters long. "
+        "Write in plain, clear language. No buzzwords, no marketing speak, no hype. "
+        "Just explain what the technology does in simple terms that anyone can understand. "
+        "Do not use quotes around the response. "
+        "Just respond with the prompt text, nothing else."
+    )
+
+    user_prompt = f"Generate a typing practice prompt about {category_desc}. Make it educational and fun to type."
+
+    return ai_client.chat(system_prompt, user_prompt).strip().strip('"\'')
+
+
 @prompts_bp.route('/prompts/generate', methods=['POST'])
 def generate_prompt():
     """Generate a typing prompt using Gradient AI (admin)"""
@@ -118,39 +258,11 @@ def generate_prompt():
         return jsonify({'error': 'Invalid difficulty. Must be easy, medium, or hard'}), 400
 
     # Check for API key
-    api_key = os.getenv('DIGITAL_OCEAN_MODEL_ACCESS_KEY')
-
-    if not api_key:
+    if not ai_client.available():
         return jsonify({'error': 'AI generation not available - API key not configured'}), 503
 
     try:
-        from gradient import Gradient
-
-        client = Gradient(model_access_key=api_key)
-
-        category_desc = CATEGORY_DESCRIPTIONS[category]
-
-        system_prompt = (
-            "You are a technical writer creating typing practice prompts about cloud computing. "
-            "Generate a single educational typing prompt about the specified topic. "
-            "The prompt should be 150-250 characters long. "
-            "Write in plain, clear language. No buzzwords, no marketing speak, no hype. "
-            "Just explain what the technology does in simple terms that anyone can understand. "
-            "Do not use quotes around the response. "
-            "Just respond with the prompt text, nothing else."
-        )
-
-        user_prompt = f"Generate a typing practice prompt about {category_desc}. Make it educational and fun to type."
-
-        resp = client.chat.completions.create(
-            model="llama3-8b-instruct",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-        )
-
-        generated_text = resp.choices[0].message.content.strip().strip('"\'')
+        generated_text = generate_prompt_text(category)
 
         return jsonify({
             'text': generated_text,
@@ -159,8 +271,151 @@ def generate_prompt():
             'ai_generated': True
         })
 
+    except AIUnavailable as e:
+        return jsonify({'error': f'AI generation not available - {e}'}), 503
+
     except Exception as e:
         print(f"AI prompt generation error: {e}")
         return jsonify({
             'error': f'AI generation failed: {str(e)}'
         }), 500
+
+
+# Signatures of stored prompts, by id, with the text each was computed from.
+# MinHash is pure Python, so corpus_index only computes it for new or edited texts.
+_corpus_signatures = {}
+_corpus_lock = threading.Lock()
+
+
+def corpus_index(threshold: float = DEFAULT_THRESHOLD) -> MinHashIndex:
+    """Near-duplicate index over every stored prompt, active or not"""
+    with _corpus_lock:
+        cached = dict(_corpus_signatures)
+
+    index = MinHashIndex(threshold)
+    current = {}
+    for prompt_id, text in db.session.query(Prompt.id, Prompt.text):
+        entry = cached.get(prompt_id)
+        if entry is None or entry[0] != text:
+            entry = (text, signature(text))
+        current[prompt_id] = entry
+        index.add(prompt_id, sig=entry[1])
+
+    # Deleted prompts drop out here
+    with _corpus_lock:
+        _corpus_signatures.clear()
+        _corpus_signatures.update(current)
+    return index
+
+
+def generate_prompts_job(job):
+    """Generate job.params['count'] prompts, saving survivors and progress every GENERATE_PROGRESS_EVERY results"""
+    params = job.params
+    count, categories = params['count'], params['categories']
+    index = corpus_index(params['threshold'])
+    started = time.monotonic()
+    counts = Counter()
+    rows = []  # Survivors not saved yet
+
+    def save():
+        # Survivors are scored in one pass and go in as one bulk insert, with the progress
+        if rows:
+            apply_metrics(rows)
+            db.session.execute(insert(Prompt), rows)
+            invalidate_prompts()
+            rows.clear()
+        elapsed = time.monotonic() - started
+        generated = counts['created'] + counts['duplicates']
+        job.processed = sum(counts.values())
+        job.counts = {
+            **counts,
+            'duplicate_rate': round(counts['duplicates'] / generated, 3) if generated else 0.0,
+            'elapsed_seconds': round(elapsed, 3),
+            'prompts_per_second': round(generated / elapsed, 2) if elapsed else None,
+        }
+        db.session.commit()
+
+    # Categories round-robin, on fewer threads than the AI client has slots
+    with ThreadPoolExecutor(max_workers=min(GENERATE_CONCURRENCY, count)) as executor:
+        futures = {
+            executor.submit(generate_prompt_text, categories[i % len(categories)]): categories[i % len(categories)]
+            for i in range(count)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                text = future.result()
+            except Exception as e:
+                print(f"AI prompt generation error: {e}")
+                text = None
+
+            if not text:
+                counts['failed'] += 1
+            elif index.query(text):
+                # Checked against the corpus and against this batch's survivors
+                counts['duplicates'] += 1
+            else:
+                row = {
+                    'id': generate_uuid(),
+                    'text': text,
+                    'category': futures[future],
+                    'difficulty': params['difficulty'],
+                    'is_active': True,
+                }
+                index.add(row['id'], text)
+                rows.append(row)
+                counts['created'] += 1
+
+            if done % GENERATE_PROGRESS_EVERY == 0:
+                save()
+    save()
+
+
+@prompts_bp.route('/prompts/generate-batch', methods=['POST'])
+def generate_prompt_batch():
+    """Start generating N prompts across categories with Gradient AI, skipping near-duplicates (admin).
+
+    Runs as a background job; poll GET /prompts/generate-batch/<job_id> for progress.
+    """
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'No data provided'}), 400
+
+    try:
+        count = int(data.get('count', DEFAULT_GENERATE_BATCH_SIZE))
+        threshold = float(data.get('threshold', DEFAULT_THRESHOLD))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'count and threshold must be numbers'}), 400
+    if not 1 <= count <= MAX_GENERATE_BATCH_SIZE:
+        return jsonify({'error': f'count must be between 1 and {MAX_GENERATE_BATCH_SIZE}'}), 400
+    if not 0 < threshold <= 1:
+        return jsonify({'error': 'threshold must be between 0 and 1'}), 400
+
+    categories = data.get('categories') or list(CATEGORY_DESCRIPTIONS)
+    if not isinstance(categories, list) or not all(isinstance(c, str) for c in categories):
+        return jsonify({'error': 'categories must be a list of category names'}), 400
+    invalid = [c for c in categories if c not in CATEGORY_DESCRIPTIONS]
+    if invalid:
+        return jsonify({'error': f'Invalid category. Must be one of: {", ".join(CATEGORY_DESCRIPTIONS.keys())}'}), 400
+
+    difficulty = data.get('difficulty', 'medium')
+    if difficulty not in ['easy', 'medium', 'hard']:
+        return jsonify({'error': 'Invalid difficulty. Must be easy, medium, or hard'}), 400
+
+    # Check for API key
+    if not ai_client.available():
+        return jsonify({'error': 'AI generation not available - API key not configured'}), 503
+
+    job = start_job(
+        current_app._get_current_object(), GENERATE_JOB_KIND, generate_prompts_job,
+        params={'count': count, 'threshold': threshold, 'categories': categories, 'difficulty': difficulty}
+    )
+    return jsonify({'job_id': job.id, 'status': job.status}), 202
+
+
+@prompts_bp.route('/prompts/generate-batch/<job_id>', methods=['GET'])
+def get_generate_batch_job(job_id):
+    """Progress of a batch generation: processed results and created / duplicates / failed counts"""
+    job = db.session.get(Job, job_id)
+    if not job or job.kind != GENERATE_JOB_KIND:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
@@ -1,73 +1,298 @@
+import math
 from flask import Blueprint, request, jsonify
-from models import db, Score, Player, Prompt, Event
-from datetime import datetime
+from models import db, Score, Player, Prompt, Event, PlayerBest, AIMessage, generate_uuid
+from datetime import datetime, timezone
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as insert_on_conflict
+from sqlalchemy.exc import IntegrityError
+from cache import generation_bump
+from rollups import event_key, write_score_rollups
+from routes.ai import prepare_performance_message
+from routes.leaderboard import leaderboard_generation
 
 scores_bp = Blueprint('scores', __name__)
 
-@scores_bp.route('/scores', methods=['POST'])
-def create_score():
-    """Submit a new score"""
-    data = request.get_json()
+# Most scores accepted by one /scores/batch request
+MAX_BATCH_SIZE = 500
 
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
+# Foreign keys on scores and the 404 message for each missing row
+FOREIGN_KEY_ERRORS = {
+    'player_id': 'Player not found',
+    'prompt_id': 'Prompt not found',
+    'event_id': 'Event not found',
+}
+
+
+def foreign_key_error(error: IntegrityError):
+    """404 message for a violated scores foreign key (e.g. scores_player_id_fkey), or None"""
+    diag = getattr(error.orig, 'diag', None)
+    constraint = getattr(diag, 'constraint_name', None) or ''
+    for column, message in FOREIGN_KEY_ERRORS.items():
+        if column in constraint:
+            return message
+    return None
+
+
+def insert_score(values):
+    """Insert a score in one statement, returning it with its player and the player's previous best.
+
+    Existence of the player, prompt and event is enforced by the foreign keys,
+    so a missing row raises IntegrityError instead of costing a lookup. The
+    previous best is read FOR UPDATE: a concurrent submission for the same
+    board waits here and then reads the best that one wrote.
+    """
+    inserted = insert(Score).values(**values).returning(*Score.__table__.c).cte('inserted')
+    previous_best = select(PlayerBest.score).where(
+        PlayerBest.player_id == inserted.c.player_id,
+        PlayerBest.event_key == event_key(values['event_id']),
+    ).with_for_update().scalar_subquery()
+    query = select(
+        inserted,
+        Player.nickname,
+        Player.email,
+        Player.is_hidden,
+        Player.email_type,
+        Player.created_at.label('player_created_at'),
+        previous_best.label('previous_best'),
+    ).join_from(inserted, Player, Player.id == inserted.c.player_id)
+    row = db.session.execute(query).one()._mapping
+
+    # Detached copies for the rollups and the response; nothing is added to the session
+    score = Score(**{column.name: row[column.name] for column in Score.__table__.c})
+    player = Player(
+        id=row['player_id'],
+        nickname=row['nickname'],
+        email=row['email'],
+        is_hidden=row['is_hidden'],
+        email_type=row['email_type'],
+        created_at=row['player_created_at'],
+    )
+    return score, player, row['previous_best']
+
+
+def is_number(value):
+    """A finite JSON number (bools are ints in Python, but not scores)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
 
+
+def parse_score(data):
+    """Validate a submitted score; returns (column values, None) or (None, error message)"""
     player_id = data.get('player_id')
     prompt_id = data.get('prompt_id')
+    event_id = data.get('event_id') or None
     wpm = data.get('wpm')
     accuracy = data.get('accuracy')
 
     # Validate required fields
     if not player_id:
-        return jsonify({'error': 'player_id is required'}), 400
+        return None, 'player_id is required'
     if not prompt_id:
-        return jsonify({'error': 'prompt_id is required'}), 400
+        return None, 'prompt_id is required'
     if wpm is None:
-        return jsonify({'error': 'wpm is required'}), 400
+        return None, 'wpm is required'
     if accuracy is None:
-        return jsonify({'error': 'accuracy is required'}), 400
-
-    # Validate player exists
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'error': 'Player not found'}), 404
-
-    # Validate prompt exists
-    prompt = Prompt.query.get(prompt_id)
-    if not prompt:
-        return jsonify({'error': 'Prompt not found'}), 404
+        return None, 'accuracy is required'
+    if not all(isinstance(v, str) for v in (player_id, prompt_id, event_id or '')):
+        return None, 'player_id, prompt_id and event_id must be strings'
+    if not (is_number(wpm) and is_number(accuracy)):
+        return None, 'wpm and accuracy must be numbers'
 
-    # Validate event if provided
-    event_id = data.get('event_id')
-    if event_id:
-        event = Event.query.get(event_id)
-        if not event:
-            return jsonify({'error': 'Event not found'}), 404
+    idempotency_key = data.get('idempotency_key') or None
+    if idempotency_key is not None and not isinstance(idempotency_key, str):
+        return None, 'idempotency_key must be a string'
+    if idempotency_key and len(idempotency_key) > 64:
+        return None, 'idempotency_key must be 64 characters or less'
 
-    # Parse started_at if provided
+    # Parse started_at if provided, as naive UTC like the other timestamps
     started_at = None
     if data.get('started_at'):
         try:
             started_at = datetime.fromisoformat(data['started_at'].replace('Z', '+00:00'))
         except (ValueError, AttributeError):
             pass  # Ignore invalid timestamps
+        else:
+            if started_at.tzinfo:
+                started_at = started_at.astimezone(timezone.utc).replace(tzinfo=None)
 
     # Calculate final score: WPM × Accuracy × 100
     final_score = int(wpm * accuracy * 100)
 
-    score = Score(
-        player_id=player_id,
-        prompt_id=prompt_id,
-        wpm=wpm,
-        accuracy=accuracy,
-        score=final_score,
-        event_id=event_id,
-        started_at=started_at,
+    return {
+        'id': generate_uuid(),
+        'player_id': player_id,
+        'prompt_id': prompt_id,
+        'wpm': wpm,
+        'accuracy': accuracy,
+        'score': final_score,
+        'event_id': event_id,
+        'started_at': started_at,
+        'idempotency_key': idempotency_key,
+        'created_at': datetime.utcnow(),
+    }, None
+
+
+@scores_bp.route('/scores', methods=['POST'])
+def create_score():
+    """Submit a new score"""
+    data = request.get_json()
+
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    values, error = parse_score(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        score, player, previous_best = insert_score(values)
+    except IntegrityError as e:
+        db.session.rollback()
+        message = foreign_key_error(e)
+        if message:
+            return jsonify({'error': message}), 404
+        # A retried submission: return the score recorded the first time
+        if values['idempotency_key']:
+            existing = Score.query.filter_by(idempotency_key=values['idempotency_key']).first()
+            if existing:
+                message = AIMessage.query.filter_by(score_id=existing.id).first()
+                return jsonify({**existing.to_dict(), 'message_id': message.id if message else None}), 200
+        raise
+
+    # Performance message: ready now from the template pool, or generated after commit
+    message, generate_message = prepare_performance_message(
+        score.id, player.nickname, score.wpm, score.accuracy
+    )
+
+    # Board rollups, the cache generation and the message row go out as one more statement
+    board = (score.player_id, event_key(score.event_id))
+    write_score_rollups(
+        [score],
+        {board: previous_best} if previous_best is not None else {},
+        {player.id} if player.is_hidden else (),
+        [generation_bump(leaderboard_generation(score.event_id)), insert(AIMessage).values(**message)]
     )
-    db.session.add(score)
     db.session.commit()
 
-    return jsonify(score.to_dict()), 201
+    if generate_message:
+        generate_message()
+
+    return jsonify({**score.to_dict(player=player), 'message_id': message['id']}), 201
+
+
+@scores_bp.route('/scores/batch', methods=['POST'])
+def create_scores_batch():
+    """Submit many queued scores at once, deduplicated by client idempotency keys"""
+    data = request.get_json()
+
+    if not data or not isinstance(data.get('scores'), list):
+        return jsonify({'error': 'scores list is required'}), 400
+    if len(data['scores']) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} scores per batch'}), 400
+
+    # Validate each item on its own, keeping the first occurrence of a key
+    results = []
+    pending = []  # (result, values)
+    seen_keys = set()
+    for item in data['scores']:
+        item = item if isinstance(item, dict) else {}
+        key = item.get('idempotency_key')
+        result = {'idempotency_key': key}
+        results.append(result)
+
+        if not key:
+            result.update(status='error', error='idempotency_key is required')
+            continue
+        values, error = parse_score(item)
+        if error:
+            result.update(status='error', error=error)
+        elif key in seen_keys:
+            result.update(status='duplicate')
+        else:
+            seen_keys.add(key)
+            # Played offline, maybe before midnight: date it by when it was played, not when it arrived
+            if values['started_at']:
+                values['created_at'] = min(values['started_at'], values['created_at'])
+            pending.append((result, values))
+
+    # Validate references as a set: one lookup per referenced table
+    player_ids = {values['player_id'] for _, values in pending}
+    prompt_ids = {values['prompt_id'] for _, values in pending}
+    event_ids = {values['event_id'] for _, values in pending if values['event_id']}
+    players = {
+        player_id: is_hidden for player_id, is_hidden in
+        db.session.query(Player.id, Player.is_hidden).filter(Player.id.in_(player_ids))
+    } if player_ids else {}
+    known_prompts = {
+        prompt_id for (prompt_id,) in
+        db.session.query(Prompt.id).filter(Prompt.id.in_(prompt_ids))
+    } if prompt_ids else set()
+    known_events = {
+        event_id for (event_id,) in
+        db.session.query(Event.id).filter(Event.id.in_(event_ids))
+    } if event_ids else set()
+
+    valid = []
+    for result, values in pending:
+        if values['player_id'] not in players:
+            result.update(status='error', error='Player not found')
+        elif values['prompt_id'] not in known_prompts:
+            result.update(status='error', error='Prompt not found')
+        elif values['event_id'] and values['event_id'] not in known_events:
+            result.update(status='error', error='Event not found')
+        else:
+            valid.append((result, values))
+
+    if valid:
+        # One multi-row insert; keys already stored are skipped, not duplicated
+        inserted_ids = {
+            key: score_id for score_id, key in db.session.execute(
+                insert_on_conflict(Score)
+                .values([values for _, values in valid])
+                .on_conflict_do_nothing(index_elements=['idempotency_key'])
+                .returning(Score.id, Score.idempotency_key)
+            )
+        }
+        existing_ids = {
+            key: score_id for score_id, key in
+            db.session.query(Score.id, Score.idempotency_key).filter(
+                Score.idempotency_key.in_(seen_keys - inserted_ids.keys())
+            )
+        } if len(inserted_ids) < len(valid) else {}
+
+        created = []
+        for result, values in valid:
+            key = values['idempotency_key']
+            if key in inserted_ids:
+                result.update(status='created', score_id=inserted_ids[key])
+                created.append(Score(**values))
+            else:
+                result.update(status='duplicate', score_id=existing_ids.get(key))
+
+        if created:
+            boards = {(score.player_id, event_key(score.event_id)) for score in created}
+            # Locked, in id order, so concurrent submissions for these boards wait for this one
+            previous_bests = {
+                (best.player_id, best.event_key): best.score for best in
+                db.session.query(PlayerBest.player_id, PlayerBest.event_key, PlayerBest.score).filter(
+                    PlayerBest.player_id.in_({player_id for player_id, _ in boards})
+                ).order_by(PlayerBest.id).with_for_update() if (best.player_id, best.event_key) in boards
+            }
+            hidden = {player_id for player_id, is_hidden in players.items() if is_hidden}
+            write_score_rollups(
+                created, previous_bests, hidden,
+                [generation_bump(leaderboard_generation(event_id))
+                 for event_id in {score.event_id for score in created}]
+            )
+        db.session.commit()
+
+    counts = {status: sum(1 for r in results if r.get('status') == status)
+              for status in ('created', 'duplicate', 'error')}
+    return jsonify({
+        'created': counts['created'],
+        'duplicates': counts['duplicate'],
+        'errors': counts['error'],
+        'results': results
+    })
 
 
 @scores_bp.route('/scores/<score_id>', methods=['GET'])
@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify
+from models import db
+from prompt_pool import prompt_pool
+from routes.players import parse_registration, register_player
+from routes.events import client_ip, find_event, record_event_consent
+from routes.prompts import MAX_BUNDLE_SIZE, parse_difficulty_band, parse_exclude
+
+sessions_bp = Blueprint('sessions', __name__)
+
+# Prompts returned by /sessions/start unless prompt_count says otherwise
+DEFAULT_SESSION_PROMPTS = 1
+
+
+@sessions_bp.route('/sessions/start', methods=['POST'])
+def start_session():
+    """Register the player, record event consent and hand out prompts in one request and transaction"""
+    data = request.get_json()
+
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    nickname, email, error = parse_registration(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        count = int(data.get('prompt_count', DEFAULT_SESSION_PROMPTS))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'prompt_count must be an integer'}), 400
+    if not 0 <= count <= MAX_BUNDLE_SIZE:
+        return jsonify({'error': f'prompt_count must be between 0 and {MAX_BUNDLE_SIZE}'}), 400
+    try:
+        min_score, max_score = parse_difficulty_band(data)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'min_difficulty and max_difficulty must be numbers'}), 400
+
+    event = None
+    if data.get('event_id'):
+        event = find_event(data['event_id'])
+        if not event:
+            return jsonify({'error': 'Event not found'}), 404
+
+    # Prompts come from the in-memory pool; the kiosk may already have some queued (count 0)
+    prompts = []
+    if count:
+        prompts = prompt_pool.sample(
+            count,
+            category=data.get('category'),
+            difficulty=data.get('difficulty'),
+            exclude=parse_exclude(data.get('exclude')),
+            min_score=min_score,
+            max_score=max_score
+        )
+        if not prompts:
+            return jsonify({'error': 'No prompts available'}), 404
+
+    player, created = register_player(nickname, email)
+    if event:
+        record_event_consent(event, player.id, data.get('consented'), client_ip())
+    db.session.commit()
+
+    # Usage isn't counted here; kiosks report played prompts via /prompts/usage
+    return jsonify({
+        'player': player.to_dict(),
+        'created': created,
+        'version': str(prompt_pool.version),
+        'prompts': prompts
+    }), 201 if created else 200
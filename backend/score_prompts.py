@@ -0,0 +1,67 @@
+"""
+Add the prompts metric columns and the ix_prompts_difficulty_score index that
+db.create_all() can't add to an existing table, then compute typing-difficulty
+metrics (see difficulty.py) for every prompt.
+Run this before deploying on a database created earlier, or after changing the scoring: python score_prompts.py
+Safe to re-run. See docs/UPGRADING.md for the order of the upgrade scripts.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import text, update
+from app import create_app
+from models import db, Prompt
+from prompt_pool import invalidate_prompts
+from difficulty import compute_metrics
+
+# Same types as the Prompt model
+METRIC_COLUMNS = {
+    'char_count': 'integer',
+    'punctuation_density': 'double precision',
+    'digit_density': 'double precision',
+    'shifted_ratio': 'double precision',
+    'same_finger_bigram_rate': 'double precision',
+    'hand_alternation_rate': 'double precision',
+    'difficulty_score': 'double precision',
+}
+
+
+def add_metric_columns():
+    for name, type_ in METRIC_COLUMNS.items():
+        db.session.execute(text(f'ALTER TABLE prompts ADD COLUMN IF NOT EXISTS {name} {type_}'))
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_prompts_difficulty_score ON prompts (is_active, difficulty_score)'
+    ))
+
+
+def fill_metrics():
+    """Score the whole corpus in one pass and write it back with one executemany UPDATE; returns the count"""
+    prompts = db.session.query(Prompt.id, Prompt.text).all()
+    metrics = compute_metrics([text for _, text in prompts])
+
+    if prompts:
+        db.session.execute(
+            update(Prompt),
+            [{'id': prompt_id, **values} for (prompt_id, _), values in zip(prompts, metrics)]
+        )
+    return len(prompts)
+
+
+def score_prompts():
+    """Run the whole upgrade in one transaction"""
+    app = create_app()
+
+    with app.app_context():
+        add_metric_columns()
+        scored = fill_metrics()
+
+        # Make running workers pick up the new scores
+        invalidate_prompts()
+        db.session.commit()
+        print(f"Scored {scored} prompts")
+
+
+if __name__ == '__main__':
+    score_prompts()
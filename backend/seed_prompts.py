@@ -10,7 +10,11 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from app import create_app
-from models import db, Prompt
+from sqlalchemy import insert
+from models import db, Prompt, generate_uuid
+from prompt_pool import invalidate_prompts
+from difficulty import apply_metrics
+from routes.prompts import corpus_index
 
 PROMPTS = [
     # Droplets
@@ -185,24 +189,32 @@ def seed_prompts():
                 print("Aborting seed.")
                 return
 
-        # Add prompts
-        added = 0
+        # Add prompts, skipping near-duplicates of stored prompts and of each other
+        index = corpus_index()
+        rows = []
         for prompt_data in PROMPTS:
-            # Check if this exact text already exists
-            existing = Prompt.query.filter_by(text=prompt_data['text']).first()
-            if existing:
+            match = index.query(prompt_data['text'])
+            if match:
                 print(f"Skipping duplicate: {prompt_data['text'][:50]}...")
                 continue
 
-            prompt = Prompt(
-                text=prompt_data['text'],
-                category=prompt_data['category'],
-                difficulty=prompt_data['difficulty'],
-                is_active=True
-            )
-            db.session.add(prompt)
-            added += 1
-
+            row = {
+                'id': generate_uuid(),
+                'text': prompt_data['text'],
+                'category': prompt_data['category'],
+                'difficulty': prompt_data['difficulty'],
+                'is_active': True
+            }
+            index.add(row['id'], row['text'])
+            rows.append(row)
+
+        if rows:
+            apply_metrics(rows)
+            db.session.execute(insert(Prompt), rows)
+        added = len(rows)
+
+        # Make running workers pick up the new prompts
+        invalidate_prompts()
         db.session.commit()
         print(f"Successfully added {added} prompts to the database!")
         print(f"Total prompts now: {Prompt.query.count()}")
@@ -0,0 +1,143 @@
+"""
+Shared fixtures.
+
+Tests that need the database run against the PostgreSQL database named by
+TEST_DATABASE_URL (e.g. postgresql+psycopg://localhost/typing_master_test),
+which they truncate between tests. Without it they are skipped.
+"""
+
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, insert, text
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+if TEST_DATABASE_URL:
+    # app.py builds the app when imported, so this must be set first
+    os.environ['DATABASE_URL'] = TEST_DATABASE_URL
+    os.environ['ENABLE_ADMIN'] = 'true'
+    # Performance messages use their fallbacks instead of calling the model
+    os.environ['DIGITAL_OCEAN_MODEL_ACCESS_KEY'] = ''
+
+
+@pytest.fixture(scope='session')
+def app():
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    from app import app
+    return app
+
+
+@pytest.fixture
+def db(app):
+    """The app's db, inside an app context, with empty tables and per-worker caches"""
+    import cache
+    from models import db
+    from prompt_pool import prompt_pool
+    from routes.events import event_cache
+    from routes.leaderboard import leaderboard_cache
+
+    with app.app_context():
+        tables = ', '.join(table.name for table in db.metadata.sorted_tables)
+        db.session.execute(text(f'TRUNCATE {tables} CASCADE'))
+        db.session.commit()
+
+        cache._generations.clear()
+        leaderboard_cache.clear()
+        event_cache.clear()
+        prompt_pool._generation = None
+
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture
+def gradient_stub(monkeypatch):
+    """A local Gradient API; AIClients created during the test talk to it"""
+    from gradient_stub import GradientStub
+    stub = GradientStub().start()
+    monkeypatch.setenv('GRADIENT_INFERENCE_ENDPOINT', stub.url)
+    monkeypatch.setenv('DIGITAL_OCEAN_MODEL_ACCESS_KEY', 'test-key')
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
+
+
+@pytest.fixture
+def prompt(db):
+    """An active prompt, as a dict"""
+    from models import Prompt
+    prompt = Prompt(text='The quick brown fox jumps over the lazy dog.', category='general', difficulty='easy')
+    db.session.add(prompt)
+    db.session.commit()
+    return prompt.to_dict()
+
+
+class SQLLog:
+    """Statements executed on an engine, and the time spent executing them"""
+
+    def __init__(self):
+        self.statements = []
+        self.seconds = 0.0
+
+
+@contextmanager
+def record_sql(engine):
+    """Collects the SQL executed on engine inside the block into a SQLLog"""
+    log = SQLLog()
+    started = {}  # cursor id -> start time
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append(statement)  # Counted here too: failed statements never reach after
+        started[id(cursor)] = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        log.seconds += time.perf_counter() - started.pop(id(cursor))
+
+    event.listen(engine, 'before_cursor_execute', before)
+    event.listen(engine, 'after_cursor_execute', after)
+    try:
+        yield log
+    finally:
+        event.remove(engine, 'before_cursor_execute', before)
+        event.remove(engine, 'after_cursor_execute', after)
+
+
+def seed_scores(db, prompt_id, players=50, scores_per_player=4, event_id=None):
+    """Bulk-insert players with scores from today and rebuild the rollups; returns the player ids"""
+    from models import Player, Score, generate_uuid
+    from rebuild_rollups import rebuild_player_bests, rebuild_player_stats, rebuild_score_histograms
+
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    player_rows = [
+        {'id': generate_uuid(), 'nickname': f'PLAYER{i}', 'email': f'player{i}@example.com',
+         'email_normalized': f'player{i}@example.com', 'email_domain': 'example.com',
+         'is_hidden': False, 'created_at': now}
+        for i in range(players)
+    ]
+    score_rows = []
+    for player in player_rows:
+        for _ in range(scores_per_player):
+            wpm, accuracy = rng.randint(10, 120), round(rng.uniform(0.7, 1.0), 3)
+            score_rows.append({
+                'id': generate_uuid(), 'player_id': player['id'], 'prompt_id': prompt_id, 'wpm': wpm,
+                'accuracy': accuracy, 'score': int(wpm * accuracy * 100), 'event_id': event_id,
+                'created_at': now - timedelta(seconds=rng.randint(0, 3600)),
+            })
+    db.session.execute(insert(Player), player_rows)
+    if score_rows:
+        db.session.execute(insert(Score), score_rows)
+    db.session.commit()
+
+    rebuild_player_bests()
+    rebuild_player_stats()
+    rebuild_score_histograms()
+    return [player['id'] for player in player_rows]
@@ -0,0 +1,88 @@
+"""
+Local stand-in for the Gradient inference API.
+
+Serves POST /v1/chat/completions in the OpenAI response format, with
+injectable latency and error responses, so the real SDK client can be
+exercised without the network.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = '{NICKNAME} HIT {WPM} WPM AT {ACCURACY}%!'
+
+
+class GradientStub:
+    def __init__(self):
+        self.latency = 0.0  # Seconds before answering
+        self.error_status = None  # e.g. 500 to fail every call
+        self.reply = DEFAULT_REPLY  # Or a callable taking the request body
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0  # Most requests served at once
+        self.connections = set()  # Client addresses seen, i.e. TCP connections opened
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, so connection reuse is visible
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.connections.add(self.client_address)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                time.sleep(stub.latency)
+                with stub._lock:
+                    stub.in_flight -= 1
+                reply = stub.reply(body) if callable(stub.reply) else stub.reply
+
+                if stub.error_status:
+                    status, payload = stub.error_status, {'error': {'message': 'injected failure'}}
+                else:
+                    status, payload = 200, {
+                        'id': f'chatcmpl-{stub.requests}',
+                        'object': 'chat.completion',
+                        'created': int(time.time()),
+                        'model': body.get('model'),
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': reply},
+                            'finish_reason': 'stop',
+                        }],
+                    }
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client gave up first (deadline tests)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,128 @@
+import threading
+import time
+import pytest
+import ai_client as ai_client_module
+from ai_client import AIClient, AIUnavailable, CircuitBreaker
+
+RESET_TIMEOUT = 0.2
+
+
+@pytest.fixture
+def client(gradient_stub):
+    return AIClient(max_concurrent=2, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=RESET_TIMEOUT))
+
+
+def fail_until_open(client, stub):
+    stub.error_status = 500
+    for _ in range(client.breaker.failure_threshold):
+        with pytest.raises(Exception) as error:
+            client.chat('system', 'user')
+        assert not isinstance(error.value, AIUnavailable)
+    assert client.breaker.state == 'open'
+
+
+def in_thread(call):
+    result = {}
+
+    def run():
+        try:
+            result['value'] = call()
+        except Exception as e:
+            result['error'] = e
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, result
+
+
+def test_calls_share_one_pooled_connection(client, gradient_stub):
+    for _ in range(5):
+        assert client.chat('system', 'user') == gradient_stub.reply
+    assert gradient_stub.requests == 5
+    assert len(gradient_stub.connections) == 1
+
+
+def test_no_key_fails_fast(client, gradient_stub, monkeypatch):
+    monkeypatch.setenv('DIGITAL_OCEAN_MODEL_ACCESS_KEY', '')
+    with pytest.raises(AIUnavailable):
+        client.chat('system', 'user')
+    assert gradient_stub.requests == 0
+
+
+def test_deadline_bounds_a_slow_model(client, gradient_stub):
+    gradient_stub.latency = 2.0
+    start = time.monotonic()
+    with pytest.raises(Exception) as error:
+        client.chat('system', 'user', timeout=0.2)
+    assert time.monotonic() - start < 1.0
+    assert not isinstance(error.value, AIUnavailable)
+
+
+def test_repeated_errors_open_the_breaker(client, gradient_stub):
+    fail_until_open(client, gradient_stub)
+
+    requests = gradient_stub.requests
+    start = time.monotonic()
+    with pytest.raises(AIUnavailable):
+        client.chat('system', 'user')
+    assert time.monotonic() - start < 0.05
+    assert gradient_stub.requests == requests
+
+
+def test_half_open_lets_one_trial_through(client, gradient_stub):
+    fail_until_open(client, gradient_stub)
+    time.sleep(RESET_TIMEOUT)
+    assert client.breaker.state == 'half_open'
+
+    gradient_stub.error_status = None
+    gradient_stub.latency = 0.3
+    trial, result = in_thread(lambda: client.chat('system', 'user'))
+    time.sleep(0.1)
+    with pytest.raises(AIUnavailable):  # The trial is still in flight
+        client.chat('system', 'user')
+    trial.join()
+
+    assert result == {'value': gradient_stub.reply}
+    assert client.breaker.state == 'closed'
+
+
+def test_failed_trial_reopens_the_breaker(client, gradient_stub):
+    fail_until_open(client, gradient_stub)
+    time.sleep(RESET_TIMEOUT)
+
+    with pytest.raises(Exception):
+        client.chat('system', 'user')
+    assert client.breaker.state == 'open'
+
+
+def test_busy_slots_time_out_without_counting_as_failures(client, gradient_stub, monkeypatch):
+    monkeypatch.setattr(ai_client_module, 'QUEUE_TIMEOUT', 0.1)
+    gradient_stub.latency = 0.5
+    calls = [in_thread(lambda: client.chat('system', 'user')) for _ in range(2)]
+    time.sleep(0.1)
+
+    start = time.monotonic()
+    with pytest.raises(AIUnavailable, match='Too many'):
+        client.chat('system', 'user')
+    assert time.monotonic() - start < 0.4
+    for thread, result in calls:
+        thread.join()
+        assert result == {'value': gradient_stub.reply}
+    assert client.breaker.state == 'closed'
+
+
+def test_busy_slots_release_the_half_open_trial(client, gradient_stub, monkeypatch):
+    monkeypatch.setattr(ai_client_module, 'QUEUE_TIMEOUT', 0.05)
+    fail_until_open(client, gradient_stub)
+    time.sleep(RESET_TIMEOUT)
+    gradient_stub.error_status = None
+
+    # Every slot is taken when the trial is allowed, so it's handed back unused
+    for _ in range(2):
+        client._slots.acquire()
+    with pytest.raises(AIUnavailable, match='Too many'):
+        client.chat('system', 'user')
+    for _ in range(2):
+        client._slots.release()
+
+    assert client.chat('system', 'user') == gradient_stub.reply
+    assert client.breaker.state == 'closed'
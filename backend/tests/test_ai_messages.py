@@ -0,0 +1,42 @@
+import time
+import pytest
+from models import AIMessage
+
+
+@pytest.fixture
+def pending_message(db):
+    message = AIMessage(tier='great', status='pending')
+    db.session.add(message)
+    db.session.commit()
+    return message.id
+
+
+@pytest.mark.parametrize('wait', ['nan', 'NaN', 'inf', '-inf', 'soon'])
+def test_wait_must_be_a_finite_number(client, pending_message, wait):
+    start = time.monotonic()
+    response = client.get(f'/api/ai/messages/{pending_message}?wait={wait}')
+    assert response.status_code == 400
+    assert time.monotonic() - start < 0.5
+
+
+def test_pending_message_long_poll_gives_up_after_wait(client, pending_message):
+    start = time.monotonic()
+    response = client.get(f'/api/ai/messages/{pending_message}?wait=0.3')
+    assert response.status_code == 200
+    assert response.json['status'] == 'pending'
+    assert 0.3 <= time.monotonic() - start < 1.5
+
+
+def test_submitted_score_has_a_ready_fallback_message(client, prompt):
+    player = client.post('/api/players', json={'nickname': 'ADA', 'email': 'ada@example.com'}).json
+    score = client.post('/api/scores', json={
+        'player_id': player['id'], 'prompt_id': prompt['id'], 'wpm': 45, 'accuracy': 0.85,
+    }).json
+
+    response = client.get(f"/api/ai/messages/{score['message_id']}?wait=2")
+    assert response.json['status'] == 'ready'
+    assert response.json['message'] == 'GREAT JOB!'
+
+
+def test_unknown_message_is_a_404(client):
+    assert client.get('/api/ai/messages/no-such-message').status_code == 404
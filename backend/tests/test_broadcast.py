@@ -0,0 +1,130 @@
+import queue
+import threading
+import pytest
+from broadcast import QUEUE_SIZE, Broadcaster
+
+
+class Board:
+    """Stand-in topic: a version counter and a compute that can be held open"""
+
+    def __init__(self):
+        self.generation = 1
+        self.computes = 0
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = False  # Fail the next compute
+        self.rows = None
+
+    def version(self):
+        return self.generation
+
+    def compute(self):
+        self.computes += 1
+        self.gate.wait(5)
+        if self.fail:
+            self.fail = False
+            raise RuntimeError('database unavailable')
+        return {'leaderboard': self.rows or [f'gen-{self.generation}']}
+
+
+@pytest.fixture
+def broadcaster():
+    # The background thread never wakes during a test; poll() is called directly
+    return Broadcaster(poll_interval=3600)
+
+
+def subscribe_in_thread(broadcaster, board, results, name):
+    def run():
+        try:
+            q = broadcaster.subscribe(None, 'board', board.version, board.compute)
+            results[name] = q.get(timeout=5)
+        except Exception as e:
+            results[name] = e
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_subscribers_joining_during_the_first_compute_get_the_snapshot(broadcaster):
+    board = Board()
+    board.gate.clear()
+    results = {}
+
+    first = subscribe_in_thread(broadcaster, board, results, 1)
+    while board.computes == 0:
+        threading.Event().wait(0.01)
+    others = [subscribe_in_thread(broadcaster, board, results, n) for n in range(2, 13)]
+    board.gate.set()
+    for thread in [first] + others:
+        thread.join(5)
+
+    assert results == {n: {'leaderboard': ['gen-1']} for n in range(1, 13)}
+    assert board.computes == 1
+    assert broadcaster.subscriber_count('board') == 12
+
+
+def test_waiting_subscriber_retries_when_the_first_compute_fails(broadcaster):
+    board = Board()
+    board.gate.clear()
+    board.fail = True
+    results = {}
+
+    first = subscribe_in_thread(broadcaster, board, results, 1)
+    while board.computes == 0:
+        threading.Event().wait(0.01)
+    second = subscribe_in_thread(broadcaster, board, results, 2)
+    threading.Event().wait(0.05)
+    board.gate.set()
+    first.join(5)
+    second.join(5)
+
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == {'leaderboard': ['gen-1']}
+    assert broadcaster.subscriber_count('board') == 1
+
+
+def test_poll_publishes_only_changed_snapshots(broadcaster):
+    board = Board()
+    q = broadcaster.subscribe(None, 'board', board.version, board.compute)
+    assert q.get_nowait() == {'leaderboard': ['gen-1']}
+
+    broadcaster.poll()  # Version unchanged: nothing recomputed
+    assert board.computes == 1 and q.empty()
+
+    board.generation = 2
+    broadcaster.poll()
+    assert q.get_nowait() == {'leaderboard': ['gen-2']}
+
+    # A new version with the same snapshot isn't pushed again
+    board.rows = ['gen-2']
+    board.generation = 3
+    broadcaster.poll()
+    assert q.empty()
+
+
+def test_slow_subscribers_keep_the_newest_snapshots(broadcaster):
+    board = Board()
+    q = broadcaster.subscribe(None, 'board', board.version, board.compute)
+    for generation in range(2, QUEUE_SIZE + 4):
+        board.generation = generation
+        broadcaster.poll()
+
+    received = []
+    while True:
+        try:
+            received.append(q.get_nowait()['leaderboard'][0])
+        except queue.Empty:
+            break
+    assert received == [f'gen-{g}' for g in range(4, QUEUE_SIZE + 4)]
+
+
+def test_unsubscribed_topics_are_dropped(broadcaster):
+    board = Board()
+    q = broadcaster.subscribe(None, 'board', board.version, board.compute)
+    broadcaster.unsubscribe('board', q)
+    broadcaster.poll()
+
+    board.generation = 2
+    broadcaster.poll()
+    assert board.computes == 1
+    assert broadcaster.subscriber_count('board') == 0
@@ -0,0 +1,210 @@
+"""
+Parity of the compiled email classifier with the rule-by-rule classify_email
+it replaced (frozen below), and a throughput benchmark. Run with -s to see it.
+"""
+
+import random
+import re
+import string
+import time
+from email_classifier import EmailClassifier, classify_email
+
+PARITY_CASES = 50_000
+BENCHMARK_EMAILS = 200_000
+
+
+# --- Frozen copy of routes/admin.py before the classifier was compiled ---
+
+# DO team domains
+OLD_DO_DOMAINS = ['digitalocean.com', 'ajot.me']
+
+# Known personal email providers
+OLD_PERSONAL_DOMAINS = [
+    'gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com', 'icloud.com',
+    'aol.com', 'protonmail.com', 'proton.me', 'live.com', 'msn.com',
+    'me.com', 'mac.com', 'mail.com', 'ymail.com', 'googlemail.com',
+    'fastmail.com', 'zoho.com', 'tutanota.com', 'hey.com'
+]
+
+# Obviously fake domains
+OLD_FAKE_DOMAINS = [
+    'test.com', 'example.com', 'fake.com', 'asdf.com', 'xyz.com',
+    'aaa.com', 'abc.com', '123.com', 'temp.com', 'tempmail.com',
+    'mailinator.com', 'guerrillamail.com', 'throwaway.com',
+    'fakeemail.com', 'noemail.com', 'none.com', 'na.com', 'n.com',
+    'x.com', 'a.com', 'aa.com', 'aaaa.com', 'testing.com',
+    'do.com', 'robot.com', 'secret.com', 'email.com', 'mail.co'
+]
+
+# Suspicious TLDs often used for fake emails
+OLD_FAKE_TLDS = ['.xyz', '.tk', '.ml', '.ga', '.cf', '.gq']
+
+# Common TLD typos (misspellings of .com, .net, .org, etc.)
+OLD_TYPO_TLDS = [
+    '.co', '.con', '.cmo', '.ocm', '.vom', '.xom', '.om',  # .com typos
+    '.ner', '.nte', '.bet', '.met',                         # .net typos
+    '.ogr', '.otg', '.prg',                                 # .org typos
+    '.gmai', '.gmial', '.gmal',                             # gmail typos (in domain)
+]
+
+# Fake username patterns (regex)
+OLD_FAKE_USERNAME_PATTERNS = [
+    r'^test\d*$',           # test, test1, test123
+    r'^asdf+$',             # asdf, asdfasdf
+    r'^[a-z]$',             # single letter
+    r'^[a-z]{1,2}\d*$',     # a1, ab, ab123
+    r'^fake',               # fake, fakeuser
+    r'^none$',
+    r'^na$',
+    r'^null$',
+    r'^admin$',
+    r'^user\d*$',           # user, user1
+    r'^demo\d*$',           # demo, demo1
+    r'^sample\d*$',
+    r'^\d+$',               # all numbers
+    r'^x+$',                # x, xx, xxx
+    r'^aaa+$',              # aaa, aaaa
+    r'^player\d*$',         # player, player1
+    r'^hello$',             # hello
+    r'^noemail$',           # noemail
+    r'^secret$',            # secret
+    r'^xyz$',               # xyz
+    r'^lol$',               # lol
+    r'^lmao$',              # lmao
+    r'^hi$',                # hi
+    r'^hey$',               # hey
+    r'^yo$',                # yo
+    r'^blah$',              # blah
+    r'^foo$',               # foo
+    r'^bar$',               # bar
+    r'^baz$',               # baz
+    r'^qwerty',             # qwerty, qwerty123
+    r'^abcd*$',             # abc, abcd, abcde
+    r'.*[!@#$%^&*()+=].*',  # special chars in username (except . - _)
+]
+
+
+def old_classify_email(email: str) -> str:
+    """classify_email as it was before email_classifier.py"""
+    email = email.lower().strip()
+
+    if '@' not in email:
+        return 'fake'
+
+    username, domain = email.rsplit('@', 1)
+    domain_name = domain.split('.')[0] if '.' in domain else domain
+
+    # 1. Check DO domains FIRST - trust the domain, but reject obviously fake usernames
+    if domain in OLD_DO_DOMAINS:
+        # Only reject truly fake test usernames for DO domains
+        if username in ['test', 'asdf', 'fake', 'null', 'admin', 'user', 'demo', 'sample']:
+            return 'suspicious'
+        return 'do_employee'
+
+    # 2. Check fake username patterns (for non-DO emails)
+    for pattern in OLD_FAKE_USERNAME_PATTERNS:
+        if re.match(pattern, username):
+            return 'suspicious'
+
+    # 3. Check if username matches domain (secret@secret.com)
+    if username == domain_name:
+        return 'suspicious'
+
+    # 4. Check obviously fake domains
+    if domain in OLD_FAKE_DOMAINS:
+        return 'suspicious'
+
+    # 5. Check for suspicious TLDs
+    for tld in OLD_FAKE_TLDS:
+        if domain.endswith(tld):
+            return 'suspicious'
+
+    # 6. Check for TLD typos (e.g., gmail.co, gmail.con)
+    for typo in OLD_TYPO_TLDS:
+        if domain.endswith(typo):
+            return 'typo'
+
+    # 7. Check for very short domains (like do.com, x.co)
+    if len(domain_name) <= 2:
+        return 'suspicious'
+
+    # 8. Check for no TLD or malformed domain
+    if domain.count('.') == 0:
+        return 'suspicious'
+
+    # 8. Check personal email providers
+    if domain in OLD_PERSONAL_DOMAINS:
+        return 'personal'
+
+    # 9. Everything else is likely a company email
+    # (real domain, not a known personal provider)
+    return 'company'
+
+
+# --- End of frozen copy ---
+
+
+def edge_cases():
+    """Every rule's entries, with usernames and domains that sit on either side of them"""
+    usernames = ['test', 'test1', 'tester', 'asdf', 'asdfff', 'a', 'ab', 'ab12', 'abc1x', 'fakeuser',
+                 'none', 'na', 'null', 'admin', 'admins', 'user', 'user7', 'demo', 'sample2', '123',
+                 'x', 'xxx', 'aaa', 'aaaa', 'player9', 'hello', 'secret', 'qwerty123', 'abc', 'abcdd',
+                 'a!b', 'j+tag', 'jane.doe', 'jane_doe', 'jane-doe', 'gmail', 'acme', '', 'j@ne', ' Ada ']
+    domains = list(OLD_DO_DOMAINS) + list(OLD_PERSONAL_DOMAINS) + list(OLD_FAKE_DOMAINS)
+    domains += [f'acme{tld}' for tld in OLD_FAKE_TLDS + OLD_TYPO_TLDS]
+    domains += [f'mail.acme{tld}' for tld in OLD_FAKE_TLDS + OLD_TYPO_TLDS]
+    domains += ['acmexyz', 'acme.comx', 'acme.co.uk', 'acme.cox', 'gmail', 'ab.io', 'abc.io', 'acme.io',
+                'sub.digitalocean.com', 'DigitalOcean.com', 'acme', '', '.com', 'a..com', 'acme.com.']
+    cases = [f'{u}@{d}' for u in usernames for d in domains]
+    cases += ['no-at-sign', '', '@', '@@', 'a@b@c.com', 'UPPER@GMAIL.COM', '  spaced@acme.io  ']
+    return cases
+
+
+def random_emails(count, seed=18):
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits + '._-+!'
+    tlds = ['.com', '.io', '.org', '.net', '.co', '.xyz', '.con', '.dev', '.co.uk', '.om', '.tk']
+    known = OLD_PERSONAL_DOMAINS + OLD_FAKE_DOMAINS + OLD_DO_DOMAINS
+    emails = []
+    for _ in range(count):
+        username = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 10)))
+        if rng.random() < 0.3:
+            domain = rng.choice(known)
+        else:
+            name = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(1, 8)))
+            domain = name + rng.choice(tlds)
+        emails.append(f'{username}@{domain}')
+    return emails
+
+
+def test_classifier_matches_the_old_rules():
+    cases = edge_cases()
+    cases += random_emails(PARITY_CASES - len(cases))
+    expected = [old_classify_email(email) for email in cases]
+
+    # A fresh classifier and the module one, whose domain cache other tests have warmed
+    assert EmailClassifier().classify_many(cases) == expected
+    mismatches = [(email, old) for email, old in zip(cases, expected) if classify_email(email) != old]
+    assert mismatches == []
+    assert len(set(expected)) == 6  # Every verdict is exercised
+
+
+def test_classifier_benchmark():
+    emails = random_emails(BENCHMARK_EMAILS, seed=1)
+    timings = {}
+
+    start = time.perf_counter()
+    old = [old_classify_email(email) for email in emails]
+    timings['rule by rule'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = EmailClassifier().classify_many(emails)
+    timings['compiled'] = time.perf_counter() - start
+    assert new == old
+
+    print(f"\n{BENCHMARK_EMAILS} emails")
+    print(f"{'classifier':<14} {'emails/s':>12}")
+    for name, seconds in timings.items():
+        print(f"{name:<14} {BENCHMARK_EMAILS / seconds:>12,.0f}")
+
+    assert timings['compiled'] < timings['rule by rule'] / 3
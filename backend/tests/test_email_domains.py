@@ -0,0 +1,53 @@
+# The upgrade scripts build the app on import, so they are imported inside the tests
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from models import Player, email_domain, normalize_email
+from routes.admin import player_stats_query
+
+
+def add_players(db, emails):
+    db.session.add_all(
+        Player(nickname=f'p{i}', email=email, email_normalized=normalize_email(email))
+        for i, email in enumerate(emails)
+    )
+    db.session.commit()
+
+
+def plan(db, query):
+    """EXPLAIN output for a query, with sequential scans discouraged as on a large table"""
+    sql = query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True})
+    db.session.execute(text('SET LOCAL enable_seqscan = off'))
+    return '\n'.join(db.session.execute(text(f'EXPLAIN {sql}')).scalars())
+
+
+def test_backfill_matches_email_domain(db):
+    from backfill_email_domains import add_email_domain, fill_email_domains
+    emails = ['a@DigitalOcean.com', ' b@Example.org ', 'no-at-sign', 'c@', 'd@x@y.io']
+    add_players(db, emails)
+
+    add_email_domain()
+    assert fill_email_domains() == 4  # Every address with an @; 'c@' gets NULL
+    domains = dict(db.session.query(Player.email, Player.email_domain))
+    assert domains == {email: email_domain(email) for email in emails}
+
+
+def test_domain_filters_use_the_domain_index(db):
+    from backfill_email_domains import add_email_domain, fill_email_domains
+    add_players(db, [f'user{i}@example{i % 50}.com' for i in range(500)])
+    add_email_domain()
+    fill_email_domains()
+    db.session.execute(text('ANALYZE players'))
+
+    assert 'ix_players_email_domain' in plan(db, player_stats_query('@example7.com', 'all'))
+    assert 'ix_players_email_domain' in plan(db, player_stats_query('', 'only_do'))
+
+
+def test_substring_search_uses_the_trigram_index(db):
+    from backfill_email_domains import add_email_search_index
+    add_players(db, [f'user{i}@example{i % 50}.com' for i in range(500)])
+    if not add_email_search_index():
+        pytest.skip('pg_trgm is not available on the test database')
+    db.session.execute(text('ANALYZE players'))
+
+    assert 'ix_players_email_trgm' in plan(db, player_stats_query('user42@', 'all'))
@@ -0,0 +1,64 @@
+"""
+Streaming admin exports: the players CSV keeps the dashboard's layout, and
+memory stays flat while a large export streams. Run with -s to see the RSS.
+"""
+
+import csv
+import io
+import os
+import pytest
+from conftest import seed_scores
+
+# Scores in the large export, and the most RSS it may add while streaming
+LARGE_EXPORT_SCORES = 100_000
+MAX_RSS_GROWTH = 16 * 1024 * 1024
+
+
+def rss():
+    """Current resident set size in bytes (Linux)"""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def test_players_csv_keeps_the_dashboard_layout(client, db, prompt):
+    from models import Player
+    seed_scores(db, prompt['id'], players=2, scores_per_player=2)
+    Player.query.filter_by(nickname='PLAYER0').update({'email_type': 'do_employee'})
+    db.session.commit()
+
+    response = client.get('/api/admin/export/players')
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ['Nickname', 'Email', 'Type', 'Games Played', 'Best Score', 'Avg WPM', 'Avg Accuracy']
+
+    stats = {p['nickname']: p for p in client.get('/api/admin/stats').json['players']}
+    assert len(rows) - 1 == len(stats)
+    for nickname, email, type_, games, best, wpm, accuracy in rows[1:]:
+        player = stats[nickname]
+        assert (email, games, best, wpm) == (
+            player['email'], str(player['games_played']), str(player['best_score']), str(player['avg_wpm'])
+        )
+        assert accuracy == f"{player['avg_accuracy']}%"
+        assert type_ == ('Shark' if nickname == 'PLAYER0' else '')
+
+    ndjson = client.get('/api/admin/export/players?format=ndjson').get_data(as_text=True)
+    assert '"id"' in ndjson and '"email_type": "do_employee"' in ndjson
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason='reads RSS from /proc')
+def test_large_export_streams_in_flat_memory(client, db, prompt):
+    seed_scores(db, prompt['id'], players=LARGE_EXPORT_SCORES // 4, scores_per_player=4)
+
+    response = client.get('/api/admin/export/scores', buffered=False)
+    baseline = peak = rss()
+    size = lines = 0
+    for chunk in response.response:
+        size += len(chunk)
+        lines += chunk.count(b'\n' if isinstance(chunk, bytes) else '\n')
+        peak = max(peak, rss())
+    response.close()
+
+    print(f"\nexported {lines - 1} scores, {size / 1e6:.1f} MB; RSS grew {(peak - baseline) / 1e6:.1f} MB")
+    assert lines - 1 == LARGE_EXPORT_SCORES
+    assert peak - baseline < MAX_RSS_GROWTH
+    assert peak - baseline < size / 2
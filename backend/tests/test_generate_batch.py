@@ -0,0 +1,94 @@
+"""
+Batch prompt generation as a background job, against the mock Gradient server.
+"""
+
+import itertools
+import random
+import time
+import routes.prompts
+from ai_client import AIClient
+from routes.prompts import GENERATE_CONCURRENCY, corpus_index
+
+WORDS = ('droplet volume bucket cluster node pod replica load balancer firewall backup snapshot '
+         'region image kernel network vpc domain record certificate registry container function').split()
+
+
+def distinct_replies(duplicate_of=None, duplicate_every=0):
+    """Stub replies with unrelated word salad, repeating duplicate_of every duplicate_every calls"""
+    calls = itertools.count(1)
+    rng = random.Random(7)
+
+    def reply(body):
+        if duplicate_every and next(calls) % duplicate_every == 0:
+            return duplicate_of
+        return ' '.join(rng.choice(WORDS) for _ in range(30))
+    return reply
+
+
+def wait_for(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/api/prompts/generate-batch/{job_id}').get_json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} still {job["status"]}')
+
+
+def test_batch_runs_in_the_background(client, prompt, gradient_stub, monkeypatch):
+    monkeypatch.setattr(routes.prompts, 'ai_client', AIClient())
+    gradient_stub.latency = 0.1
+    gradient_stub.reply = distinct_replies(duplicate_of=prompt['text'], duplicate_every=4)
+
+    start = time.monotonic()
+    response = client.post('/api/prompts/generate-batch', json={'count': 12, 'difficulty': 'hard'})
+    assert response.status_code == 202
+    assert time.monotonic() - start < 0.1  # Doesn't wait on the model
+
+    job = wait_for(client, response.get_json()['job_id'])
+    assert job['status'] == 'done'
+    assert job['processed'] == 12
+    assert (job['counts']['created'], job['counts']['duplicates']) == (9, 3)
+    assert gradient_stub.max_in_flight <= GENERATE_CONCURRENCY  # Slots left for performance messages
+
+    from models import Prompt
+    assert Prompt.query.filter_by(difficulty='hard').count() == 9
+    assert Prompt.query.filter(Prompt.difficulty_score.isnot(None)).count() == 9
+
+
+def test_unknown_job_is_not_found(client, db):
+    assert client.get('/api/prompts/generate-batch/nope').status_code == 404
+
+
+def test_corpus_index_only_signs_new_or_edited_prompts(db, prompt, monkeypatch):
+    from models import Prompt
+    db.session.add(Prompt(text='Droplets are virtual machines you can resize.', category='droplets', difficulty='easy'))
+    db.session.commit()
+
+    signed = []
+    sign = routes.prompts.signature
+    monkeypatch.setattr(routes.prompts, 'signature', lambda text: signed.append(text) or sign(text))
+    routes.prompts._corpus_signatures.clear()
+
+    corpus_index()
+    assert len(signed) == 2
+
+    edited = db.session.get(Prompt, prompt['id'])
+    edited.text = 'A completely different sentence about load balancers.'
+    db.session.commit()
+    signed.clear()
+    index = corpus_index()
+    assert signed == [edited.text]
+    assert index.query('A completely different sentence about load balancers.')
+
+
+def test_malformed_categories_are_rejected_before_starting(client, db, gradient_stub, monkeypatch):
+    monkeypatch.setattr(routes.prompts, 'ai_client', AIClient())
+    for categories in ([{'name': 'droplets'}], [['droplets']], 'droplets', {'droplets': 1}):
+        response = client.post('/api/prompts/generate-batch', json={'count': 1, 'categories': categories})
+        assert response.status_code == 400, categories
+    assert client.post('/api/prompts/generate-batch', json=['droplets']).status_code == 400
+
+    from models import Job
+    assert Job.query.count() == 0
+    assert gradient_stub.requests == 0
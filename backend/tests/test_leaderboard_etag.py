@@ -0,0 +1,92 @@
+"""
+ETag / 304 on the leaderboard polls, with the kiosk polling benchmark.
+
+Run with -s to see the benchmark table.
+"""
+
+import cache
+from conftest import record_sql, seed_scores
+from routes.leaderboard import leaderboard_cache
+
+# Kiosk pattern: every kiosk polls both boards; a new score lands every SCORE_EVERY polls
+KIOSKS = 10
+ROUNDS = 30
+SCORE_EVERY = 100
+BOARDS = ('/api/leaderboard', '/api/leaderboard/all-time')
+
+
+def test_matching_etag_gets_an_empty_304(client, db, prompt):
+    seed_scores(db, prompt['id'], players=5)
+    for path in BOARDS:
+        first = client.get(path)
+        again = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+        assert first.status_code == 200 and first.json['leaderboard']
+        assert again.status_code == 304 and again.data == b''
+        assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_new_score_changes_the_etag(client, db, prompt):
+    player_ids = seed_scores(db, prompt['id'], players=5)
+    etags = {path: client.get(path).headers['ETag'] for path in BOARDS}
+
+    response = client.post('/api/scores', json={
+        'player_id': player_ids[0], 'prompt_id': prompt['id'], 'wpm': 200, 'accuracy': 1.0,
+    })
+    assert response.status_code == 201
+
+    for path, etag in etags.items():
+        response = client.get(path, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.json['leaderboard'][0]['wpm'] == 200
+
+
+def poll(client, db, mode, player_ids, prompt_id):
+    """Replay the kiosk pattern; returns (response bytes, statements, DB seconds) for the polls only"""
+    etags = {}
+    total_bytes = statements = 0
+    seconds = 0.0
+
+    for i in range(KIOSKS * ROUNDS):
+        if i and i % SCORE_EVERY == 0:
+            client.post('/api/scores', json={
+                'player_id': player_ids[i % len(player_ids)], 'prompt_id': prompt_id, 'wpm': 60 + i % 50,
+                'accuracy': 0.95,
+            })
+        kiosk = i % KIOSKS
+        for path in BOARDS:
+            # Polls are seconds apart, so each one re-reads the generation (the 1s memo has expired)
+            cache._generations.clear()
+            if mode == 'recompute':
+                leaderboard_cache.clear()
+            headers = {}
+            if mode == 'conditional' and (kiosk, path) in etags:
+                headers['If-None-Match'] = etags[kiosk, path]
+
+            with record_sql(db.engine) as log:
+                response = client.get(path, headers=headers)
+            etags[kiosk, path] = response.headers['ETag']
+            total_bytes += len(response.data)
+            statements += len(log.statements)
+            seconds += log.seconds
+    return total_bytes, statements, seconds
+
+
+def test_kiosk_polling_benchmark(client, db, prompt):
+    player_ids = seed_scores(db, prompt['id'], players=200, scores_per_player=10)
+
+    results = {}
+    for mode in ('recompute', 'full_body', 'conditional'):
+        leaderboard_cache.clear()
+        results[mode] = poll(client, db, mode, player_ids, prompt['id'])
+
+    print(f"\n{KIOSKS * ROUNDS * len(BOARDS)} polls, a new score every {SCORE_EVERY} kiosk polls")
+    print(f"{'mode':<12} {'bytes':>10} {'statements':>11} {'DB ms':>9}")
+    for mode, (total_bytes, statements, seconds) in results.items():
+        print(f"{mode:<12} {total_bytes:>10} {statements:>11} {seconds * 1000:>9.1f}")
+
+    recompute, full_body, conditional = results['recompute'], results['full_body'], results['conditional']
+    # Only the first poll per kiosk after a new score carries a body
+    assert conditional[0] < full_body[0] * 0.15
+    # No ranking queries for unchanged boards: only the generation reads remain
+    assert conditional[1] <= full_body[1] < recompute[1]
+    assert conditional[2] < recompute[2]
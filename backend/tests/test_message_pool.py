@@ -0,0 +1,71 @@
+"""
+Performance messages from the pre-generated pool, with the benchmark against a
+mock Gradient server. Run with -s to see the benchmark table.
+"""
+
+import statistics
+import time
+import message_pool as message_pool_module
+import routes.ai
+from ai_client import AIClient
+from message_pool import MessagePool
+from routes.ai import PERFORMANCE_TIERS, generate_performance_message, get_performance_tier, pooled_performance_message
+
+# Model latency injected by the stub, and finished games per path
+MODEL_LATENCY = 0.1
+GAMES = 20
+
+
+def use_stub_pool(monkeypatch, pool_size=2):
+    """Point routes.ai at a fresh client and pool (refilled by hand, no background thread)"""
+    monkeypatch.setattr(message_pool_module, 'POOL_SIZE', pool_size)
+    monkeypatch.setattr(routes.ai, 'ai_client', AIClient())
+    pool = MessagePool(PERFORMANCE_TIERS, routes.ai.generate_message_template)
+    monkeypatch.setattr(pool, 'start', lambda: None)
+    monkeypatch.setattr(routes.ai, 'message_pool', pool)
+    return pool
+
+
+def test_templates_are_filled_with_the_players_stats(gradient_stub, monkeypatch):
+    pool = use_stub_pool(monkeypatch)
+    pool.refill_once()
+
+    message, tier, ai_generated = pooled_performance_message('ada', 85, 0.97)
+    assert (message, tier, ai_generated) == ('ADA HIT 85 WPM AT 97%!', 'legendary', True)
+
+
+def test_empty_pool_leaves_the_message_to_the_caller(gradient_stub, monkeypatch):
+    use_stub_pool(monkeypatch)
+    assert pooled_performance_message('ada', 30, 0.9) == (None, 'good', False)
+    assert gradient_stub.requests == 0  # Never waits on the model
+
+
+def test_pooled_messages_benchmark(gradient_stub, monkeypatch):
+    gradient_stub.latency = MODEL_LATENCY
+    pool = use_stub_pool(monkeypatch)
+    while pool.refill_once():
+        pass
+    games = [(f'player{i}', 15 + 7 * i, 0.8 + i / 100) for i in range(GAMES)]
+
+    timings = {'one call per game': [], 'pool': []}
+    for nickname, wpm, accuracy in games:
+        tier = get_performance_tier(wpm, accuracy)['tier']
+        start = time.perf_counter()
+        generate_performance_message(tier, nickname, wpm, accuracy)
+        timings['one call per game'].append(time.perf_counter() - start)
+
+    requests = gradient_stub.requests
+    for nickname, wpm, accuracy in games:
+        start = time.perf_counter()
+        message, _, _ = pooled_performance_message(nickname, wpm, accuracy)
+        timings['pool'].append(time.perf_counter() - start)
+        assert message
+    assert gradient_stub.requests == requests  # The pool answered every game
+
+    print(f"\n{GAMES} games, model latency {MODEL_LATENCY * 1000:.0f} ms")
+    print(f"{'path':<18} {'p50 ms':>9} {'max ms':>9}")
+    for path, values in timings.items():
+        print(f"{path:<18} {statistics.median(values) * 1000:>9.3f} {max(values) * 1000:>9.3f}")
+
+    assert statistics.median(timings['one call per game']) >= MODEL_LATENCY
+    assert max(timings['pool']) < 0.005
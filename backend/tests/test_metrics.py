@@ -0,0 +1,110 @@
+"""
+/api/metrics under gunicorn: the workers write their metrics to
+PROMETHEUS_MULTIPROC_DIR, and a scrape of any worker sums all of them.
+"""
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import pytest
+from prometheus_client import REGISTRY
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 2
+REQUESTS = 20
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.status, response.read().decode()
+
+
+@pytest.fixture
+def gunicorn_server(app, tmp_path):
+    """gunicorn with the repo's gunicorn.conf.py, as deployed, metrics dir left to the config"""
+    pytest.importorskip('gunicorn')
+    env = {**os.environ, 'TMPDIR': str(tmp_path)}
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(WORKERS),
+         '--worker-class', 'gthread', '--threads', '4', 'app:app'],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            get(f'{url}/api/health')
+            break
+        except OSError:
+            if time.monotonic() > deadline or server.poll() is not None:
+                server.kill()
+                pytest.fail('gunicorn did not start')
+            time.sleep(0.2)
+    try:
+        yield url, tmp_path / 'typing-master-metrics'
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def test_metrics_are_summed_across_workers(gunicorn_server):
+    url, metrics_dir = gunicorn_server
+    for _ in range(REQUESTS):
+        assert get(f'{url}/api/health')[0] == 200
+
+    status, body = get(f'{url}/api/metrics')
+    assert status == 200
+    counts = re.findall(r'^http_request_duration_seconds_count\{endpoint="/api/health"[^}]*\} (\S+)$', body, re.M)
+    # The readiness probe's requests are in there too
+    assert sum(float(count) for count in counts) >= REQUESTS + 1
+    assert 'http_request_sql_statements_bucket' in body
+    assert list(metrics_dir.glob('*.db'))
+
+
+def test_failed_statements_are_counted_and_timed(client, db, prompt):
+    labels = {'endpoint': '/api/scores', 'method': 'POST'}
+    requests = sample('http_request_sql_statements_count', **labels)
+    statements = sample('http_request_sql_statements_sum', **labels)
+
+    response = client.post('/api/scores', json={'player_id': 'nobody', 'prompt_id': prompt['id'],
+                                                'wpm': 50, 'accuracy': 0.9})
+    assert response.status_code == 404  # The insert failed on the player foreign key
+
+    assert sample('http_request_sql_statements_count', **labels) == requests + 1
+    assert sample('http_request_sql_statements_sum', **labels) >= statements + 1
+    # No start time left behind on the pooled connection for the next query to pop
+    with db.engine.connect() as conn:
+        assert not conn.info.get('query_started')
+
+
+def test_unhandled_errors_are_recorded_as_500s(client, app, monkeypatch):
+    def broken():
+        raise RuntimeError('boom')
+    monkeypatch.setitem(app.view_functions, 'health', broken)
+    labels = {'endpoint': '/api/health', 'method': 'GET', 'status': '500'}
+    errors = sample('http_request_duration_seconds_count', **labels)
+
+    assert client.get('/api/health').status_code == 500
+    assert sample('http_request_duration_seconds_count', **labels) == errors + 1
+
+    # Also when the exception propagates past after_request, as in debug or testing mode
+    monkeypatch.setitem(app.config, 'PROPAGATE_EXCEPTIONS', True)
+    with pytest.raises(RuntimeError):
+        client.get('/api/health')
+    assert sample('http_request_duration_seconds_count', **labels) == errors + 2
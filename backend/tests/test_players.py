@@ -0,0 +1,47 @@
+def register(client, nickname, email):
+    return client.post('/api/players', json={'nickname': nickname, 'email': email})
+
+
+def submit_score(client, player_id, prompt_id, wpm=50, accuracy=0.9):
+    response = client.post('/api/scores', json={
+        'player_id': player_id, 'prompt_id': prompt_id, 'wpm': wpm, 'accuracy': accuracy,
+    })
+    assert response.status_code == 201, response.json
+    return response.json
+
+
+def board_nicknames(client, path):
+    return [entry['nickname'] for entry in client.get(path).json['leaderboard']]
+
+
+def test_returning_player_is_matched_by_normalized_email(client):
+    first = register(client, 'ADA', 'Ada@Example.com')
+    again = register(client, 'ADA', '  ada@example.COM ')
+
+    assert first.status_code == 201
+    assert again.status_code == 200
+    assert again.json['id'] == first.json['id']
+
+
+def test_nickname_change_refreshes_cached_boards(client, prompt):
+    player = register(client, 'ADA', 'ada@example.com').json
+    submit_score(client, player['id'], prompt['id'])
+    for path in ('/api/leaderboard', '/api/leaderboard/all-time'):
+        assert board_nicknames(client, path) == ['ADA']
+    etag = client.get('/api/leaderboard/all-time').headers['ETag']
+
+    register(client, 'LOVELACE', 'ada@example.com')
+
+    for path in ('/api/leaderboard', '/api/leaderboard/all-time'):
+        assert board_nicknames(client, path) == ['LOVELACE']
+    assert client.get('/api/leaderboard/all-time', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_same_nickname_keeps_cached_boards(client, prompt):
+    player = register(client, 'ADA', 'ada@example.com').json
+    submit_score(client, player['id'], prompt['id'])
+    etag = client.get('/api/leaderboard/all-time').headers['ETag']
+
+    register(client, 'ADA', 'ada@example.com')
+
+    assert client.get('/api/leaderboard/all-time', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,69 @@
+import time
+import prompt_pool as prompt_pool_module
+from models import Prompt
+from prompt_pool import PromptPool
+
+
+def times_used(db, prompt_id):
+    db.session.expire_all()
+    return db.session.get(Prompt, prompt_id).times_used
+
+
+def test_failed_flush_keeps_the_counts(db, prompt, monkeypatch):
+    pool = PromptPool()
+    pool.record_use(prompt['id'], 3)
+
+    def unavailable(*args, **kwargs):
+        raise RuntimeError('database unavailable')
+    with monkeypatch.context() as patch:
+        patch.setattr(db.session, 'execute', unavailable)
+        assert pool.flush() is False
+
+    pool.record_use(prompt['id'])
+    assert pool.flush() is True
+    assert times_used(db, prompt['id']) == 4
+    assert pool.flush() is True  # Nothing left to write
+
+
+def test_counts_are_flushed_without_further_traffic(app, db, prompt, monkeypatch):
+    monkeypatch.setattr(prompt_pool_module, 'FLUSH_INTERVAL', 0.05)
+    pool = PromptPool()
+    pool.start(app)
+    pool.record_use(prompt['id'], 2)
+
+    deadline = time.monotonic() + 5
+    while times_used(db, prompt['id']) != 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert times_used(db, prompt['id']) == 2
+
+
+def test_usage_endpoint_buffers_instead_of_writing(client, db, prompt):
+    response = client.post('/api/prompts/usage', json={'prompt_ids': [prompt['id'], prompt['id']]})
+    assert response.json == {'recorded': 2}
+    assert times_used(db, prompt['id']) == 0
+
+    prompt_pool_module.prompt_pool.flush()
+    assert times_used(db, prompt['id']) == 2
+
+
+def test_bundle_takes_a_long_exclude_list_as_json(client, db, prompt):
+    fresh = Prompt(text='Volumes are block storage you attach to a Droplet.', category='volumes', difficulty='easy')
+    db.session.add(fresh)
+    db.session.commit()
+
+    # Far more ids than fit in gunicorn's 4094-byte request line, the prompt already seen last
+    exclude = [f'{i:036d}' for i in range(1000)] + [prompt['id']]
+    response = client.post('/api/prompts/bundle', json={'count': 1, 'exclude': exclude})
+    assert response.status_code == 200
+    assert [p['id'] for p in response.json['prompts']] == [fresh.id]
+
+    assert client.post('/api/prompts/bundle', json=['not', 'an', 'object']).status_code == 400
+
+
+def test_non_finite_difficulty_bands_are_rejected(client, db, prompt):
+    for query in ('min_difficulty=nan', 'max_difficulty=inf', 'min_difficulty=-Infinity'):
+        assert client.get(f'/api/prompts/random?{query}').status_code == 400
+        assert client.get(f'/api/prompts/bundle?{query}').status_code == 400
+    response = client.post('/api/sessions/start', json={'nickname': 'ADA', 'email': 'ada@example.com',
+                                                        'min_difficulty': 'nan'})
+    assert response.status_code == 400
@@ -0,0 +1,22 @@
+from sqlalchemy import text
+
+
+def test_upgrade_brings_an_old_prompts_table_up_to_date(client, db, prompt):
+    from score_prompts import METRIC_COLUMNS, add_metric_columns, fill_metrics  # Builds the app on import
+    # The prompts table as it was before difficulty metrics
+    for name in METRIC_COLUMNS:
+        db.session.execute(text(f'ALTER TABLE prompts DROP COLUMN {name}'))
+    db.session.commit()
+
+    for _ in range(2):  # Re-running is harmless
+        add_metric_columns()
+        assert fill_metrics() == 1
+        db.session.commit()
+
+    indexes = db.session.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'prompts'")).scalars()
+    assert 'ix_prompts_difficulty_score' in set(indexes)
+
+    response = client.get('/api/prompts/random')
+    assert response.status_code == 200
+    assert response.json['id'] == prompt['id']
+    assert response.json['difficulty_score'] is not None
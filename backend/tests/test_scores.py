@@ -0,0 +1,137 @@
+import threading
+import time
+import pytest
+from conftest import record_sql
+
+
+def new_player(client, nickname='ADA', email='ada@example.com'):
+    return client.post('/api/players', json={'nickname': nickname, 'email': email}).json
+
+
+def score_payload(player_id, prompt_id, **extra):
+    return {'player_id': player_id, 'prompt_id': prompt_id, 'wpm': 72, 'accuracy': 0.96, **extra}
+
+
+def test_submission_takes_two_statements(client, db, prompt):
+    player = new_player(client)
+    client.get('/api/leaderboard')  # Warm the generation memo, as a running kiosk would have
+
+    for _ in range(3):
+        with record_sql(db.engine) as log:
+            response = client.post('/api/scores', json=score_payload(player['id'], prompt['id']))
+        assert response.status_code == 201
+        assert len(log.statements) <= 2, log.statements
+
+    body = response.json
+    assert body['player']['nickname'] == 'ADA'
+    assert body['score'] == int(72 * 0.96 * 100)
+    assert body['message_id']
+
+
+def test_missing_references_are_404s_from_the_foreign_keys(client, db, prompt):
+    player = new_player(client)
+    cases = {
+        'Player not found': score_payload('no-such-player', prompt['id']),
+        'Prompt not found': score_payload(player['id'], 'no-such-prompt'),
+        'Event not found': score_payload(player['id'], prompt['id'], event_id='no-such-event'),
+    }
+    for message, payload in cases.items():
+        with record_sql(db.engine) as log:
+            response = client.post('/api/scores', json=payload)
+        assert (response.status_code, response.json['error']) == (404, message)
+        assert len(log.statements) == 1
+
+
+def test_retried_submission_returns_the_original_score(client, db, prompt):
+    player = new_player(client)
+    payload = score_payload(player['id'], prompt['id'], idempotency_key='kiosk-1:42')
+
+    first = client.post('/api/scores', json=payload)
+    retry = client.post('/api/scores', json=payload)
+
+    assert (first.status_code, retry.status_code) == (201, 200)
+    assert retry.json['id'] == first.json['id']
+    assert retry.json['message_id'] == first.json['message_id']
+
+
+def test_malformed_batch_items_are_rejected_alone(client, db, prompt):
+    player = new_player(client)
+    good = score_payload(player['id'], prompt['id'], idempotency_key='kiosk-1:1')
+    malformed = [
+        score_payload(player['id'], prompt['id'], idempotency_key='kiosk-1:2', wpm='50'),
+        score_payload(player['id'], prompt['id'], idempotency_key=123),
+        score_payload(player['id'], prompt['id'], idempotency_key='kiosk-1:3', accuracy=True),
+        score_payload({'id': 1}, prompt['id'], idempotency_key='kiosk-1:4'),
+        'not an object',
+    ]
+
+    response = client.post('/api/scores/batch', json={'scores': [good, *malformed]})
+    assert response.status_code == 200
+    assert [r['status'] for r in response.json['results']] == ['created'] + ['error'] * len(malformed)
+    assert (response.json['created'], response.json['errors']) == (1, len(malformed))
+
+    for item in malformed[:2]:
+        assert client.post('/api/scores', json=item).status_code == 400
+
+
+def test_queued_scores_are_dated_by_when_they_were_played(client, db, prompt):
+    from datetime import datetime, timedelta
+    from models import Score, ScoreHistogram
+    player = new_player(client)
+    played = datetime.utcnow() - timedelta(days=1)
+    batch = [
+        score_payload(player['id'], prompt['id'], idempotency_key='kiosk-1:1',
+                      started_at=played.isoformat() + 'Z'),
+        score_payload(player['id'], prompt['id'], idempotency_key='kiosk-1:2',
+                      started_at=(datetime.utcnow() + timedelta(days=1)).isoformat()),  # Kiosk clock ahead
+    ]
+    assert client.post('/api/scores/batch', json={'scores': batch}).json['created'] == 2
+
+    yesterday, clamped = (Score.query.filter_by(idempotency_key=key).one().created_at
+                          for key in ('kiosk-1:1', 'kiosk-1:2'))
+    assert yesterday == played
+    assert clamped <= datetime.utcnow()
+
+    periods = {period for (period,) in db.session.query(ScoreHistogram.period).filter(ScoreHistogram.period != 'all')}
+    assert periods == {played.strftime('%Y-%m-%d'), datetime.utcnow().strftime('%Y-%m-%d')}
+
+
+def histograms(db):
+    from models import ScoreHistogram
+    db.session.expire_all()
+    return {(h.event_key, h.period, h.score): h.count for h in ScoreHistogram.query if h.count}
+
+
+@pytest.mark.parametrize('earlier, first, second', [
+    (30, 50, 60),    # Both beat an existing best
+    (None, 50, 60),  # The board is new; the second submission's best replaces the first's
+    (None, 60, 50),  # The board is new; the first submission's best stands
+])
+def test_concurrent_submissions_keep_the_histograms_exact(client, db, prompt, earlier, first, second):
+    from rebuild_rollups import rebuild_score_histograms
+    from rollups import event_key, write_score_rollups
+    from routes.scores import insert_score, parse_score
+    player = new_player(client)
+    if earlier:
+        client.post('/api/scores', json=score_payload(player['id'], prompt['id'], wpm=earlier, accuracy=1.0))
+
+    # The first submission writes its score and rollups but hasn't committed yet...
+    values, _ = parse_score(score_payload(player['id'], prompt['id'], wpm=first, accuracy=1.0))
+    score, _, previous_best = insert_score(values)
+    board = (score.player_id, event_key(score.event_id))
+    write_score_rollups([score], {board: previous_best} if previous_best is not None else {})
+
+    # ...when the second arrives on another connection
+    responses = []
+    second_submission = threading.Thread(target=lambda: responses.append(
+        client.post('/api/scores', json=score_payload(player['id'], prompt['id'], wpm=second, accuracy=1.0))
+    ))
+    second_submission.start()
+    time.sleep(0.3)
+    db.session.commit()
+    second_submission.join()
+    assert responses[0].status_code == 201
+
+    incremental = histograms(db)
+    rebuild_score_histograms()
+    assert incremental == histograms(db)
@@ -0,0 +1,80 @@
+"""
+/sessions/start against the three calls it replaced at the kiosk: register,
+record consent, fetch a prompt. Run with -s to see the benchmark table.
+"""
+
+import statistics
+import time
+from conftest import record_sql
+
+# Games started per flow, and the booth-to-server round trip each request costs
+GAMES = 30
+BOOTH_RTT = 0.08
+
+
+def create_event(client):
+    return client.post('/api/events', json={
+        'slug': 'booth', 'name': 'Booth',
+        'config': {'consent': {'enabled': True, 'label': 'Email me'}},
+    }).json
+
+
+def three_calls(client, event, email):
+    player = client.post('/api/players', json={'nickname': 'ADA', 'email': email})
+    consent = client.post(f"/api/events/{event['id']}/consent",
+                          json={'player_id': player.json['id'], 'consented': True})
+    prompt = client.get('/api/prompts/random')
+    return [player, consent, prompt]
+
+
+def one_call(client, event, email):
+    return [client.post('/api/sessions/start', json={
+        'nickname': 'ADA', 'email': email, 'event_id': event['id'], 'consented': True, 'prompt_count': 1,
+    })]
+
+
+def test_start_registers_consents_and_hands_out_a_prompt(client, db, prompt):
+    from models import EventConsent
+    event = create_event(client)
+
+    response = one_call(client, event, 'ada@example.com')[0]
+    assert response.status_code == 201
+    assert response.json['player']['nickname'] == 'ADA'
+    assert [p['id'] for p in response.json['prompts']] == [prompt['id']]
+    consent = EventConsent.query.one()
+    assert (consent.player_id, consent.consented, consent.consent_text) == (
+        response.json['player']['id'], True, 'Email me'
+    )
+
+    again = one_call(client, event, 'ADA@example.com ')[0]
+    assert again.status_code == 200
+    assert again.json['player']['id'] == response.json['player']['id']
+
+
+def test_start_benchmark(client, db, prompt):
+    event = create_event(client)
+    client.get('/api/prompts/random')  # Warm the pool and generation memos, as a running kiosk would have
+
+    results = {}
+    for name, flow in (('three calls', three_calls), ('sessions/start', one_call)):
+        timings, statements = [], 0
+        for game in range(GAMES):
+            with record_sql(db.engine) as log:
+                start = time.perf_counter()
+                responses = flow(client, event, f'{name.replace(" ", "")}{game}@example.com')
+                timings.append(time.perf_counter() - start)
+            assert all(r.status_code in (200, 201) for r in responses)
+            statements += len(log.statements)
+        results[name] = (statistics.median(timings), statements / GAMES, len(responses))
+
+    print(f"\n{GAMES} games per flow, booth round trip {BOOTH_RTT * 1000:.0f} ms")
+    print(f"{'flow':<16} {'requests':>9} {'statements':>11} {'server ms':>10} {'at booth ms':>12}")
+    for name, (server, statements, requests) in results.items():
+        print(f"{name:<16} {requests:>9} {statements:>11.1f} {server * 1000:>10.2f} "
+              f"{(server + requests * BOOTH_RTT) * 1000:>12.1f}")
+
+    three, one = results['three calls'], results['sessions/start']
+    assert (three[2], one[2]) == (3, 1)
+    assert one[1] <= three[1]
+    # The two saved round trips outweigh any difference in server time
+    assert one[0] + BOOTH_RTT < three[0] + 3 * BOOTH_RTT
@@ -0,0 +1,28 @@
+from sqlalchemy import text
+
+
+def scores_indexes(db):
+    return set(db.session.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'scores'")).scalars())
+
+
+def test_upgrade_brings_an_old_scores_table_up_to_date(client, db, prompt):
+    from upgrade_scores import add_board_index, add_idempotency_key  # Builds the app on import
+    # The scores table as it was before idempotency keys and keyset pagination
+    db.session.execute(text('ALTER TABLE scores DROP COLUMN idempotency_key'))
+    db.session.execute(text('DROP INDEX ix_scores_board'))
+    db.session.commit()
+
+    for _ in range(2):  # Re-running is harmless
+        add_idempotency_key()
+        add_board_index()
+        db.session.commit()
+
+    assert {'scores_idempotency_key_key', 'ix_scores_board'} <= scores_indexes(db)
+
+    player = client.post('/api/players', json={'nickname': 'ADA', 'email': 'ada@example.com'}).json
+    payload = {'player_id': player['id'], 'prompt_id': prompt['id'], 'wpm': 50, 'accuracy': 0.9,
+               'idempotency_key': 'kiosk-1:1'}
+    assert client.post('/api/scores', json=payload).status_code == 201
+    assert client.post('/api/scores', json=payload).status_code == 200
+    batch = client.post('/api/scores/batch', json={'scores': [payload]})
+    assert batch.json['results'][0]['status'] == 'duplicate'
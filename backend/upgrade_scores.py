@@ -0,0 +1,44 @@
+"""
+Add the scores columns and indexes that db.create_all() can't add to an existing table:
+scores.idempotency_key (unique; /scores and /scores/batch return it) and the
+ix_scores_board index behind the keyset-paginated boards.
+Run this before deploying on a database created earlier: python upgrade_scores.py
+Safe to re-run. See docs/UPGRADING.md for the order of the upgrade scripts.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import text
+from app import create_app
+from models import db
+
+
+def add_idempotency_key():
+    db.session.execute(text('ALTER TABLE scores ADD COLUMN IF NOT EXISTS idempotency_key varchar(64)'))
+    # Same name as the constraint create_all makes, so ON CONFLICT (idempotency_key) finds either
+    db.session.execute(text(
+        'CREATE UNIQUE INDEX IF NOT EXISTS scores_idempotency_key_key ON scores (idempotency_key)'
+    ))
+
+
+def add_board_index():
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_scores_board ON scores (event_id, score DESC, id DESC)'
+    ))
+
+
+def upgrade_scores():
+    """Run the whole upgrade in one transaction"""
+    app = create_app()
+
+    with app.app_context():
+        add_idempotency_key()
+        add_board_index()
+        db.session.commit()
+        print("Upgraded scores")
+
+
+if __name__ == '__main__':
+    upgrade_scores()
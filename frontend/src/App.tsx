@@ -7,6 +7,8 @@ import { TypingGame } from './components/TypingGame';
 import { ResultsScreen } from './components/ResultsScreen';
 import { Leaderboard } from './components/Leaderboard';
 import { useSound } from './hooks/useSound';
+import { useScoreQueue } from './hooks/useScoreQueue';
+import { usePromptQueue } from './hooks/usePromptQueue';
 import { EventProvider, useEvent } from './contexts/EventContext';
 import type {
   GameState,
@@ -27,8 +29,11 @@ function AppContent() {
   const [isLoadingLeaderboard, setIsLoadingLeaderboard] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [startedAt, setStartedAt] = useState<string | null>(null);
+  const [messageId, setMessageId] = useState<string | null>(null);
 
   const { play } = useSound();
+  const { submitScore } = useScoreQueue();
+  const { nextPrompt, prefetch, enqueue, wanted } = usePromptQueue();
   const { event, isLoading: isEventLoading, error: eventError } = useEvent();
 
   // Handle countdown tick
@@ -72,6 +77,11 @@ function AppContent() {
     }
   }, [event]);
 
+  // Prefetch a bundle of prompts so the first game starts without waiting on the network
+  useEffect(() => {
+    prefetch().catch((err) => console.error('Failed to prefetch prompts:', err));
+  }, [prefetch]);
+
   // Fetch leaderboard when viewing results
   useEffect(() => {
     if (gameState === 'results') {
@@ -105,46 +115,36 @@ function AppContent() {
     try {
       setError(null);
 
-      // Register or get existing player
-      const playerRes = await fetch(`${API_BASE}/api/players`, {
+      // Register, record consent and top up the prompt queue in one round trip
+      const { count, exclude } = wanted();
+      const sessionRes = await fetch(`${API_BASE}/api/sessions/start`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ nickname, email }),
+        body: JSON.stringify({
+          nickname,
+          email,
+          event_id: event?.id,
+          consented: event ? consented ?? null : undefined,
+          prompt_count: count,
+          exclude,
+        }),
       });
 
-      if (!playerRes.ok) {
+      if (!sessionRes.ok) {
         throw new Error('Failed to register player');
       }
 
-      const playerData = await playerRes.json();
-      setPlayer(playerData);
-
-      // Record consent for event games
-      if (event) {
-        try {
-          await fetch(`${API_BASE}/api/events/${event.id}/consent`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              player_id: playerData.id,
-              consented: consented ?? null,
-            }),
-          });
-        } catch (err) {
-          console.error('Failed to record consent:', err);
-        }
+      const session = await sessionRes.json();
+      setPlayer(session.player);
+      if (session.prompts.length > 0) {
+        enqueue(session);
       }
 
       // Capture started_at timestamp
       setStartedAt(new Date().toISOString());
 
-      // Fetch random prompt
-      const promptRes = await fetch(`${API_BASE}/api/prompts/random`);
-      if (!promptRes.ok) {
-        throw new Error('Failed to fetch prompt');
-      }
-
-      const promptData = await promptRes.json();
+      // Take the next prefetched prompt
+      const promptData = await nextPrompt();
       setPrompt(promptData);
 
       // Move to get ready state
@@ -167,31 +167,23 @@ function AppContent() {
   // Handle game complete
   const handleGameComplete = async (stats: GameStats) => {
     setFinalStats(stats);
+    setMessageId(null);
     play('gameOver');
 
-    // Submit score to API
+    // Submit score to API (queued locally if the network is down)
     if (player && prompt) {
-      try {
-        const res = await fetch(`${API_BASE}/api/scores`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            player_id: player.id,
-            prompt_id: prompt.id,
-            wpm: stats.wpm,
-            accuracy: stats.accuracy,
-            event_id: event?.id,
-            started_at: startedAt,
-          }),
-        });
-        if (!res.ok) {
-          const errorData = await res.json();
-          console.error('Score submission failed:', res.status, errorData);
-        } else {
-          console.log('Score submitted successfully');
-        }
-      } catch (err) {
-        console.error('Failed to submit score:', err);
+      const submitted = await submitScore({
+        player_id: player.id,
+        prompt_id: prompt.id,
+        wpm: stats.wpm,
+        accuracy: stats.accuracy,
+        event_id: event?.id,
+        started_at: startedAt,
+      });
+      if (submitted) {
+        console.log('Score submitted successfully');
+        // The server is already generating the performance message
+        setMessageId(submitted.message_id ?? null);
       }
     } else {
       console.error('Cannot submit score: player or prompt is missing', { player, prompt });
@@ -208,13 +200,9 @@ function AppContent() {
 
   // Handle play again
   const handlePlayAgain = async () => {
-    // Fetch new prompt
+    // Take the next prefetched prompt
     try {
-      const promptRes = await fetch(`${API_BASE}/api/prompts/random`);
-      if (promptRes.ok) {
-        const promptData = await promptRes.json();
-        setPrompt(promptData);
-      }
+      setPrompt(await nextPrompt());
     } catch (err) {
       console.error('Failed to fetch prompt:', err);
     }
@@ -279,6 +267,7 @@ function AppContent() {
         <ResultsScreen
           stats={finalStats}
           nickname={player.nickname}
+          messageId={messageId}
           onPlayAgain={handlePlayAgain}
           onViewLeaderboard={handleViewLeaderboard}
           onNewPlayer={handleBackToWelcome}
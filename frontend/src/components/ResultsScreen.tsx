@@ -5,6 +5,7 @@ import type { GameStats } from '../types';
 interface ResultsScreenProps {
   stats: GameStats;
   nickname: string;
+  messageId?: string | null; // Message the server started generating when the score was submitted
   onPlayAgain: () => void;
   onViewLeaderboard: () => void;
   onNewPlayer?: () => void;
@@ -13,6 +14,7 @@ interface ResultsScreenProps {
 export function ResultsScreen({
   stats,
   nickname,
+  messageId,
   onPlayAgain,
   onViewLeaderboard,
   onNewPlayer,
@@ -54,23 +56,26 @@ export function ResultsScreen({
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 3000); // 3 second timeout
 
-        const response = await fetch('/api/ai/performance-message', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            nickname,
-            wpm: stats.wpm,
-            accuracy: stats.accuracy,
-            score: stats.score,
-          }),
-          signal: controller.signal,
-        });
+        // Long-poll the message started at submission; without one, ask the pool directly
+        const response = messageId
+          ? await fetch(`/api/ai/messages/${messageId}?wait=2.5`, { signal: controller.signal })
+          : await fetch('/api/ai/performance-message', {
+              method: 'POST',
+              headers: { 'Content-Type': 'application/json' },
+              body: JSON.stringify({
+                nickname,
+                wpm: stats.wpm,
+                accuracy: stats.accuracy,
+                score: stats.score,
+              }),
+              signal: controller.signal,
+            });
 
         clearTimeout(timeoutId);
 
         if (response.ok) {
           const data = await response.json();
-          setAiMessage(data.message);
+          setAiMessage(data.message || performance.message);
         } else {
           setAiMessage(performance.message);
         }
@@ -83,7 +88,7 @@ export function ResultsScreen({
     };
 
     fetchAiMessage();
-  }, [nickname, stats.wpm, stats.accuracy, stats.score, performance.message]);
+  }, [nickname, messageId, stats.wpm, stats.accuracy, stats.score, performance.message]);
 
   // Start typewriter when AI message is loaded
   useEffect(() => {
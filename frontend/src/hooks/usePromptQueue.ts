@@ -0,0 +1,123 @@
+import { useCallback, useEffect, useRef } from 'react';
+import type { Prompt } from '../types';
+
+const API_BASE = import.meta.env.VITE_API_URL || '';
+const BUNDLE_SIZE = 5;
+const REFILL_BELOW = 2; // Prefetch the next bundle when this few prompts are left
+const REPORT_EVERY = 5; // Report played prompts to the server in batches of this size
+const MAX_EXCLUDE = 500; // Matches the server's cap; the oldest seen prompts may repeat first
+
+export type PromptBundle = {
+  version: string;
+  prompts: Prompt[];
+};
+
+// Keeps a local queue of prefetched prompts so "play again" starts instantly,
+// never repeating a prompt within the session until every prompt has been seen.
+export function usePromptQueue() {
+  const queue = useRef<Prompt[]>([]);
+  const seen = useRef<Set<string>>(new Set());
+  const played = useRef<string[]>([]);
+  const version = useRef<string | null>(null);
+  const inflight = useRef<Promise<void> | null>(null);
+
+  const reportUsage = useCallback(async () => {
+    if (played.current.length === 0) return;
+    const promptIds = played.current;
+    played.current = [];
+    try {
+      await fetch(`${API_BASE}/api/prompts/usage`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ prompt_ids: promptIds }),
+      });
+    } catch (err) {
+      console.error('Failed to report prompt usage:', err);
+    }
+  }, []);
+
+  // Add a bundle from /prompts/bundle or /sessions/start to the queue
+  const enqueue = useCallback((bundle: PromptBundle) => {
+    // Prompts were edited on the server: drop anything queued from the old set
+    if (version.current !== null && version.current !== bundle.version) {
+      queue.current = [];
+    }
+    version.current = bundle.version;
+    const queued = new Set(queue.current.map((p) => p.id));
+    queue.current.push(...bundle.prompts.filter((p) => !queued.has(p.id)));
+  }, []);
+
+  // Prompts the next bundle should avoid: the most recently seen, plus everything still queued
+  const excluded = useCallback(
+    () => [...seen.current, ...queue.current.map((p) => p.id)].slice(-MAX_EXCLUDE),
+    []
+  );
+
+  // What to ask the server for: nothing if the queue is stocked, else a bundle avoiding seen prompts
+  const wanted = useCallback(() => {
+    const exclude = excluded();
+    const count = queue.current.length < REFILL_BELOW && !inflight.current ? BUNDLE_SIZE : 0;
+    return { count, exclude };
+  }, [excluded]);
+
+  const refill = useCallback(() => {
+    if (inflight.current) return inflight.current;
+
+    // POSTed, since the exclude list grows with the session and would outgrow a query string
+    inflight.current = fetch(`${API_BASE}/api/prompts/bundle`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ count: BUNDLE_SIZE, exclude: excluded() }),
+    })
+      .then((res) => {
+        if (!res.ok) throw new Error('Failed to fetch prompt');
+        return res.json();
+      })
+      .then(enqueue)
+      .finally(() => {
+        inflight.current = null;
+      });
+    return inflight.current;
+  }, [enqueue, excluded]);
+
+  const nextPrompt = useCallback(async (): Promise<Prompt> => {
+    if (queue.current.length === 0) {
+      await refill();
+    }
+    const prompt = queue.current.shift();
+    if (!prompt) {
+      throw new Error('Failed to fetch prompt');
+    }
+
+    // Re-adding moves it to the end, so the oldest plays are the ones trimmed
+    seen.current.delete(prompt.id);
+    seen.current.add(prompt.id);
+    if (seen.current.size > MAX_EXCLUDE) {
+      seen.current.delete(seen.current.values().next().value as string);
+    }
+    played.current.push(prompt.id);
+    if (played.current.length >= REPORT_EVERY) {
+      reportUsage();
+    }
+    if (queue.current.length < REFILL_BELOW) {
+      refill().catch((err) => console.error('Failed to prefetch prompts:', err));
+    }
+    return prompt;
+  }, [refill, reportUsage]);
+
+  // Report whatever was played when the kiosk page goes away
+  useEffect(() => {
+    const flush = () => {
+      if (played.current.length === 0) return;
+      navigator.sendBeacon(
+        `${API_BASE}/api/prompts/usage`,
+        new Blob([JSON.stringify({ prompt_ids: played.current })], { type: 'application/json' })
+      );
+      played.current = [];
+    };
+    window.addEventListener('pagehide', flush);
+    return () => window.removeEventListener('pagehide', flush);
+  }, []);
+
+  return { nextPrompt, prefetch: refill, enqueue, wanted };
+}
@@ -0,0 +1,110 @@
+import { useCallback, useEffect } from 'react';
+
+const API_BASE = import.meta.env.VITE_API_URL || '';
+const STORAGE_KEY = 'typing-master:score-queue';
+const MAX_BATCH = 500; // Matches the server's /api/scores/batch limit
+
+export type ScoreSubmission = {
+  idempotency_key: string;
+  player_id: string;
+  prompt_id: string;
+  wpm: number;
+  accuracy: number;
+  event_id?: string;
+  started_at?: string | null;
+};
+
+type BatchResult = {
+  idempotency_key: string | null;
+  status: 'created' | 'duplicate' | 'error';
+  error?: string;
+};
+
+// crypto.randomUUID only exists in secure contexts; a kiosk on plain http over a LAN IP has none
+function newIdempotencyKey(): string {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`;
+}
+
+function loadQueue(): ScoreSubmission[] {
+  try {
+    return JSON.parse(localStorage.getItem(STORAGE_KEY) || '[]');
+  } catch {
+    return [];
+  }
+}
+
+function saveQueue(queue: ScoreSubmission[]) {
+  localStorage.setItem(STORAGE_KEY, JSON.stringify(queue));
+}
+
+// Submits scores, queueing them locally when the booth network is down and
+// replaying the queue through /api/scores/batch once it comes back.
+export function useScoreQueue() {
+  const flush = useCallback(async () => {
+    const queue = loadQueue();
+    if (queue.length === 0) return;
+
+    try {
+      const batch = queue.slice(0, MAX_BATCH);
+      const res = await fetch(`${API_BASE}/api/scores/batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ scores: batch }),
+      });
+      if (!res.ok) return;
+
+      // Results come back in batch order. Created and duplicate items are stored server-side;
+      // rejected ones won't succeed on retry either, so they're dropped rather than resent forever
+      const data: { results: BatchResult[] } = await res.json();
+      // Matched by content, since items without a usable key can't be matched by key
+      const done = new Set(batch.filter((_, i) => data.results[i]?.status).map((s) => JSON.stringify(s)));
+      data.results.forEach((r, i) => {
+        if (r.status === 'error') console.error('Queued score rejected:', r.error, batch[i]);
+      });
+      saveQueue(loadQueue().filter((s) => !done.has(JSON.stringify(s))));
+    } catch (err) {
+      console.error('Failed to flush score queue:', err);
+    }
+  }, []);
+
+  const submitScore = useCallback(
+    async (score: Omit<ScoreSubmission, 'idempotency_key'>) => {
+      let submission: ScoreSubmission | null = null;
+      try {
+        submission = { ...score, idempotency_key: newIdempotencyKey() };
+        const res = await fetch(`${API_BASE}/api/scores`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(submission),
+        });
+        if (res.status >= 500) {
+          throw new Error(`Server error ${res.status}`);
+        }
+        if (!res.ok) {
+          const errorData = await res.json();
+          console.error('Score submission failed:', res.status, errorData);
+          return null;
+        }
+        flush();
+        return res.json();
+      } catch (err) {
+        console.error('Failed to submit score, queueing for later:', err);
+        if (submission) saveQueue([...loadQueue(), submission]);
+        return null;
+      }
+    },
+    [flush]
+  );
+
+  // Replay anything left over from a previous session or outage
+  useEffect(() => {
+    flush();
+    window.addEventListener('online', flush);
+    return () => window.removeEventListener('online', flush);
+  }, [flush]);
+
+  return { submitScore, flush };
+}
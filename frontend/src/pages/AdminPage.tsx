@@ -165,29 +165,13 @@ export function AdminPage() {
   const exportCSV = () => {
     if (!stats || stats.players.length === 0) return;
 
-    const headers = ['Nickname', 'Email', 'Type', 'Games Played', 'Best Score', 'Avg WPM', 'Avg Accuracy'];
-    const rows = stats.players.map(p => [
-      p.nickname,
-      p.email,
-      p.email_type === 'do_employee' ? 'Shark' : (p.email_type || ''),
-      p.games_played,
-      p.best_score,
-      p.avg_wpm,
-      `${p.avg_accuracy}%`
-    ]);
-
-    const csvContent = [
-      headers.join(','),
-      ...rows.map(row => row.map(cell => `"${cell}"`).join(','))
-    ].join('\n');
-
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-    const url = URL.createObjectURL(blob);
+    // Streamed by the server with the same filters as the table
+    const params = new URLSearchParams({ format: 'csv', do_filter: doFilter });
+    if (emailFilter) params.set('email', emailFilter);
     const link = document.createElement('a');
-    link.href = url;
+    link.href = `${API_BASE}/api/admin/export/players?${params}`;
     link.download = `typing-master-players-${doFilter}-${new Date().toISOString().split('T')[0]}.csv`;
     link.click();
-    URL.revokeObjectURL(url);
   };
 
   const handleSort = (field: SortField) => {
@@ -230,6 +214,21 @@ export function AdminPage() {
       if (!response.ok) {
         throw new Error(data.error || 'Analysis failed');
       }
+
+      // Analysis runs as a background job: poll until it finishes
+      let job = data;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const jobResponse = await fetch(`${API_BASE}/api/admin/jobs/${data.job_id}`);
+        job = await jobResponse.json();
+        if (!jobResponse.ok) {
+          throw new Error(job.error || 'Analysis failed');
+        }
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Analysis failed');
+      }
+
       // Refresh stats to show new verdicts
       fetchStats(emailFilter, doFilter);
     } catch (err) {
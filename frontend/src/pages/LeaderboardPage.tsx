@@ -4,7 +4,7 @@ import { Leaderboard } from '../components/Leaderboard';
 import type { LeaderboardEntry, EventConfig } from '../types';
 
 const API_BASE = import.meta.env.VITE_API_URL || '';
-const REFRESH_INTERVAL = 5000; // Refresh every 5 seconds
+const REFRESH_INTERVAL = 5000; // Polling fallback when live updates are unavailable
 
 export function LeaderboardPage() {
   const [entries, setEntries] = useState<LeaderboardEntry[]>([]);
@@ -46,14 +46,49 @@ export function LeaderboardPage() {
     }
   };
 
-  // Initial fetch and auto-refresh — depends on event being loaded for event pages
+  // Live updates over SSE — depends on event being loaded for event pages
   useEffect(() => {
     if (eventSlug && !event) return; // Wait for event to load
 
     const eventId = event?.id;
-    fetchLeaderboard(eventId);
-    const interval = setInterval(() => fetchLeaderboard(eventId), REFRESH_INTERVAL);
-    return () => clearInterval(interval);
+    let interval: ReturnType<typeof setInterval> | null = null;
+
+    const startPolling = () => {
+      if (interval) return;
+      fetchLeaderboard(eventId);
+      interval = setInterval(() => fetchLeaderboard(eventId), REFRESH_INTERVAL);
+    };
+
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return () => {
+        if (interval) clearInterval(interval);
+      };
+    }
+
+    const url = eventId
+      ? `${API_BASE}/api/leaderboard/stream?event_id=${eventId}`
+      : `${API_BASE}/api/leaderboard/stream`;
+    const source = new EventSource(url);
+
+    source.addEventListener('leaderboard', (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setEntries(data.leaderboard);
+      setLastUpdated(new Date());
+      setIsLoading(false);
+    });
+
+    // Fall back to polling if the stream can't be established
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        startPolling();
+      }
+    };
+
+    return () => {
+      source.close();
+      if (interval) clearInterval(interval);
+    };
   }, [event, eventSlug]);
 
   if (eventError) {
@@ -12,6 +12,7 @@ export type Prompt = {
   difficulty: string;
   is_active: boolean;
   times_used: number;
+  difficulty_score: number | null; // 0-100, computed from the text
   created_at: string;
 };
 